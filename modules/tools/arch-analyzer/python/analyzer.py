@@ -5,7 +5,7 @@ Professional Architecture Analyzer
 High-performance NixOS architecture analysis with LLM integration.
 
 Features:
-- Async parallel processing with aiohttp
+- Async parallel processing over pooled keep-alive connections
 - Self-analysis and quality scoring
 - Auto-correction with validation
 - Incremental caching with SQLite
@@ -15,6 +15,8 @@ Usage:
     arch-analyze --repo /etc/nixos --output ./arch
     arch-analyze --self-test
     arch-analyze --auto-fix --dry-run
+    arch-analyze --rollback-fixes
+    arch-analyze --trace run-trace.json
 """
 
 from __future__ import annotations
@@ -22,21 +24,32 @@ from __future__ import annotations
 import argparse
 import asyncio
 import hashlib
+import io
 import json
 import logging
 import os
+import queue
 import re
 import signal
 import sqlite3
+import subprocess
 import sys
+import threading
 import time
 import urllib.error
 import urllib.request
-from concurrent.futures import ThreadPoolExecutor
-from dataclasses import asdict
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass
 from datetime import datetime
 from pathlib import Path
-from typing import Any
+from typing import Any, Callable, Iterator
+
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
 
 # Local imports
 from models import (
@@ -52,11 +65,40 @@ from models import (
     ModuleAnalysis,
     ModuleNode,
     QualityScore,
+    RequestTiming,
     SecurityFinding,
     Severity,
+    SourceFile,
     ValidationResult,
 )
-from prompts import PROMPTS, get_prompt
+from backends import BackendPool, LlamaCppClient, parse_endpoint
+from chunking import (
+    Chunk,
+    estimate_tokens,
+    merge_module_results,
+    merge_self_results,
+    split_source,
+)
+from concurrency import AdaptiveLimiter
+from diagrams import DIAGRAM_DIR, diagram_names, overview_diagram, render_diagrams
+from graph import ModuleGraph
+from patching import BackupStore, Hunk, apply_hunks, atomic_open, atomic_write
+from resolver import ImportResolver, extract_imports
+from similarity import (
+    REUSE_THRESHOLD,
+    IndexEntry,
+    SimilarityIndex,
+    Sketch,
+    pack_sketch,
+    sketch,
+    tokenize,
+    unified_delta,
+    unpack_sketch,
+)
+from tracing import TRACE_FORMATS, Tracer, activate, deactivate, record, span
+from writers import ModuleStream, write_report_json
+from prompts import PROMPTS, get_prompt, prompt_fingerprint, shared_prefix
+from transport import AsyncHTTPTransport
 
 # ═══════════════════════════════════════════════════════════════════════════
 # Configuration
@@ -65,9 +107,21 @@ from prompts import PROMPTS, get_prompt
 VERSION = "2.0.0"
 DEFAULT_MODEL = "qwen2.5-coder:7b-instruct"
 OLLAMA_BASE_URL = os.getenv("OLLAMA_HOST", "http://localhost:11434")
-MAX_CONCURRENT = int(os.getenv("LLM_PARALLEL", "8"))
+# Comma-separated [flavor=]url list, e.g. "http://gpu1:11434,llamacpp=http://gpu2:8080"
+LLM_ENDPOINTS = [e.strip() for e in os.getenv("LLM_ENDPOINTS", "").split(",") if e.strip()]
+MAX_CONCURRENT = int(os.getenv("LLM_PARALLEL", "8"))  # starting in-flight limit per endpoint
+MAX_CONCURRENT_CEILING = int(os.getenv("LLM_PARALLEL_MAX", str(max(32, MAX_CONCURRENT))))
 REQUEST_TIMEOUT = int(os.getenv("LLM_TIMEOUT", "120"))
+KEEP_ALIVE = os.getenv("LLM_KEEP_ALIVE", "30m")  # keep the model (and its prefix cache) loaded
+PROMPT_QUEUE_SIZE = int(os.getenv("LLM_QUEUE", "16"))
+CHUNK_TOKEN_BUDGET = int(os.getenv("LLM_CHUNK_TOKENS", "1536"))  # code tokens per prompt
+INGEST_PARALLEL_THRESHOLD = 64  # files; below this a process pool costs more than it saves
 CACHE_DB_PATH = Path(os.getenv("ARCH_CACHE_DB", "/var/lib/arch-analyzer/cache.db"))
+CACHE_BATCH_SIZE = 256  # statements per write transaction
+CACHE_FLUSH_INTERVAL = 1.0  # seconds a partial batch may wait before commit
+CACHE_MAX_BYTES = int(os.getenv("ARCH_CACHE_MAX_MB", "512")) * 1024 * 1024
+CACHE_MAX_REPORTS = 50
+FIX_BACKUP_DIR = Path(os.getenv("ARCH_BACKUP_DIR", str(CACHE_DB_PATH.parent / "backups")))
 
 # Logging
 logging.basicConfig(
@@ -79,11 +133,73 @@ log = logging.getLogger(__name__)
 
 
 # ═══════════════════════════════════════════════════════════════════════════
-# Ollama Client - High-performance async client
+# Incremental JSON - Detect the end of a streamed JSON object
+# ═══════════════════════════════════════════════════════════════════════════
+
+class JSONObjectScanner:
+    """Incremental scanner for the first top-level JSON object in a text stream.
+
+    Text before the opening brace (markdown fences, preamble) is skipped.
+    Strings and escapes are tracked so braces inside values do not count.
+    """
+
+    def __init__(self):
+        self._buf: list[str] = []
+        self._depth = 0
+        self._started = False
+        self._in_string = False
+        self._escape = False
+        self.done = False
+
+    @property
+    def result(self) -> str:
+        return "".join(self._buf) if self.done else ""
+
+    def feed(self, text: str) -> bool:
+        """Consume more text; return True once the object has closed."""
+        if self.done:
+            return True
+        start = 0
+        for i, ch in enumerate(text):
+            if not self._started:
+                if ch != "{":
+                    continue
+                self._started = True
+                start = i
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+            elif ch == '"':
+                self._in_string = True
+            elif ch == "{":
+                self._depth += 1
+            elif ch == "}":
+                self._depth -= 1
+                if self._depth == 0:
+                    self._buf.append(text[start:i + 1])
+                    self.done = True
+                    return True
+        if self._started:
+            self._buf.append(text[start:])
+        return False
+
+
+# ═══════════════════════════════════════════════════════════════════════════
+# Ollama Client - Native asyncio client
 # ═══════════════════════════════════════════════════════════════════════════
 
 class OllamaClient:
-    """Async Ollama client with connection pooling and retry logic."""
+    """Async Ollama client with keep-alive connection pooling and retry logic.
+
+    Requests carry ``keep_alive`` so the model stays resident between
+    modules, and prompts put their shared instructions first so Ollama's
+    prefix cache can skip re-evaluating them. ``timings`` records the
+    prefill/decode split of each request.
+    """
 
     def __init__(
         self,
@@ -92,34 +208,98 @@ class OllamaClient:
         timeout: int = REQUEST_TIMEOUT,
         max_retries: int = 3,
         max_concurrent: int = MAX_CONCURRENT,
+        keep_alive: str | None = KEEP_ALIVE,
+        max_limit: int | None = MAX_CONCURRENT_CEILING,
     ):
         self.model = model
         self.base_url = base_url.rstrip("/")
         self.timeout = timeout
         self.max_retries = max_retries
-        self.max_concurrent = max_concurrent
-        self._executor: ThreadPoolExecutor | None = None
-        self._stats = {"requests": 0, "errors": 0, "tokens": 0}
+        self.keep_alive = keep_alive
+        # max_concurrent is the starting limit; the limiter may grow it up to
+        # max_limit (None pins it), so callers fan out to the ceiling
+        self.limiter = AdaptiveLimiter(max_concurrent, max_limit=max_limit)
+        self.max_concurrent = self.limiter.max_limit
+        self.timings: list[RequestTiming] = []
+        self._transport: AsyncHTTPTransport | None = None
+        self._stats = {"requests": 0, "errors": 0, "tokens": 0, "streams_aborted": 0}
 
     def __enter__(self):
-        self._executor = ThreadPoolExecutor(max_workers=self.max_concurrent)
         return self
 
     def __exit__(self, *args):
-        if self._executor:
-            self._executor.shutdown(wait=True)
+        pass
 
     async def __aenter__(self):
-        self._executor = ThreadPoolExecutor(max_workers=self.max_concurrent)
+        self._transport = AsyncHTTPTransport(limit_per_host=self.max_concurrent)
         return self
 
     async def __aexit__(self, *args):
-        if self._executor:
-            self._executor.shutdown(wait=True)
+        if self._transport:
+            await self._transport.close()
+            self._transport = None
 
     @property
     def stats(self) -> dict:
-        return self._stats.copy()
+        stats = self._stats.copy()
+        stats["concurrency_limit"] = self.limiter.limit
+        stats["limiter"] = self.limiter.stats
+        server = [t for t in self.timings if t.source == "server"]
+        client = [t for t in self.timings if t.source == "client"]
+        stats.update({
+            "timed_server": len(server),
+            "timed_client": len(client),
+            "prompt_eval_ms": sum(t.prompt_eval_ms for t in server),
+            "eval_ms": sum(t.eval_ms for t in server),
+            "ttft_ms": sum(t.prompt_eval_ms for t in client),
+            "stream_decode_ms": sum(t.eval_ms for t in client),
+            "prompt_eval_tokens": sum(t.prompt_eval_count for t in server),
+            "eval_tokens": sum(t.eval_count for t in server),
+            # Prompt tokens the server did not have to evaluate (prefix cache hits);
+            # an estimate, since the chat template adds tokens of its own
+            "prompt_tokens_reused": sum(
+                max(0, t.prompt_tokens_est - t.prompt_eval_count) for t in server
+            ),
+        })
+        if self._transport:
+            stats.update(self._transport.stats)
+        return stats
+
+    def _record_timing(
+        self,
+        payload: dict[str, Any],
+        data: dict[str, Any] | None = None,
+        prefill_s: float = 0.0,
+        decode_s: float = 0.0,
+        tokens: int = 0,
+    ):
+        """Store the prefill/decode split from Ollama's counters or client clocks."""
+        est = estimate_tokens(payload.get("system", "") + payload["prompt"])
+        # Ollama's counters are nanoseconds
+        if data and "prompt_eval_duration" in data:
+            self.timings.append(RequestTiming(
+                prompt_tokens_est=est,
+                prompt_eval_count=data.get("prompt_eval_count", 0),
+                prompt_eval_ms=data["prompt_eval_duration"] / 1e6,
+                eval_count=data.get("eval_count", 0),
+                eval_ms=data.get("eval_duration", 0) / 1e6,
+            ))
+        else:
+            self.timings.append(RequestTiming(
+                prompt_tokens_est=est,
+                prompt_eval_count=0,
+                prompt_eval_ms=prefill_s * 1000,
+                eval_count=tokens,
+                eval_ms=decode_s * 1000,
+                source="client",
+            ))
+        # The response has just arrived, so the split ends now
+        timing = self.timings[-1]
+        now = time.monotonic()
+        decode_start = now - timing.eval_ms / 1000
+        record("prefill", decode_start - timing.prompt_eval_ms / 1000, decode_start,
+               tokens=timing.prompt_eval_count)
+        record("decode", decode_start, now, tokens=timing.eval_count)
 
     def _sync_request(self, url: str, data: bytes | None = None) -> tuple[int, str]:
         """Make synchronous HTTP request."""
@@ -136,23 +316,60 @@ class OllamaClient:
         except urllib.error.URLError as e:
             raise ConnectionError(f"Connection failed: {e.reason}")
 
+    def _model_available(self, body: str) -> bool:
+        """Check an /api/tags response for the configured model."""
+        data = json.loads(body)
+        models = [m.get("name", "") for m in data.get("models", [])]
+        model_base = self.model.split(":")[0]
+        return any(model_base in m for m in models)
+
+    def _build_payload(
+        self,
+        prompt: str,
+        system: str | None,
+        temperature: float,
+        max_tokens: int,
+        stream: bool = False,
+    ) -> dict[str, Any]:
+        """Build an /api/generate request body."""
+        payload = {
+            "model": self.model,
+            "prompt": prompt,
+            "stream": stream,
+            "options": {
+                "temperature": temperature,
+                "num_predict": max_tokens,
+            },
+        }
+        if system:
+            payload["system"] = system
+        if self.keep_alive is not None:
+            payload["keep_alive"] = self.keep_alive
+        return payload
+
     def check_health_sync(self) -> bool:
         """Check if Ollama is available and model is loaded."""
         try:
             status, body = self._sync_request(f"{self.base_url}/api/tags")
             if status == 200:
-                data = json.loads(body)
-                models = [m.get("name", "") for m in data.get("models", [])]
-                model_base = self.model.split(":")[0]
-                return any(model_base in m for m in models)
+                return self._model_available(body)
         except Exception as e:
             log.error(f"Ollama health check failed: {e}")
         return False
 
     async def check_health(self) -> bool:
-        """Check if Ollama is available (async wrapper)."""
-        loop = asyncio.get_event_loop()
-        return await loop.run_in_executor(self._executor, self.check_health_sync)
+        """Check if Ollama is available and model is loaded."""
+        if not self._transport:
+            return await asyncio.to_thread(self.check_health_sync)
+        try:
+            resp = await self._transport.request(
+                "GET", f"{self.base_url}/api/tags", timeout=self.timeout
+            )
+            if resp.status == 200:
+                return self._model_available(resp.text())
+        except Exception as e:
+            log.error(f"Ollama health check failed: {e}")
+        return False
 
     def generate_sync(
         self,
@@ -163,19 +380,7 @@ class OllamaClient:
     ) -> str:
         """Generate completion synchronously with retry logic."""
         self._stats["requests"] += 1
-        
-        payload = {
-            "model": self.model,
-            "prompt": prompt,
-            "stream": False,
-            "options": {
-                "temperature": temperature,
-                "num_predict": max_tokens,
-            },
-        }
-        if system:
-            payload["system"] = system
-
+        payload = self._build_payload(prompt, system, temperature, max_tokens)
         data = json.dumps(payload).encode()
 
         for attempt in range(self.max_retries):
@@ -186,6 +391,7 @@ class OllamaClient:
                 if status == 200:
                     resp = json.loads(body)
                     self._stats["tokens"] += resp.get("eval_count", 0)
+                    self._record_timing(payload, resp)
                     return resp.get("response", "")
                 else:
                     self._stats["errors"] += 1
@@ -208,13 +414,117 @@ class OllamaClient:
         system: str | None = None,
         temperature: float = 0.1,
         max_tokens: int = 2048,
+        stream: bool = False,
     ) -> str:
-        """Generate completion asynchronously."""
-        loop = asyncio.get_event_loop()
-        return await loop.run_in_executor(
-            self._executor,
-            lambda: self.generate_sync(prompt, system, temperature, max_tokens),
-        )
+        """Generate completion asynchronously with retry logic.
+
+        With ``stream=True`` the NDJSON token stream is fed to an incremental
+        JSON scanner and generation is cancelled as soon as the first
+        top-level JSON object closes; only that object is returned.
+        """
+        if not self._transport:
+            return await asyncio.to_thread(
+                self.generate_sync, prompt, system, temperature, max_tokens
+            )
+
+        self._stats["requests"] += 1
+        payload = self._build_payload(prompt, system, temperature, max_tokens, stream)
+
+        with span("llm.generate", "llm", endpoint=self.base_url, stream=stream) as info:
+            for attempt in range(self.max_retries):
+                info["attempts"] = attempt + 1
+                queued = time.monotonic()
+                await self.limiter.acquire()
+                started = time.monotonic()
+                record("queue_wait", queued, started)
+                ok, tokens = False, 0
+                try:
+                    if stream:
+                        text, tokens = await asyncio.wait_for(
+                            self._generate_streaming(payload), self.timeout
+                        )
+                        ok = True
+                        info["tokens"] = tokens
+                        return text
+                    resp = await self._transport.request_json(
+                        "POST", f"{self.base_url}/api/generate", payload, timeout=self.timeout
+                    )
+                    if resp.status == 200:
+                        data = resp.json()
+                        tokens = data.get("eval_count", 0)
+                        self._stats["tokens"] += tokens
+                        self._record_timing(payload, data)
+                        ok = True
+                        info["tokens"] = tokens
+                        return data.get("response", "")
+                    else:
+                        self._stats["errors"] += 1
+                        log.warning(f"Ollama error (attempt {attempt + 1}): {resp.text()[:100]}")
+                except ConnectionError as e:
+                    self._stats["errors"] += 1
+                    log.warning(f"Connection error (attempt {attempt + 1}): {e}")
+                except asyncio.TimeoutError:
+                    self._stats["errors"] += 1
+                    log.warning(f"Timeout (attempt {attempt + 1}) after {self.timeout}s")
+                except Exception as e:
+                    self._stats["errors"] += 1
+                    log.warning(f"Error (attempt {attempt + 1}): {e}")
+                finally:
+                    self.limiter.release(time.monotonic() - started, tokens, ok)
+
+                if attempt < self.max_retries - 1:
+                    await asyncio.sleep(2**attempt)
+
+            return ""
+
+    async def _generate_streaming(self, payload: dict[str, Any]) -> tuple[str, int]:
+        """Consume an NDJSON stream, stopping once the JSON object is complete.
+
+        Returns (text, generated tokens).
+        """
+        scanner = JSONObjectScanner()
+        text: list[str] = []
+        body = json.dumps(payload).encode()
+        sent = time.monotonic()
+        first_token = None
+
+        async with self._transport.stream(
+            "POST", f"{self.base_url}/api/generate", body
+        ) as resp:
+            if resp.status != 200:
+                raise ConnectionError(f"HTTP {resp.status}: {(await resp.read())[:100]!r}")
+
+            tokens = 0
+            async for line in resp.iter_lines():
+                chunk = json.loads(line)
+                if chunk.get("error"):
+                    raise ConnectionError(chunk["error"])
+                piece = chunk.get("response", "")
+                if piece:
+                    tokens += 1
+                    first_token = first_token or time.monotonic()
+                if chunk.get("done"):
+                    tokens = chunk.get("eval_count", tokens)
+                    text.append(piece)
+                    self._record_timing(payload, chunk)
+                    break
+                text.append(piece)
+                if scanner.feed(piece):
+                    # Leaving the context drops the connection, which makes
+                    # Ollama cancel the rest of the generation.
+                    self._stats["streams_aborted"] += 1
+                    self._stats["tokens"] += tokens
+                    now = time.monotonic()
+                    self._record_timing(
+                        payload,
+                        prefill_s=first_token - sent,
+                        decode_s=now - first_token,
+                        tokens=tokens,
+                    )
+                    return scanner.result, tokens
+
+            self._stats["tokens"] += tokens
+        return scanner.result or "".join(text), tokens
 
     async def batch_generate(
         self, prompts: list[tuple[str, str]], temperature: float = 0.1
@@ -229,30 +539,168 @@ class OllamaClient:
 # ═══════════════════════════════════════════════════════════════════════════
 
 class CacheLayer:
-    """SQLite cache for incremental analysis."""
+    """Content-addressed SQLite cache for incremental analysis.
+
+    Analyses are keyed on (content digest, model, prompt fingerprint), so
+    identical files share one row regardless of path or host, and several
+    models or prompt revisions can live in the same database. ``module_paths``
+    records which digest each path of a repository had when it was last
+    analyzed, so several repositories can share one database.
+
+    The database runs in WAL mode. Writes are queued to a dedicated writer
+    thread that commits them in batches, so callers never wait on an fsync
+    and reads on the main connection are not blocked by pending writes.
+    """
 
-    def __init__(self, db_path: Path = CACHE_DB_PATH):
+    def __init__(
+        self,
+        db_path: Path = CACHE_DB_PATH,
+        model: str = DEFAULT_MODEL,
+        prompt_fp: str = "",
+        repository: str = "",
+        batch_size: int = CACHE_BATCH_SIZE,
+        flush_interval: float = CACHE_FLUSH_INTERVAL,
+    ):
         self.db_path = db_path
+        self.model = model
+        self.prompt_fp = prompt_fp or cache_prompt_key()
+        self.repository = repository
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
         self._conn: sqlite3.Connection | None = None
+        self._writes: queue.Queue[tuple[str, tuple, tuple | None] | None] = queue.Queue()
+        self._writer: threading.Thread | None = None
+        # Analyses queued but not yet committed, so reads see their own writes
+        self._pending: dict[tuple[str, str, str], str] = {}
+        self._pending_lock = threading.Lock()
+        self._stats = {
+            "hits": 0,
+            "misses": 0,
+            "writes": 0,
+            "batches": 0,
+            "read_ms": 0.0,
+            "write_ms": 0.0,
+        }
 
     def __enter__(self):
         self.db_path.parent.mkdir(parents=True, exist_ok=True)
-        self._conn = sqlite3.connect(str(self.db_path))
+        self._conn = self._connect()
         self._init_schema()
+        self._writer = threading.Thread(
+            target=self._write_loop, name="cache-writer", daemon=True
+        )
+        self._writer.start()
         return self
 
     def __exit__(self, *args):
+        if self._writer:
+            self._writes.put(None)
+            self._writer.join()
+            self._writer = None
         if self._conn:
             self._conn.close()
+            self._conn = None
+
+    @property
+    def stats(self) -> dict[str, float]:
+        """Hit/miss/write counters and cumulative I/O latency in ms."""
+        stats = dict(self._stats)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        stats["avg_read_ms"] = stats["read_ms"] / lookups if lookups else 0.0
+        stats["avg_batch_ms"] = stats["write_ms"] / stats["batches"] if stats["batches"] else 0.0
+        return stats
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(str(self.db_path), timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def _write_loop(self):
+        """Writer thread: commit queued statements in batched transactions."""
+        conn = self._connect()
+        try:
+            stopping = False
+            while not stopping:
+                item = self._writes.get()
+                batch = []
+                deadline = time.monotonic() + self.flush_interval
+                while item is not None:
+                    batch.append(item)
+                    if len(batch) >= self.batch_size:
+                        break
+                    try:
+                        item = self._writes.get(timeout=max(0.0, deadline - time.monotonic()))
+                    except queue.Empty:
+                        break
+                stopping = item is None
+
+                if batch:
+                    start = time.perf_counter()
+                    try:
+                        with conn:
+                            for sql, params, _ in batch:
+                                conn.execute(sql, params)
+                    except sqlite3.Error as e:
+                        log.error(f"Cache write failed ({len(batch)} statements): {e}")
+                    self._stats["write_ms"] += (time.perf_counter() - start) * 1000
+                    self._stats["batches"] += 1
+                    with self._pending_lock:
+                        for _, params, key in batch:
+                            if key and self._pending.get(key) is params[-1]:
+                                del self._pending[key]
+                for _ in range(len(batch) + (1 if stopping else 0)):
+                    self._writes.task_done()
+        finally:
+            conn.close()
+
+    def _enqueue(self, sql: str, params: tuple, pending_key: tuple | None = None):
+        self._stats["writes"] += 1
+        self._writes.put((sql, params, pending_key))
+
+    def flush(self):
+        """Block until every queued write has been committed."""
+        if self._writer:
+            self._writes.join()
 
     def _init_schema(self):
         """Initialize database schema."""
+        # Rows keyed on path + truncated MD5 cannot be reused under the new
+        # key; the table is left for ``compact`` to remove
+        if self._has_legacy_table():
+            log.info(
+                f"Cache {self.db_path} has a legacy module_cache table that is no longer "
+                "read; --cache-compact removes it"
+            )
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS analysis_cache (
+                content_hash TEXT NOT NULL,
+                model TEXT NOT NULL,
+                prompt_fp TEXT NOT NULL,
+                created TEXT NOT NULL,
+                last_analyzed TEXT NOT NULL,
+                analysis_json TEXT NOT NULL,
+                PRIMARY KEY (content_hash, model, prompt_fp)
+            )
+        """)
         self._conn.execute("""
-            CREATE TABLE IF NOT EXISTS module_cache (
-                path TEXT PRIMARY KEY,
+            CREATE TABLE IF NOT EXISTS module_paths (
+                repository TEXT NOT NULL,
+                path TEXT NOT NULL,
                 content_hash TEXT NOT NULL,
                 last_analyzed TEXT NOT NULL,
-                analysis_json TEXT NOT NULL
+                PRIMARY KEY (repository, path)
+            )
+        """)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS module_sketches (
+                content_hash TEXT PRIMARY KEY,
+                category TEXT NOT NULL,
+                lines INTEGER NOT NULL,
+                sketch BLOB NOT NULL,
+                content BLOB NOT NULL,
+                codec TEXT NOT NULL
             )
         """)
         self._conn.execute("""
@@ -264,64 +712,379 @@ class CacheLayer:
                 report_json TEXT
             )
         """)
+        # Columns added after the table first shipped
+        self._ensure_column("report_history", "report_blob", "BLOB")
+        self._ensure_column("report_history", "codec", "TEXT")
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_analysis_lru ON analysis_cache (last_analyzed)"
+        )
         self._conn.commit()
 
+    def _has_legacy_table(self) -> bool:
+        return self._conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'module_cache'"
+        ).fetchone() is not None
+
+    def _ensure_column(self, table: str, column: str, decl: str):
+        columns = {row[1] for row in self._conn.execute(f"PRAGMA table_info({table})")}
+        if column not in columns:
+            self._conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {decl}")
+
     def get(self, path: str, content_hash: str) -> ModuleAnalysis | None:
-        """Get cached analysis if hash matches."""
-        cursor = self._conn.execute(
-            "SELECT analysis_json FROM module_cache WHERE path = ? AND content_hash = ?",
-            (path, content_hash),
+        """Get cached analysis for this content under the current model/prompt.
+
+        A hit recorded under a different path is rebound to ``path``.
+        """
+        start = time.perf_counter()
+        raw = self._read(content_hash)
+        self._stats["read_ms"] += (time.perf_counter() - start) * 1000
+
+        if raw is None:
+            self._stats["misses"] += 1
+            return None
+        self._stats["hits"] += 1
+        self._touch(path, content_hash)
+        return analysis_from_dict(json.loads(raw), path)
+
+    def _read(self, content_hash: str) -> str | None:
+        key = (content_hash, self.model, self.prompt_fp)
+        with self._pending_lock:
+            raw = self._pending.get(key)
+        if raw is None:
+            row = self._conn.execute(
+                """SELECT analysis_json FROM analysis_cache
+                   WHERE content_hash = ? AND model = ? AND prompt_fp = ?""",
+                key,
+            ).fetchone()
+            raw = row[0] if row else None
+        return raw
+
+    def peek(self, content_hash: str) -> ModuleAnalysis | None:
+        """Cached analysis for a digest, without counting a hit or touching LRU."""
+        raw = self._read(content_hash)
+        return analysis_from_dict(json.loads(raw)) if raw else None
+
+    def add_sketch(
+        self, content_hash: str, category: str, lines: int, sk: Sketch, content: str
+    ):
+        """Queue a module's similarity sketch (and source, for diffs) for the index."""
+        codec, blob = compress_blob(content.encode())
+        self._enqueue(
+            """INSERT OR IGNORE INTO module_sketches
+               (content_hash, category, lines, sketch, content, codec)
+               VALUES (?, ?, ?, ?, ?, ?)""",
+            (content_hash, category, lines, pack_sketch(sk), blob, codec),
+        )
+
+    def load_sketches(self) -> list[IndexEntry]:
+        """Sketches of modules with an analysis under the current model/prompt."""
+        rows = self._conn.execute(
+            """SELECT s.content_hash, s.sketch, s.lines, s.category
+               FROM module_sketches s JOIN analysis_cache a
+                 ON a.content_hash = s.content_hash AND a.model = ? AND a.prompt_fp = ?""",
+            (self.model, self.prompt_fp),
+        ).fetchall()
+        return [IndexEntry(h, unpack_sketch(blob), lines, cat) for h, blob, lines, cat in rows]
+
+    def get_content(self, content_hash: str) -> str | None:
+        """Source text stored with a sketch, if any."""
+        row = self._conn.execute(
+            "SELECT content, codec FROM module_sketches WHERE content_hash = ?",
+            (content_hash,),
+        ).fetchone()
+        return decompress_blob(row[1], row[0]).decode() if row else None
+
+    def _touch(self, path: str, content_hash: str):
+        """Record a cache hit for LRU eviction (queued, committed in batches)."""
+        now = datetime.now().isoformat()
+        self._enqueue(
+            """UPDATE analysis_cache SET last_analyzed = ?
+               WHERE content_hash = ? AND model = ? AND prompt_fp = ?""",
+            (now, content_hash, self.model, self.prompt_fp),
+        )
+        self._enqueue(
+            """INSERT OR REPLACE INTO module_paths (repository, path, content_hash, last_analyzed)
+               VALUES (?, ?, ?, ?)""",
+            (self.repository, path, content_hash, now),
         )
-        row = cursor.fetchone()
-        if row:
-            data = json.loads(row[0])
-            return ModuleAnalysis(**data)
-        return None
 
     def set(self, path: str, content_hash: str, analysis: ModuleAnalysis):
-        """Cache analysis result."""
-        self._conn.execute(
-            """INSERT OR REPLACE INTO module_cache 
-               (path, content_hash, last_analyzed, analysis_json)
+        """Queue an analysis result for the writer thread."""
+        now = datetime.now().isoformat()
+        raw = json.dumps(asdict(analysis), default=str)
+        key = (content_hash, self.model, self.prompt_fp)
+        with self._pending_lock:
+            self._pending[key] = raw
+        self._enqueue(
+            """INSERT OR REPLACE INTO analysis_cache
+               (content_hash, model, prompt_fp, created, last_analyzed, analysis_json)
+               VALUES (?, ?, ?, ?, ?, ?)""",
+            (*key, now, now, raw),
+            pending_key=key,
+        )
+        self._enqueue(
+            """INSERT OR REPLACE INTO module_paths (repository, path, content_hash, last_analyzed)
                VALUES (?, ?, ?, ?)""",
-            (
-                path,
-                content_hash,
-                datetime.now().isoformat(),
-                json.dumps(asdict(analysis)),
-            ),
+            (self.repository, path, content_hash, now),
         )
-        self._conn.commit()
 
     def save_report(self, report: ArchitectureReport):
-        """Save report to history."""
-        self._conn.execute(
+        """Queue the report (compressed) for the history table."""
+        codec, blob = compress_blob(json.dumps(asdict(report), default=str).encode())
+        self._enqueue(
             """INSERT INTO report_history 
-               (timestamp, quality_score, total_modules, report_json)
-               VALUES (?, ?, ?, ?)""",
+               (timestamp, quality_score, total_modules, report_blob, codec)
+               VALUES (?, ?, ?, ?, ?)""",
             (
                 report.timestamp,
                 report.quality_score.overall,
                 report.total_modules,
-                json.dumps(asdict(report)),
+                blob,
+                codec,
             ),
         )
-        self._conn.commit()
+
+    def load_report(self, report_id: int | None = None) -> dict[str, Any] | None:
+        """Load a stored report (latest if ``report_id`` is None) as a dict."""
+        self.flush()
+        if report_id is None:
+            row = self._conn.execute(
+                "SELECT report_json, report_blob, codec FROM report_history ORDER BY id DESC LIMIT 1"
+            ).fetchone()
+        else:
+            row = self._conn.execute(
+                "SELECT report_json, report_blob, codec FROM report_history WHERE id = ?",
+                (report_id,),
+            ).fetchone()
+        if not row:
+            return None
+        report_json, blob, codec = row
+        if blob is not None:
+            return json.loads(decompress_blob(codec, blob))
+        return json.loads(report_json) if report_json else None
 
     def get_previous_score(self) -> int | None:
         """Get previous quality score for trend analysis."""
+        self.flush()
         cursor = self._conn.execute(
             "SELECT quality_score FROM report_history ORDER BY id DESC LIMIT 1 OFFSET 1"
         )
         row = cursor.fetchone()
         return row[0] if row else None
 
+    def invalidate(
+        self,
+        model: str | None = None,
+        prompt_fp: str | None = None,
+        stale_prompts: bool = False,
+    ) -> int:
+        """Delete cached analyses selectively; returns the number of rows removed.
+
+        Args:
+            model: Only rows produced by this model.
+            prompt_fp: Only rows produced with this prompt fingerprint.
+            stale_prompts: Only rows whose prompt fingerprint is not the current one.
+        """
+        clauses, params = [], []
+        if model is not None:
+            clauses.append("model = ?")
+            params.append(model)
+        if prompt_fp is not None:
+            clauses.append("prompt_fp = ?")
+            params.append(prompt_fp)
+        if stale_prompts:
+            clauses.append("prompt_fp != ?")
+            params.append(self.prompt_fp)
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        self.flush()
+        cursor = self._conn.execute(f"DELETE FROM analysis_cache{where}", params)
+        self._conn.commit()
+        return cursor.rowcount
+
+    def size_bytes(self) -> int:
+        """Bytes used by live pages (excludes the free list)."""
+        page_size = self._conn.execute("PRAGMA page_size").fetchone()[0]
+        pages = self._conn.execute("PRAGMA page_count").fetchone()[0]
+        free = self._conn.execute("PRAGMA freelist_count").fetchone()[0]
+        return (pages - free) * page_size
+
+    def evict(
+        self,
+        max_bytes: int | None = None,
+        live_paths: set[str] | None = None,
+        max_reports: int | None = CACHE_MAX_REPORTS,
+    ) -> dict[str, int]:
+        """Apply the retention policy; returns counts of removed rows.
+
+        - Paths of this repository not in ``live_paths`` (deleted files)
+          are forgotten, and analyses no longer referenced by any path of
+          any repository are dropped.
+        - Report history is trimmed to the newest ``max_reports`` runs.
+        - While the database is larger than ``max_bytes``, the least
+          recently analyzed entries are removed.
+        """
+        self.flush()
+        removed = {"paths": 0, "analyses": 0, "reports": 0}
+        conn = self._conn
+
+        if live_paths is not None:
+            known = [
+                row[0] for row in conn.execute(
+                    "SELECT path FROM module_paths WHERE repository = ?", (self.repository,)
+                )
+            ]
+            gone = [(self.repository, p) for p in known if p not in live_paths]
+            conn.executemany("DELETE FROM module_paths WHERE repository = ? AND path = ?", gone)
+            removed["paths"] += len(gone)
+            removed["analyses"] += conn.execute(
+                """DELETE FROM analysis_cache WHERE content_hash NOT IN
+                   (SELECT content_hash FROM module_paths)"""
+            ).rowcount
+            self._drop_orphan_sketches()
+
+        if max_reports is not None:
+            removed["reports"] += conn.execute(
+                """DELETE FROM report_history WHERE id NOT IN
+                   (SELECT id FROM report_history ORDER BY id DESC LIMIT ?)""",
+                (max_reports,),
+            ).rowcount
+        conn.commit()
+
+        if max_bytes is not None:
+            while self.size_bytes() > max_bytes:
+                total = conn.execute("SELECT COUNT(*) FROM analysis_cache").fetchone()[0]
+                if total == 0:
+                    break
+                # Drop the oldest tenth per round, then let SQLite reuse the pages
+                batch = max(1, total // 10)
+                removed["analyses"] += conn.execute(
+                    """DELETE FROM analysis_cache WHERE rowid IN
+                       (SELECT rowid FROM analysis_cache ORDER BY last_analyzed LIMIT ?)""",
+                    (batch,),
+                ).rowcount
+                removed["paths"] += conn.execute(
+                    """DELETE FROM module_paths WHERE content_hash NOT IN
+                       (SELECT content_hash FROM analysis_cache)"""
+                ).rowcount
+                self._drop_orphan_sketches()
+                conn.commit()
+
+        return removed
+
+    def _drop_orphan_sketches(self):
+        self._conn.execute(
+            """DELETE FROM module_sketches WHERE content_hash NOT IN
+               (SELECT content_hash FROM analysis_cache)"""
+        )
+
+    def compact(self) -> tuple[int, int]:
+        """Compress legacy report rows, drop the legacy cache table, checkpoint the WAL and VACUUM.
+
+        Returns (file size before, file size after) in bytes.
+        """
+        self.flush()
+        before = self._file_size()
+        rows = self._conn.execute(
+            "SELECT id, report_json FROM report_history WHERE report_json IS NOT NULL"
+        ).fetchall()
+        for report_id, report_json in rows:
+            codec, blob = compress_blob(report_json.encode())
+            self._conn.execute(
+                """UPDATE report_history SET report_blob = ?, codec = ?, report_json = NULL
+                   WHERE id = ?""",
+                (blob, codec, report_id),
+            )
+        if self._has_legacy_table():
+            self._conn.execute("DROP TABLE module_cache")
+            log.info("Dropped legacy module_cache table")
+        self._conn.commit()
+        self._conn.execute("VACUUM")
+        self._conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        return before, self._file_size()
+
+    def _file_size(self) -> int:
+        wal = self.db_path.with_name(self.db_path.name + "-wal")
+        return sum(p.stat().st_size for p in (self.db_path, wal) if p.exists())
+
     def clear(self):
         """Clear all cache."""
-        self._conn.execute("DELETE FROM module_cache")
+        self.flush()
+        self._conn.execute("DELETE FROM analysis_cache")
+        self._conn.execute("DELETE FROM module_paths")
+        self._conn.execute("DELETE FROM module_sketches")
         self._conn.commit()
 
 
+def report_from_dict(data: dict[str, Any]) -> ArchitectureReport:
+    """Rebuild an ArchitectureReport from its asdict() / JSON form."""
+    data = dict(data)
+    graph = dict(data.get("dependency_graph") or {})
+    graph["nodes"] = {k: ModuleNode(**v) for k, v in graph.get("nodes", {}).items()}
+    graph["edges"] = [DependencyEdge(**e) for e in graph.get("edges", [])]
+    data["dependency_graph"] = DependencyGraph(**graph)
+    data["modules"] = [analysis_from_dict(m) for m in data.get("modules", [])]
+    data["quality_score"] = QualityScore(**(data.get("quality_score") or {}))
+    data["security_findings"] = [
+        SecurityFinding(**{**f, "severity": Severity(f["severity"])})
+        for f in data.get("security_findings", [])
+    ]
+    data["auto_fixes"] = [
+        AutoFix(**{**f, "fix_type": FixType(f["fix_type"])})
+        for f in data.get("auto_fixes", [])
+    ]
+    return ArchitectureReport(**data)
+
+
+def compress_blob(data: bytes) -> tuple[str, bytes]:
+    """Compress a stored blob with zstd when available, else zlib."""
+    if ZSTD_AVAILABLE:
+        return "zstd", zstandard.ZstdCompressor(level=10).compress(data)
+    return "zlib", zlib.compress(data, 9)
+
+
+def decompress_blob(codec: str, blob: bytes) -> bytes:
+    """Inverse of compress_blob."""
+    if codec == "zstd":
+        if not ZSTD_AVAILABLE:
+            raise RuntimeError("Report was stored with zstd but zstandard is not installed")
+        return zstandard.ZstdDecompressor().decompress(blob)
+    return zlib.decompress(blob)
+
+
+def cache_prompt_key(chunk_tokens: int = CHUNK_TOKEN_BUDGET) -> str:
+    """Cache fingerprint for the module and delta prompts, chunk budget and analyzer version.
+
+    Analyses derived from a neighbour with ``module_delta`` are cached like
+    any other, so that prompt's wording is part of the key too.
+    """
+    return (
+        f"{VERSION}-{prompt_fingerprint('module_analysis')}"
+        f"-{prompt_fingerprint('module_delta')}-c{chunk_tokens}"
+    )
+
+
+def analysis_from_dict(data: dict[str, Any], path: str | None = None) -> ModuleAnalysis:
+    """Rebuild a ModuleAnalysis (with enums and issues) from its asdict() form.
+
+    If ``path`` differs from the stored one, the analysis is rebound to it.
+    """
+    data = dict(data)
+    data["complexity"] = Complexity(data.get("complexity", "medium"))
+    data["issues"] = [
+        Issue(**{**i, "severity": Severity(i.get("severity", "info"))})
+        for i in data.get("issues", [])
+    ]
+    analysis = ModuleAnalysis(**data)
+    if path is not None and path != analysis.path:
+        old_stem, new_stem = analysis.name, Path(path).stem
+        analysis.path = path
+        analysis.name = new_stem
+        for issue in analysis.issues:
+            if issue.id.startswith(f"{old_stem}_"):
+                issue.id = new_stem + issue.id[len(old_stem):]
+    return analysis
+
+
 # ═══════════════════════════════════════════════════════════════════════════
 # Static Analyzer - Fast pattern-based analysis
 # ═══════════════════════════════════════════════════════════════════════════
@@ -330,27 +1093,49 @@ class StaticAnalyzer:
     """Fast static analysis without LLM."""
 
     # Patterns for Nix code analysis
-    IMPORT_PATTERN = re.compile(r"import\s+([^\s;]+)")
     OPTION_PATTERN = re.compile(r"(\w+)\s*=\s*(?:mkOption|mkEnableOption)")
     MKIF_PATTERN = re.compile(r"mkIf\s+config\.([^\s]+)")
     SERVICE_PATTERN = re.compile(r"systemd\.services\.(\w+)")
     HARDCODED_SECRET = re.compile(
-        r'(password|apiKey|secret|token)\s*=\s*"[^"]+"|\'[^\']+\'', re.IGNORECASE
+        r'(?=[pastPAST\'])(?:(password|apiKey|secret|token)\s*=\s*"[^"]+"|\'[^\']+\')',
+        re.IGNORECASE,
+    )
+    OPTION_NAME = re.compile(r"(\w+)\s*=\s*\Z")
+    SECURITY_KEYWORDS = re.compile(
+        r"firewall|security|hardening|permission|auth", re.IGNORECASE
+    )
+
+    # All list-producing patterns in one alternation, walked once by finditer.
+    # The leading lookahead lets the engine reject most offsets on a single
+    # character class before trying any alternative; option names are read
+    # backwards from the mkOption literal (OPTION_NAME) instead of trying
+    # \w+ at every offset.
+    SCAN_PATTERN = re.compile(
+        r"(?=[msfFShHpPaA])(?:"
+        r"(?P<opt>mk(?:Enable)?Option)"
+        r"|(?P<mkif>mkIf\s+config\.(?P<mkif_target>[^\s]+))"
+        r"|(?P<svc>systemd\.services\.(?P<svc_name>\w+))"
+        r"|(?P<kw>[Ff](?i:irewall)|[Ss](?i:ecurity)|[Hh](?i:ardening)"
+        r"|[Pp](?i:ermission)|[Aa](?i:uth)))"
     )
 
     def __init__(self, repo_root: Path):
         self.repo_root = repo_root
         self._all_modules: dict[str, Path] = {}
         self._import_graph: dict[str, set[str]] = {}
+        self.resolver = ImportResolver(repo_root)
+
+    EXCLUDED_DIRS = (".git", "node_modules", "result", "archive")
+    ROOT_MODULES = ("flake", "configuration", "default")  # never reported as orphans
 
     def discover_modules(self) -> list[Path]:
         """Find all Nix modules in the repository."""
         modules = []
         for nix_file in self.repo_root.rglob("*.nix"):
-            if any(p in nix_file.parts for p in [".git", "node_modules", "result", "archive"]):
+            if any(p in nix_file.parts for p in self.EXCLUDED_DIRS):
                 continue
             modules.append(nix_file)
-            self._all_modules[nix_file.stem] = nix_file
+            self._all_modules[str(nix_file.relative_to(self.repo_root))] = nix_file
         return modules
 
     def analyze(self, path: Path) -> dict[str, Any]:
@@ -359,87 +1144,272 @@ class StaticAnalyzer:
             content = path.read_text()
         except Exception as e:
             return {"error": str(e)}
+        return self.analyze_content(content)
+
+    @classmethod
+    def analyze_content(cls, content: str) -> dict[str, Any]:
+        """Perform static analysis on module source text.
+
+        Options, services, mkIf dependencies and security keywords all come
+        from a single ``SCAN_PATTERN`` pass; imports come from the Nix
+        tokenizer in ``resolver`` and the hardcoded secret check runs
+        separately (it stops at the first hit).
+        """
+        options: list[str] = []
+        services: list[str] = []
+        config_deps: list[str] = []
+        has_security = False
+        keywords = cls.SECURITY_KEYWORDS
+
+        for m in cls.SCAN_PATTERN.finditer(content):
+            kind = m.lastgroup
+            if kind == "opt":
+                start = m.start()
+                name = cls.OPTION_NAME.search(content, max(0, start - 256), start)
+                if not name:
+                    continue
+                options.append(name.group(1))
+                if not has_security and keywords.search(name.group(1)):
+                    has_security = True
+                continue
+            elif kind == "mkif":
+                target = m.group("mkif_target")
+                config_deps.append(target)
+                # The target is consumed whole, so services named in it
+                # (mkIf config.systemd.services.foo.enable) are read here
+                if "systemd.services." in target:
+                    services.extend(cls.SERVICE_PATTERN.findall(target))
+            elif kind == "svc":
+                services.append(m.group("svc_name"))
+            else:
+                has_security = True
+                continue
+            # Keywords inside a consumed structural match still count
+            if not has_security and keywords.search(m.group()):
+                has_security = True
 
         lines = content.splitlines()
-        
-        # Basic metrics
-        result = {
+        blank = comments = 0
+        for line in lines:
+            stripped = line.lstrip()
+            if not stripped:
+                blank += 1
+            elif stripped[0] == "#":
+                comments += 1
+
+        return {
             "lines_of_code": len(lines),
-            "blank_lines": sum(1 for l in lines if not l.strip()),
-            "comment_lines": sum(1 for l in lines if l.strip().startswith("#")),
+            "blank_lines": blank,
+            "comment_lines": comments,
             "has_documentation": "description" in content or "# " in content[:500],
+            "imports": extract_imports(content),
+            "options_count": len(options),
+            "options_defined": options,
+            "services_defined": services,
+            "has_security_content": has_security,
+            "hardcoded_secrets": bool(cls.HARDCODED_SECRET.search(content)),
+            "config_dependencies": config_deps,
         }
 
-        # Imports
-        result["imports"] = self.IMPORT_PATTERN.findall(content)
-        result["options_count"] = len(self.OPTION_PATTERN.findall(content))
-        result["options_defined"] = self.OPTION_PATTERN.findall(content)
-
-        # Services
-        result["services_defined"] = self.SERVICE_PATTERN.findall(content)
-
-        # Security checks
-        result["has_security_content"] = any(
-            k in content.lower()
-            for k in ["firewall", "security", "hardening", "permission", "auth"]
+    def changed_since(self, rev_range: str) -> tuple[list[Path], list[str]]:
+        """Nix files changed in a git revision range.
+
+        ``rev_range`` is anything ``git diff`` accepts (``HEAD~1``,
+        ``main..HEAD``); a single revision is compared with the work tree,
+        including untracked files.
+
+        Returns:
+            Tuple of (added or modified paths, removed relative paths)
+        """
+        result = subprocess.run(
+            ["git", "-C", str(self.repo_root), "diff", "--name-status", "-z",
+             "--no-renames", "--relative", rev_range, "--", "*.nix"],
+            capture_output=True,
+            text=True,
+            check=True,
         )
-        result["hardcoded_secrets"] = bool(self.HARDCODED_SECRET.search(content))
+        fields = result.stdout.split("\0")
+        entries = list(zip(fields[::2], fields[1::2]))
+        if ".." not in rev_range:
+            untracked = subprocess.run(
+                ["git", "-C", str(self.repo_root), "ls-files", "-z", "--others",
+                 "--exclude-standard", "--", "*.nix"],
+                capture_output=True,
+                text=True,
+                check=True,
+            )
+            entries += [("A", p) for p in untracked.stdout.split("\0") if p]
 
-        # mkIf dependencies
-        result["config_dependencies"] = self.MKIF_PATTERN.findall(content)
+        changed, removed = [], []
+        for status, rel_path in entries:
+            if any(p in Path(rel_path).parts for p in self.EXCLUDED_DIRS):
+                continue
+            if status.startswith("D"):
+                removed.append(rel_path)
+            else:
+                changed.append(self.repo_root / rel_path)
+        return changed, removed
+
+    def ingest(self, modules: list[Path], workers: int | None = None) -> list[SourceFile]:
+        """Read, hash and statically analyze every module exactly once.
+
+        Files are processed on a process pool so the regex passes scale with
+        cores; small repositories (or ``workers=1``) are handled in-process.
+        """
+        workers = workers or os.cpu_count() or 1
+        paths = [str(p) for p in modules]
+
+        if workers > 1 and len(paths) >= INGEST_PARALLEL_THRESHOLD:
+            chunksize = max(1, len(paths) // (workers * 4))
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                results = list(pool.map(_ingest_file, paths, chunksize=chunksize))
+        else:
+            results = [_ingest_file(p) for p in paths]
+
+        sources = []
+        for path, (content, content_hash, static) in zip(modules, results):
+            sources.append(
+                SourceFile(
+                    path=path,
+                    rel_path=str(path.relative_to(self.repo_root)),
+                    category=self._extract_category(path),
+                    content=content or "",
+                    content_hash=content_hash,
+                    static=static,
+                    error=static.get("error"),
+                )
+            )
+        return sources
 
-        return result
+    def build_import_graph(
+        self, modules: list[Path], sources: list[SourceFile] | None = None
+    ) -> DependencyGraph:
+        """Build dependency graph from imports.
 
-    def build_import_graph(self, modules: list[Path]) -> DependencyGraph:
-        """Build dependency graph from imports."""
+        When ``sources`` from ``ingest`` are given, their already-extracted
+        imports are used instead of re-reading each file.
+        """
         graph = DependencyGraph()
+        known_imports = {s.path: s.static.get("imports", []) for s in sources or []}
 
         # Add all modules as nodes
         for path in modules:
-            category = self._extract_category(path)
-            graph.nodes[path.stem] = ModuleNode(
-                name=path.stem,
-                category=category,
-                path=str(path.relative_to(self.repo_root)),
-            )
+            self._add_node(graph, path)
 
         # Parse imports and build edges
-        imported_by: dict[str, set[str]] = {m.stem: set() for m in modules}
-        
         for path in modules:
             try:
-                content = path.read_text()
-                imports = self.IMPORT_PATTERN.findall(content)
-                
-                for imp in imports:
-                    # Extract module name from import
-                    imp_name = imp.split("/")[-1].replace(".nix", "").strip("./")
-                    if imp_name in graph.nodes and imp_name != path.stem:
-                        graph.edges.append(
-                            DependencyEdge(source=path.stem, target=imp_name)
-                        )
-                        graph.nodes[path.stem].out_degree += 1
-                        graph.nodes[imp_name].in_degree += 1
-                        imported_by[imp_name].add(path.stem)
+                imports = known_imports.get(path)
+                if imports is None:
+                    imports = extract_imports(path.read_text())
+                self._add_edges(graph, path, imports)
             except Exception:
                 continue
 
-        # Find orphans (modules not imported by anything except default.nix)
-        for name, node in graph.nodes.items():
-            importers = imported_by.get(name, set())
-            # Filter out default.nix as importer
-            real_importers = {i for i in importers if i != "default"}
-            if node.in_degree == 0 or (len(real_importers) == 0 and name != "default"):
-                if name not in ["flake", "configuration", "default"]:
-                    graph.orphans.append(name)
+        self._finalize_graph(graph)
+        return graph
 
-        # Find entry points (high out-degree, low in-degree)
-        for name, node in graph.nodes.items():
-            if node.out_degree > 3 and node.in_degree <= 1:
-                graph.entry_points.append(name)
+    def update_import_graph(
+        self,
+        graph: DependencyGraph,
+        changed: list[SourceFile],
+        removed: list[str],
+    ) -> DependencyGraph:
+        """Patch a graph in place for changed/added and removed modules.
+
+        Only the outgoing edges of changed modules are rebuilt; degrees,
+        orphans and graph metrics are then recomputed.
+        """
+        removed_keys = set(removed)
+        stale_sources = {s.rel_path for s in changed} | removed_keys
+
+        graph.edges = [
+            e for e in graph.edges
+            if e.source not in stale_sources and e.target not in removed_keys
+        ]
+        for key in removed_keys:
+            graph.nodes.pop(key, None)
+
+        for source in changed:
+            self._add_node(graph, source.path)
+        for source in changed:
+            self._add_edges(graph, source.path, source.static.get("imports", []))
 
+        self._finalize_graph(graph)
         return graph
 
+    @staticmethod
+    def is_path_keyed(graph: DependencyGraph) -> bool:
+        """False for graphs saved before nodes were keyed by relative path."""
+        return all(key == node.path for key, node in graph.nodes.items())
+
+    def _add_node(self, graph: DependencyGraph, path: Path):
+        rel_path = str(path.relative_to(self.repo_root))
+        graph.nodes[rel_path] = ModuleNode(
+            name=path.stem,
+            category=self._extract_category(path),
+            path=rel_path,
+        )
+
+    def _add_edges(self, graph: DependencyGraph, path: Path, imports: list[str]):
+        source = str(path.relative_to(self.repo_root))
+        for imp in imports:
+            target = self.resolver.resolve(path, imp)
+            if target in graph.nodes and target != source:
+                graph.edges.append(DependencyEdge(source=source, target=target))
+
+    def _finalize_graph(self, graph: DependencyGraph):
+        """Recompute degrees, orphans, entry points and graph metrics."""
+        index = ModuleGraph.from_dependency_graph(graph)
+        # Parallel import statements collapse into one edge
+        graph.edges = [
+            DependencyEdge(source=source, target=target)
+            for source in sorted(index.succ)
+            for target in sorted(index.succ[source])
+        ]
+
+        layer_of = {
+            key: depth for depth, layer in enumerate(index.layers()) for key in layer
+        }
+        centrality = index.betweenness()
+        for key, node in graph.nodes.items():
+            node.in_degree = len(index.pred[key])
+            node.out_degree = len(index.succ[key])
+            node.layer = layer_of[key]
+            node.centrality = round(centrality[key], 6)
+
+        graph.strongly_connected = index.cycles()
+        graph.layer_count = max(layer_of.values(), default=-1) + 1
+
+        # Orphans: imported by nothing and not a conventional root
+        graph.orphans = sorted(
+            key for key, node in graph.nodes.items()
+            if node.in_degree == 0 and node.name not in self.ROOT_MODULES
+        )
+
+        # Find entry points (high out-degree, low in-degree)
+        graph.entry_points = sorted(
+            key for key, node in graph.nodes.items()
+            if node.out_degree > 3 and node.in_degree <= 1
+        )
+
+    def importers_of(self, graph: DependencyGraph, paths: list[str]) -> list[Path]:
+        """Modules with an edge into any of ``paths`` (reverse dependencies)."""
+        index = ModuleGraph.from_dependency_graph(graph)
+        targets = set(paths)
+        importers = {
+            importer for key in targets if key in index for importer in index.pred[key]
+        } - targets
+        return [
+            self.repo_root / key
+            for key in sorted(importers)
+            if (self.repo_root / key).exists()
+        ]
+
+    def impact_of(self, graph: DependencyGraph, paths: list[str]) -> set[str]:
+        """Every module that transitively imports any of ``paths``."""
+        return ModuleGraph.from_dependency_graph(graph).impact(paths)
+
     def _extract_category(self, path: Path) -> str:
         """Extract module category from path."""
         try:
@@ -450,145 +1420,468 @@ class StaticAnalyzer:
             return "root"
 
 
+def content_digest(content: str) -> str:
+    """Full BLAKE2b digest of module content (content-addressed cache key)."""
+    return hashlib.blake2b(content.encode(), digest_size=32).hexdigest()
+
+
+def _ingest_file(path: str) -> tuple[str | None, str, dict[str, Any]]:
+    """Read, hash and analyze one file (process-pool worker)."""
+    try:
+        content = Path(path).read_text()
+    except Exception as e:
+        return None, "", {"error": str(e)}
+    return content, content_digest(content), StaticAnalyzer.analyze_content(content)
+
+
 # ═══════════════════════════════════════════════════════════════════════════
 # LLM Analyzer - Semantic analysis with LLM
 # ═══════════════════════════════════════════════════════════════════════════
 
+@dataclass
+class _PromptJob:
+    """A module whose prompts are built and waiting for an LLM worker.
+
+    Modules over the chunk budget carry one prompt per chunk.
+    """
+    source: SourceFile
+    system: str
+    prompts: list[str]
+    chunks: list[Chunk]
+    start_time: float
+
+
+@dataclass
+class _DerivedJob:
+    """A near-duplicate module to derive from an analyzed neighbour."""
+    source: SourceFile
+    base_hash: str
+    score: float
+
+
 class LLMAnalyzer:
-    """LLM-powered semantic analysis."""
+    """LLM-powered semantic analysis.
 
-    def __init__(self, client: OllamaClient, repo_root: Path, cache: CacheLayer | None = None):
+    With ``dedup`` enabled, a module whose similarity sketch is within
+    ``similarity.DELTA_THRESHOLD`` of an already-analyzed module is derived from it by
+    sending only the diff. The neighbour's analysis is reused without an
+    LLM call only when the two modules have identical token sequences
+    (layout changes only), and then without line numbers.
+    """
+
+    def __init__(
+        self,
+        client: OllamaClient,
+        repo_root: Path,
+        cache: CacheLayer | None = None,
+        stream: bool = True,
+        queue_size: int = PROMPT_QUEUE_SIZE,
+        chunk_tokens: int = CHUNK_TOKEN_BUDGET,
+        dedup: bool = True,
+    ):
         self.client = client
         self.repo_root = repo_root
         self.cache = cache
-
-    def _get_content_hash(self, path: Path) -> str:
-        """Generate hash for cache key."""
-        try:
-            content = path.read_text()
-            return hashlib.md5(content.encode()).hexdigest()[:12]
-        except Exception:
-            return ""
-
-    async def analyze_module(self, path: Path, static: dict[str, Any]) -> ModuleAnalysis:
+        self.stream = stream
+        self.queue_size = queue_size
+        self.chunk_tokens = chunk_tokens
+        self.dedup = dedup
+        self.dedup_stats = {"reused": 0, "delta": 0, "fallback": 0}
+        # Sketches of modules analyzed this run, stored once their analysis is
+        self._sketches: dict[str, tuple[str, int, Sketch, str]] = {}
+        # Successful analyses and sources by digest, for deriving neighbours
+        self._analyzed: dict[str, ModuleAnalysis] = {}
+        self._contents: dict[str, str] = {}
+
+    async def analyze_module(self, source: SourceFile) -> ModuleAnalysis:
         """Analyze a single module with LLM."""
         start_time = time.monotonic()
-        content_hash = self._get_content_hash(path)
-        rel_path = str(path.relative_to(self.repo_root))
 
-        # Check cache
-        if self.cache:
-            cached = self.cache.get(rel_path, content_hash)
-            if cached:
-                log.debug(f"Cache hit: {path.name}")
-                return cached
+        cached = self._lookup_cache(source)
+        if cached:
+            return cached
 
         try:
-            content = path.read_text()
-            category = self._extract_category(path)
-
-            # Truncate large files
-            code_for_llm = content[:6000] if len(content) > 6000 else content
+            job = self._prepare(source, start_time)
+        except Exception as e:
+            return self._failed(source, e, start_time)
+        return await self._run_job(job)
 
-            # Get prompt
+    def _lookup_cache(self, source: SourceFile) -> ModuleAnalysis | None:
+        """Return the cached analysis for ``source`` if its hash still matches."""
+        if not self.cache or source.error:
+            return None
+        cached = self.cache.get(source.rel_path, source.content_hash)
+        if cached:
+            log.debug(f"Cache hit: {source.path.name}")
+        return cached
+
+    def _prepare(self, source: SourceFile, start_time: float) -> _PromptJob:
+        """Build the LLM prompts for an ingested module."""
+        if source.error:
+            raise OSError(source.error)
+
+        # Large files are split on binding boundaries instead of truncated
+        chunks = split_source(source.content, self.chunk_tokens, "nix")
+        system, prompts = "", []
+        for chunk in chunks:
+            filename = source.rel_path
+            if chunk.total > 1:
+                # No file line range: the model numbers lines from the start
+                # of the part, and the merge shifts them to file lines
+                filename += f" (part {chunk.index + 1}/{chunk.total})"
             system, prompt = get_prompt(
                 "module_analysis",
-                filename=rel_path,
-                category=category,
-                lines=static.get("lines_of_code", 0),
-                code=code_for_llm,
+                filename=filename,
+                category=source.category,
+                lines=source.static.get("lines_of_code", 0),
+                code=chunk.text,
             )
+            prompts.append(prompt)
+        return _PromptJob(
+            source=source, system=system, prompts=prompts, chunks=chunks, start_time=start_time
+        )
 
-            # LLM analysis
-            response = await self.client.generate(prompt, system)
-            data = self._parse_json(response)
-
-            # Build analysis object
-            analysis = ModuleAnalysis(
-                path=rel_path,
-                name=path.stem,
-                category=category,
-                purpose=data.get("purpose", ""),
-                complexity=Complexity(data.get("complexity", "medium")),
-                dependencies=data.get("dependencies", []),
-                imports=static.get("imports", []),
-                options_defined=data.get("options_defined", []),
-                security_concerns=data.get("security_concerns", []),
-                recommendations=data.get("recommendations", []),
-                lines_of_code=static.get("lines_of_code", 0),
-                has_documentation=static.get("has_documentation", False),
-                analysis_time_ms=int((time.monotonic() - start_time) * 1000),
-                content_hash=content_hash,
+    async def _run_job(self, job: _PromptJob) -> ModuleAnalysis:
+        """Send a prepared prompt to the LLM and build the analysis."""
+        try:
+            responses = await asyncio.gather(*(
+                self.client.generate(prompt, job.system, stream=self.stream)
+                for prompt in job.prompts
+            ))
+            data = merge_module_results(
+                [self._parse_json(r) for r in responses], job.chunks
             )
+            return self._build_analysis(job.source, data, job.start_time)
+        except Exception as e:
+            return self._failed(job.source, e, job.start_time)
 
-            # Parse issues
-            for issue_data in data.get("issues", []):
-                analysis.issues.append(
-                    Issue(
-                        id=f"{path.stem}_{len(analysis.issues)}",
-                        severity=Severity(issue_data.get("severity", "info")),
-                        category="llm_detected",
-                        message=issue_data.get("message", ""),
-                        line=issue_data.get("line"),
-                    )
-                )
+    def _build_analysis(
+        self,
+        source: SourceFile,
+        data: dict[str, Any],
+        start_time: float,
+        derived_from: str | None = None,
+    ) -> ModuleAnalysis:
+        """Turn parsed LLM output into a ModuleAnalysis and cache it."""
+        path, static = source.path, source.static
+        analysis = ModuleAnalysis(
+            path=source.rel_path,
+            name=path.stem,
+            category=source.category,
+            purpose=data.get("purpose", ""),
+            complexity=Complexity(data.get("complexity", "medium")),
+            dependencies=data.get("dependencies", []),
+            imports=static.get("imports", []),
+            options_defined=data.get("options_defined", []),
+            security_concerns=data.get("security_concerns", []),
+            recommendations=data.get("recommendations", []),
+            lines_of_code=static.get("lines_of_code", 0),
+            has_documentation=static.get("has_documentation", False),
+            analysis_time_ms=int((time.monotonic() - start_time) * 1000),
+            content_hash=source.content_hash,
+            derived_from=derived_from,
+        )
 
-            # Add static analysis issues
-            if static.get("hardcoded_secrets"):
-                analysis.issues.append(
-                    Issue(
-                        id=f"{path.stem}_secret",
-                        severity=Severity.CRITICAL,
-                        category="security",
-                        message="Potential hardcoded secret detected",
-                        fixable=True,
-                    )
+        # Parse issues
+        for issue_data in data.get("issues", []):
+            analysis.issues.append(
+                Issue(
+                    id=f"{path.stem}_{len(analysis.issues)}",
+                    severity=Severity(issue_data.get("severity", "info")),
+                    category="llm_detected",
+                    message=issue_data.get("message", ""),
+                    line=issue_data.get("line"),
                 )
+            )
 
-            # Cache result
-            if self.cache:
-                self.cache.set(rel_path, content_hash, analysis)
+        # Add static analysis issues
+        if static.get("hardcoded_secrets"):
+            analysis.issues.append(
+                Issue(
+                    id=f"{path.stem}_secret",
+                    severity=Severity.CRITICAL,
+                    category="security",
+                    message="Potential hardcoded secret detected",
+                    fixable=True,
+                )
+            )
 
-            return analysis
+        # Cache result, and make it a base for later near-duplicates
+        if self.cache:
+            self.cache.set(source.rel_path, source.content_hash, analysis)
+            if source.content_hash in self._sketches:
+                category, lines, sk, content = self._sketches.pop(source.content_hash)
+                self.cache.add_sketch(source.content_hash, category, lines, sk, content)
+        self._analyzed[source.content_hash] = analysis
+        self._contents[source.content_hash] = source.content
+
+        return analysis
+
+    def _failed(self, source: SourceFile, error: Exception, start_time: float) -> ModuleAnalysis:
+        """Build the placeholder analysis for a module that could not be analyzed."""
+        log.error(f"Error analyzing {source.path}: {error}")
+        return ModuleAnalysis(
+            path=source.rel_path,
+            name=source.path.stem,
+            category=source.category,
+            error=str(error),
+            analysis_time_ms=int((time.monotonic() - start_time) * 1000),
+        )
 
-        except Exception as e:
-            log.error(f"Error analyzing {path}: {e}")
-            return ModuleAnalysis(
-                path=rel_path,
-                name=path.stem,
-                category=self._extract_category(path),
-                error=str(e),
-                analysis_time_ms=int((time.monotonic() - start_time) * 1000),
-            )
+    @staticmethod
+    def _priority(static: dict[str, Any]) -> int:
+        """Scheduling weight: larger, option-heavy modules go first."""
+        return (
+            static.get("lines_of_code", 0)
+            + 10 * static.get("options_count", 0)
+            + 25 * len(static.get("services_defined", []))
+        )
 
     async def analyze_all(
-        self, modules: list[Path], static_results: dict[Path, dict]
+        self,
+        sources: list[SourceFile],
+        on_result: Callable[[ModuleAnalysis], Any] | None = None,
+        refresh: set[str] | None = None,
     ) -> list[ModuleAnalysis]:
-        """Analyze all modules in parallel."""
-        log.info(f"Analyzing {len(modules)} modules with LLM...")
+        """Analyze all modules through a bounded producer/consumer pipeline.
+
+        Cache hits are resolved up front; misses are queued heaviest first.
+        At most ``queue_size`` prompts are built ahead of the workers, and
+        ``on_result`` (sync or async) receives each analysis as it completes.
+        Paths in ``refresh`` bypass the cache lookup. Near-duplicates of a
+        module analyzed in this run are held back until it completes.
+        Results are returned in the order of ``sources``.
+        """
+        log.info(f"Analyzing {len(sources)} modules with LLM...")
+
+        results: dict[str, ModuleAnalysis] = {}
+
+        async def emit(source: SourceFile, analysis: ModuleAnalysis):
+            results[source.rel_path] = analysis
+            if on_result:
+                ret = on_result(analysis)
+                if asyncio.iscoroutine(ret):
+                    await ret
+
+        # Resolve cache hits first so misses can be scheduled by weight
+        hits: list[SourceFile] = []
+        misses: list[SourceFile] = []
+        with span("cache_lookup", modules=len(sources)) as info:
+            for source in sources:
+                cached = None
+                if not refresh or source.rel_path not in refresh:
+                    cached = self._lookup_cache(source)
+                if cached:
+                    hits.append(source)
+                    self._analyzed[source.content_hash] = cached
+                    self._contents[source.content_hash] = source.content
+                    await emit(source, cached)
+                else:
+                    misses.append(source)
+            info["hits"] = len(hits)
+
+        misses.sort(key=lambda s: -self._priority(s.static))
+        if misses:
+            log.info(f"   {len(sources) - len(misses)} cached, {len(misses)} to analyze")
+
+        # Near-duplicates of a module analyzed earlier run with everything
+        # else; those of a module analyzed in this run wait for it
+        if self.dedup:
+            with span("dedup_plan"):
+                jobs, late = self._plan_dedup(hits, misses, refresh or set())
+        else:
+            jobs, late = list(misses), []
+
+        for batch in (jobs, late):
+            if batch:
+                with span("llm_pipeline", modules=len(batch)):
+                    await self._run_pipeline(batch, emit)
+
+        if any(self.dedup_stats.values()):
+            ds = self.dedup_stats
+            log.info(
+                f"♻️  Near-duplicates: {ds['reused']} reused, {ds['delta']} analyzed as diffs, "
+                f"{ds['fallback']} fell back to full analysis"
+            )
 
-        tasks = [
-            self.analyze_module(path, static_results.get(path, {}))
-            for path in modules
-        ]
-        results = await asyncio.gather(*tasks, return_exceptions=True)
-
-        analyses = []
-        for i, result in enumerate(results):
-            if isinstance(result, Exception):
-                log.error(f"Analysis failed for {modules[i]}: {result}")
-                analyses.append(
-                    ModuleAnalysis(
-                        path=str(modules[i]),
-                        name=modules[i].stem,
-                        category="error",
-                        error=str(result),
-                    )
+        return [results[source.rel_path] for source in sources]
+
+    async def _run_pipeline(
+        self,
+        items: list[SourceFile | _DerivedJob],
+        emit: Callable[[SourceFile, ModuleAnalysis], Any],
+    ):
+        """Feed modules through a bounded prompt queue to LLM workers."""
+        if not items:
+            return
+        queue: asyncio.Queue[_PromptJob | _DerivedJob | None] = asyncio.Queue(
+            maxsize=self.queue_size
+        )
+        workers = max(1, min(self.client.max_concurrent, len(items)))
+
+        async def produce():
+            for item in items:
+                if isinstance(item, _DerivedJob):
+                    await queue.put(item)
+                    continue
+                start_time = time.monotonic()
+                try:
+                    with span("prepare", "module", path=item.rel_path):
+                        job = self._prepare(item, start_time)
+                except Exception as e:
+                    await emit(item, self._failed(item, e, start_time))
+                    continue
+                await queue.put(job)
+            for _ in range(workers):
+                await queue.put(None)
+
+        async def consume():
+            while (job := await queue.get()) is not None:
+                with span("module", "module", path=job.source.rel_path) as info:
+                    if isinstance(job, _DerivedJob):
+                        info["similarity"] = round(job.score, 3)
+                        analysis = await self._run_derived(job)
+                    else:
+                        # Time the built prompts sat in the queue
+                        info["queued_ms"] = int((time.monotonic() - job.start_time) * 1000)
+                        info["prompts"] = len(job.prompts)
+                        analysis = await self._run_job(job)
+                    if analysis.derived_from:
+                        info["derived_from"] = analysis.derived_from
+                    if analysis.error:
+                        info["error"] = analysis.error
+                await emit(job.source, analysis)
+
+        await asyncio.gather(produce(), *(consume() for _ in range(workers)))
+
+    def _plan_dedup(
+        self, hits: list[SourceFile], misses: list[SourceFile], refresh: set[str]
+    ) -> tuple[list[SourceFile | _DerivedJob], list[_DerivedJob]]:
+        """Split misses into full analyses and near-duplicates to derive.
+
+        Returns (jobs runnable now, derived jobs whose base is analyzed in
+        this run). Misses are visited heaviest first, so the largest module
+        of a family becomes its base. Paths in ``refresh`` are always
+        analyzed in full, since their cached neighbour may be themselves.
+        """
+        index = SimilarityIndex()
+        if self.cache:
+            for entry in self.cache.load_sketches():
+                index.add(entry)
+        # Hits cached before sketches existed join the index lazily
+        for source in hits:
+            if source.content_hash in index or source.error:
+                continue
+            sk = sketch(source.content)
+            lines = source.static.get("lines_of_code", 0)
+            index.add(IndexEntry(source.content_hash, sk, lines, source.category))
+            if self.cache and sk:
+                self.cache.add_sketch(
+                    source.content_hash, source.category, lines, sk, source.content
                 )
-            else:
-                analyses.append(result)
 
-        return analyses
+        now: list[SourceFile | _DerivedJob] = []
+        late: list[_DerivedJob] = []
+        in_run: set[str] = set()
+        for source in misses:
+            if source.error or source.rel_path in refresh:
+                now.append(source)
+                continue
+            sk = sketch(source.content)
+            lines = source.static.get("lines_of_code", 0)
+            match = index.best_match(sk, lines, source.category) if sk else None
+            if sk:
+                self._sketches[source.content_hash] = (source.category, lines, sk, source.content)
+            if match is None:
+                now.append(source)
+                index.add(IndexEntry(source.content_hash, sk, lines, source.category))
+                in_run.add(source.content_hash)
+                continue
+            entry, score = match
+            job = _DerivedJob(source, entry.key, score)
+            (late if entry.key in in_run else now).append(job)
+        return now, late
+
+    async def _run_derived(self, job: _DerivedJob) -> ModuleAnalysis:
+        """Derive a near-duplicate's analysis, or analyze it in full."""
+        source = job.source
+        start_time = time.monotonic()
+        base = self._analyzed.get(job.base_hash)
+        if base is None and self.cache:
+            base = self.cache.peek(job.base_hash)
+        base_content = self._contents.get(job.base_hash)
+        if base_content is None and self.cache:
+            base_content = self.cache.get_content(job.base_hash)
+
+        # Without the neighbour's source there is no diff to check, so no shortcut
+        if base is not None and not base.error and base_content is not None:
+            try:
+                if job.score >= REUSE_THRESHOLD and tokenize(base_content) == tokenize(
+                    source.content
+                ):
+                    # Same tokens, different layout: same findings, but lines may have moved
+                    data = self._analysis_payload(base)
+                    for issue in data["issues"]:
+                        issue["line"] = None
+                    self.dedup_stats["reused"] += 1
+                else:
+                    data = await self._analyze_delta(source, base, base_content)
+                    if data:
+                        self.dedup_stats["delta"] += 1
+                if data:
+                    log.debug(
+                        f"Derived {source.rel_path} from {base.path} ({job.score:.2f})"
+                    )
+                    return self._build_analysis(
+                        source, data, start_time, derived_from=base.path
+                    )
+            except Exception as e:
+                log.debug(f"Deriving {source.rel_path} failed: {e}")
+
+        self.dedup_stats["fallback"] += 1
+        try:
+            prepared = self._prepare(source, start_time)
+        except Exception as e:
+            return self._failed(source, e, start_time)
+        return await self._run_job(prepared)
+
+    async def _analyze_delta(
+        self, source: SourceFile, base: ModuleAnalysis, base_content: str
+    ) -> dict[str, Any] | None:
+        """Ask the LLM to update ``base``'s analysis for the diff to ``source``."""
+        diff = unified_delta(base_content, source.content, base.path, source.rel_path)
+        # A diff this large is no cheaper than analyzing the module itself
+        if estimate_tokens(diff) > min(self.chunk_tokens, estimate_tokens(source.content) // 2):
+            return None
+        system, prompt = get_prompt(
+            "module_delta",
+            filename=source.rel_path,
+            category=source.category,
+            lines=source.static.get("lines_of_code", 0),
+            reference=base.path,
+            reference_analysis=json.dumps(self._analysis_payload(base), indent=1),
+            diff=diff,
+        )
+        response = await self.client.generate(prompt, system, stream=self.stream)
+        return self._parse_json(response) or None
+
+    @staticmethod
+    def _analysis_payload(analysis: ModuleAnalysis) -> dict[str, Any]:
+        """The LLM-derived fields of an analysis, in module_analysis JSON form."""
+        return {
+            "purpose": analysis.purpose,
+            "complexity": analysis.complexity.value,
+            "dependencies": analysis.dependencies,
+            "options_defined": analysis.options_defined,
+            "security_concerns": analysis.security_concerns,
+            "issues": [
+                {"severity": i.severity.value, "message": i.message, "line": i.line}
+                for i in analysis.issues
+                if i.category == "llm_detected"
+            ],
+            "recommendations": analysis.recommendations,
+        }
 
     async def generate_summary(self, report: ArchitectureReport) -> dict[str, Any]:
         """Generate architecture summary with LLM."""
@@ -627,7 +1920,9 @@ class LLMAnalyzer:
             orphan_modules=orphan_breakdown,
         )
 
-        response = await self.client.generate(prompt, system, temperature=0.2)
+        response = await self.client.generate(
+            prompt, system, temperature=0.2, stream=self.stream
+        )
         return self._parse_json(response)
 
     def _parse_json(self, response: str) -> dict[str, Any]:
@@ -676,8 +1971,9 @@ class LLMAnalyzer:
 class SelfAnalyzer:
     """Self-analysis for quality scoring and improvement."""
 
-    def __init__(self, client: OllamaClient):
+    def __init__(self, client: OllamaClient, chunk_tokens: int = CHUNK_TOKEN_BUDGET):
         self.client = client
+        self.chunk_tokens = chunk_tokens
 
     async def analyze_self(self) -> dict[str, Any]:
         """Analyze this analyzer's code quality."""
@@ -689,15 +1985,19 @@ class SelfAnalyzer:
         content = analyzer_path.read_text()
         lines = len(content.splitlines())
 
-        system, prompt = get_prompt(
-            "self_analysis",
-            filename=analyzer_path.name,
-            lines=lines,
-            code=content[:8000],  # Truncate for LLM
-        )
+        chunks = split_source(content, self.chunk_tokens, "python")
+        requests = []
+        for chunk in chunks:
+            filename = analyzer_path.name
+            if chunk.total > 1:
+                filename += f" (part {chunk.index + 1}/{chunk.total})"
+            system, prompt = get_prompt(
+                "self_analysis", filename=filename, lines=lines, code=chunk.text
+            )
+            requests.append(self.client.generate(prompt, system, temperature=0.2))
 
-        response = await self.client.generate(prompt, system, temperature=0.2)
-        return self._parse_json(response)
+        responses = await asyncio.gather(*requests)
+        return merge_self_results([self._parse_json(r) for r in responses], chunks)
 
     def calculate_quality_score(self, report: ArchitectureReport) -> QualityScore:
         """Calculate overall quality score."""
@@ -765,12 +2065,17 @@ class SelfAnalyzer:
 # ═══════════════════════════════════════════════════════════════════════════
 
 class AutoCorrector:
-    """Generate and apply automatic fixes."""
+    """Generate and apply automatic fixes.
+
+    Fixes are generated concurrently (the client's concurrency limit
+    bounds in-flight requests) and applied in one atomic write per file,
+    after the original has been backed up under ``backup_dir``.
+    """
 
-    def __init__(self, client: OllamaClient, repo_root: Path):
+    def __init__(self, client: OllamaClient, repo_root: Path, backup_dir: Path = FIX_BACKUP_DIR):
         self.client = client
         self.repo_root = repo_root
-        self._backups: dict[str, str] = {}
+        self.backups = BackupStore(backup_dir)
 
     async def generate_fix(self, module: ModuleAnalysis, issue: Issue) -> AutoFix | None:
         """Generate fix for an issue."""
@@ -780,9 +2085,18 @@ class AutoCorrector:
         path = self.repo_root / module.path
         if not path.exists():
             return None
-
         try:
             content = path.read_text()
+        except OSError as e:
+            log.error(f"Failed to read {module.path}: {e}")
+            return None
+        return await self._generate_fix(module, issue, content)
+
+    async def _generate_fix(
+        self, module: ModuleAnalysis, issue: Issue, content: str
+    ) -> AutoFix | None:
+        """Generate a fix for ``issue`` against the already-read ``content``."""
+        try:
             lines = content.splitlines()
             
             # Context around issue
@@ -827,65 +2141,95 @@ class AutoCorrector:
             return None
 
     async def generate_all_fixes(self, report: ArchitectureReport) -> list[AutoFix]:
-        """Generate fixes for all fixable issues."""
-        fixes = []
-        
-        for module in report.modules:
-            for issue in module.issues:
-                if issue.fixable:
-                    fix = await self.generate_fix(module, issue)
-                    if fix:
-                        fixes.append(fix)
-
-        return fixes
-
-    def apply_fix(self, fix: AutoFix, dry_run: bool = True) -> bool:
-        """Apply a fix to the codebase."""
-        path = self.repo_root / fix.module
-        
-        if not path.exists():
-            log.error(f"File not found: {path}")
-            return False
-
-        try:
-            content = path.read_text()
-            lines = content.splitlines()
-
-            # Backup before modification
-            if not dry_run:
-                self._backups[str(path)] = content
-
-            # Apply fix
-            new_lines = (
-                lines[: fix.line_start - 1]
-                + fix.fixed_content.splitlines()
-                + lines[fix.line_end:]
+        """Generate fixes for all fixable issues.
+
+        Each file is read once and all of its issues are requested at
+        once; files are processed concurrently. Fixes come back grouped by
+        module, in report order.
+        """
+        async def fixes_for(module: ModuleAnalysis) -> list[AutoFix]:
+            issues = [issue for issue in module.issues if issue.fixable]
+            path = self.repo_root / module.path
+            if not issues or not path.exists():
+                return []
+            try:
+                content = path.read_text()
+            except OSError as e:
+                log.error(f"Failed to read {module.path}: {e}")
+                return []
+            fixes = await asyncio.gather(
+                *(self._generate_fix(module, issue, content) for issue in issues)
             )
-            new_content = "\n".join(new_lines)
-
-            if dry_run:
-                log.info(f"[DRY-RUN] Would apply fix to {fix.module}")
-                log.info(f"  Lines {fix.line_start}-{fix.line_end}")
-                log.info(f"  Change: {fix.description}")
-                return True
-            else:
-                path.write_text(new_content)
-                fix.applied = True
-                log.info(f"Applied fix to {fix.module}")
-                return True
+            return [fix for fix in fixes if fix]
+
+        per_module = await asyncio.gather(*(fixes_for(m) for m in report.modules))
+        return [fix for fixes in per_module for fix in fixes]
+
+    def apply_fixes(self, fixes: list[AutoFix], dry_run: bool = True) -> int:
+        """Apply fixes file by file; returns how many were (or would be) applied.
+
+        Each file is read once, its fixes are applied in line order with
+        offsets adjusted, and the result is written atomically after the
+        original is backed up. Fixes whose lines no longer match the file,
+        or that overlap a fix of higher confidence, are skipped.
+        """
+        by_file: dict[str, list[AutoFix]] = {}
+        for fix in fixes:
+            by_file.setdefault(fix.module, []).append(fix)
+
+        applied_count = 0
+        for rel_path, file_fixes in by_file.items():
+            path = self.repo_root / rel_path
+            if not path.exists():
+                log.error(f"File not found: {path}")
+                continue
+            # Higher-confidence fixes win when two touch the same lines
+            hunks = [
+                Hunk(
+                    f.id, f.line_start, f.line_end, f.original_content, f.fixed_content,
+                    priority=f.confidence,
+                )
+                for f in file_fixes
+            ]
+            try:
+                content = path.read_text()
+                new_content, applied, rejected = apply_hunks(content, hunks)
+                for key, reason in rejected.items():
+                    log.warning(f"Skipping {key} in {rel_path}: {reason}")
+                if not applied:
+                    continue
+
+                applied_ids = set(applied)
+                if dry_run:
+                    log.info(f"[DRY-RUN] Would apply {len(applied)} fixes to {rel_path}")
+                    for fix in file_fixes:
+                        if fix.id in applied_ids:
+                            log.info(f"  Lines {fix.line_start}-{fix.line_end}: {fix.description}")
+                else:
+                    self.backups.save(rel_path, content)
+                    atomic_write(path, new_content)
+                    for fix in file_fixes:
+                        fix.applied = fix.id in applied_ids
+                    log.info(f"Applied {len(applied)} fixes to {rel_path}")
+                applied_count += len(applied)
+            except Exception as e:
+                log.error(f"Failed to apply fixes to {rel_path}: {e}")
+        return applied_count
 
-        except Exception as e:
-            log.error(f"Failed to apply fix: {e}")
-            return False
+    def apply_fix(self, fix: AutoFix, dry_run: bool = True) -> bool:
+        """Apply a single fix to the codebase."""
+        return self.apply_fixes([fix], dry_run=dry_run) == 1
 
     def rollback(self, path: str) -> bool:
-        """Rollback a fix using backup."""
-        if path not in self._backups:
+        """Restore a file from its most recent on-disk backup."""
+        rel_path = str(Path(path).resolve().relative_to(self.repo_root.resolve()))
+        backup = self.backups.latest(rel_path)
+        if backup is None:
             log.error(f"No backup found for {path}")
             return False
 
         try:
-            Path(path).write_text(self._backups[path])
+            atomic_write(self.repo_root / rel_path, backup.read_text())
             log.info(f"Rolled back changes to {path}")
             return True
         except Exception as e:
@@ -908,6 +2252,14 @@ class AutoCorrector:
 # Report Generator - Multi-format output
 # ═══════════════════════════════════════════════════════════════════════════
 
+def _drain(lines: list[str]) -> Iterator[str]:
+    """Yield the buffered lines as one text section and empty the buffer."""
+    if lines:
+        text = "\n".join(lines) + "\n"
+        lines.clear()
+        yield text
+
+
 class ReportGenerator:
     """Generate reports in multiple formats."""
 
@@ -917,6 +2269,10 @@ class ReportGenerator:
 
     def generate_markdown(self, report: ArchitectureReport) -> str:
         """Generate comprehensive Markdown report."""
+        return "".join(self.iter_markdown(report))
+
+    def iter_markdown(self, report: ArchitectureReport) -> Iterator[str]:
+        """Markdown report, one section at a time, so it can be streamed to disk."""
         lines = [
             "# 🤖 AI Architecture Analysis Report",
             "",
@@ -961,12 +2317,16 @@ class ReportGenerator:
             f"| **Total Lines** | {report.total_lines:,} |",
             f"| **Categories** | {len(report.category_summary)} |",
             f"| **Orphan Modules** | {len(report.dependency_graph.orphans)} |",
+            f"| **Import Cycles** | {len(report.dependency_graph.strongly_connected)} |",
+            f"| **Dependency Layers** | {report.dependency_graph.layer_count} |",
             f"| **Critical Issues** | {report.quality_score.critical_issues} |",
             "",
             "---",
             "",
         ])
 
+        yield from _drain(lines)
+
         # Category breakdown
         lines.extend([
             "## 📊 Category Breakdown",
@@ -977,6 +2337,8 @@ class ReportGenerator:
         for cat, count in sorted(report.category_summary.items(), key=lambda x: -x[1]):
             lines.append(f"| **{cat}** | {count} |")
 
+        yield from _drain(lines)
+
         # Dependency graph as Mermaid
         lines.extend([
             "",
@@ -984,12 +2346,17 @@ class ReportGenerator:
             "",
             "## 🔗 Dependency Graph",
             "",
+            "Modules grouped by category; edge labels count imports between",
+            f"categories. Per-category diagrams are in `{DIAGRAM_DIR}/`.",
+            "",
             "```mermaid",
             self._generate_mermaid(report),
             "```",
             "",
         ])
 
+        yield from _drain(lines)
+
         # Orphan modules
         if report.dependency_graph.orphans:
             lines.extend([
@@ -1004,6 +2371,46 @@ class ReportGenerator:
                 lines.append(f"- `{orphan}`")
             lines.append("")
 
+        yield from _drain(lines)
+
+        # Import cycles
+        if report.dependency_graph.strongly_connected:
+            lines.extend([
+                "---",
+                "",
+                "## 🔁 Import Cycles",
+                "",
+                "These modules import each other, directly or transitively:",
+                "",
+            ])
+            for cycle in report.dependency_graph.strongly_connected[:10]:
+                lines.append("- " + " ↔ ".join(f"`{m}`" for m in cycle))
+            lines.append("")
+
+        yield from _drain(lines)
+
+        # Hub modules: the ones most import paths run through
+        hubs = sorted(
+            (n for n in report.dependency_graph.nodes.values() if n.centrality > 0),
+            key=lambda n: -n.centrality,
+        )[:10]
+        if hubs:
+            lines.extend([
+                "---",
+                "",
+                "## 🧭 Hub Modules",
+                "",
+                "| Module | Centrality | Imported by | Imports |",
+                "|--------|------------|-------------|---------|",
+            ])
+            for node in hubs:
+                lines.append(
+                    f"| `{node.path}` | {node.centrality:.3g} | {node.in_degree} | {node.out_degree} |"
+                )
+            lines.append("")
+
+        yield from _drain(lines)
+
         # Module analysis by category
         lines.extend([
             "---",
@@ -1033,6 +2440,8 @@ class ReportGenerator:
                 lines.append(f"| `{m.name}` | {purpose} | {icon} {m.complexity.value} | {m.lines_of_code} |")
             lines.append("")
 
+        yield from _drain(lines)
+
         # Security findings
         if report.security_findings:
             lines.extend([
@@ -1049,6 +2458,8 @@ class ReportGenerator:
                 lines.append(f"  - {finding.description}")
             lines.append("")
 
+        yield from _drain(lines)
+
         # Auto-fixes
         if report.auto_fixes:
             lines.extend([
@@ -1064,6 +2475,8 @@ class ReportGenerator:
                 lines.append(f"  - Confidence: {fix.confidence:.0%}, Risk: {fix.risk}")
             lines.append("")
 
+        yield from _drain(lines)
+
         # Technical debt
         if report.technical_debt:
             lines.extend([
@@ -1076,6 +2489,8 @@ class ReportGenerator:
                 lines.append(f"- {debt}")
             lines.append("")
 
+        yield from _drain(lines)
+
         # Priority actions
         if report.priority_actions:
             lines.extend([
@@ -1088,6 +2503,8 @@ class ReportGenerator:
                 lines.append(f"{i}. {action}")
             lines.append("")
 
+        yield from _drain(lines)
+
         # Footer
         lines.extend([
             "---",
@@ -1096,86 +2513,67 @@ class ReportGenerator:
             f"*Model: {report.model_used}*",
         ])
 
-        return "\n".join(lines)
+        yield "\n".join(lines)
 
     def _generate_mermaid(self, report: ArchitectureReport) -> str:
-        """Generate Mermaid diagram."""
-        lines = ["graph TD"]
-
-        # Group by category
-        categories: dict[str, list[str]] = {}
-        for node in report.dependency_graph.nodes.values():
-            if node.category not in categories:
-                categories[node.category] = []
-            categories[node.category].append(node.name)
-
-        # Add subgraphs
-        for cat, nodes in sorted(categories.items()):
-            lines.append(f"    subgraph {cat}")
-            for node in sorted(set(nodes))[:10]:
-                module = next((m for m in report.modules if m.name == node), None)
-                if module and module.complexity == Complexity.CRITICAL:
-                    lines.append(f"        {node}[{node}]:::critical")
-                elif module and module.complexity == Complexity.HIGH:
-                    lines.append(f"        {node}[{node}]:::high")
-                else:
-                    lines.append(f"        {node}[{node}]")
-            lines.append("    end")
-
-        # Add edges (limited to avoid clutter)
-        edge_count = 0
-        for edge in report.dependency_graph.edges[:50]:
-            if edge.target in report.dependency_graph.nodes and edge_count < 50:
-                lines.append(f"    {edge.source} --> {edge.target}")
-                edge_count += 1
-
-        # Styles
-        lines.extend([
-            "",
-            "    classDef critical fill:#ff6b6b,stroke:#c92a2a",
-            "    classDef high fill:#ffd43b,stroke:#f59f00",
-        ])
-
-        return "\n".join(lines)
+        """Generate the category overview Mermaid diagram."""
+        modules = {m.path: m for m in report.modules}
+        return overview_diagram(report.dependency_graph, modules)
 
     def generate_json(self, report: ArchitectureReport) -> str:
         """Generate JSON report."""
-        # Convert dataclasses to dict, handling enums
-        def convert(obj):
-            if hasattr(obj, "value"):  # Enum
-                return obj.value
-            if hasattr(obj, "__dict__"):
-                return {k: convert(v) for k, v in asdict(obj).items()}
-            if isinstance(obj, list):
-                return [convert(i) for i in obj]
-            if isinstance(obj, dict):
-                return {k: convert(v) for k, v in obj.items()}
-            return obj
-
-        data = convert(report)
-        return json.dumps(data, indent=2, ensure_ascii=False, default=str)
-
-    def save_all(self, report: ArchitectureReport) -> dict[str, Path]:
-        """Save all report formats."""
+        out = io.StringIO()
+        write_report_json(report, out)
+        return out.getvalue()
+
+    def save_all(
+        self, report: ArchitectureReport, stream: ModuleStream | None = None
+    ) -> dict[str, Path]:
+        """Save all report formats.
+
+        Markdown and JSON are streamed to disk section by section and
+        module by module; ``stream`` (the run's ``ModuleStream``) is
+        finished here to produce the JSONL and SQLite metrics exports.
+        """
         outputs = {}
 
         # Markdown
         md_path = self.output_dir / "AI-ARCHITECTURE-REPORT.md"
-        md_path.write_text(self.generate_markdown(report))
+        with atomic_open(md_path) as out:
+            out.writelines(self.iter_markdown(report))
         outputs["markdown"] = md_path
         log.info(f"✓ Markdown: {md_path}")
 
         # JSON
         json_path = self.output_dir / "AI-ARCHITECTURE-REPORT.json"
-        json_path.write_text(self.generate_json(report))
+        with atomic_open(json_path) as out:
+            write_report_json(report, out)
         outputs["json"] = json_path
         log.info(f"✓ JSON: {json_path}")
 
-        # Mermaid diagram
+        # Per-module records and metrics
+        if stream is not None:
+            outputs.update(stream.finish(report))
+            log.info(f"✓ JSONL: {outputs['jsonl']}")
+            log.info(f"✓ Metrics: {outputs['metrics']}")
+
+        # Mermaid diagrams: overview plus one drill-down per category
+        overview, diagrams = render_diagrams(report.dependency_graph, report.modules)
         mmd_path = self.output_dir / "dependency-graph.mmd"
-        mmd_path.write_text(self._generate_mermaid(report))
+        atomic_write(mmd_path, overview)
+        diagram_dir = self.output_dir / DIAGRAM_DIR
+        diagram_dir.mkdir(exist_ok=True)
+        names = diagram_names(list(diagrams))
+        written = set()
+        for category, text in diagrams.items():
+            path = diagram_dir / f"{names[category]}.mmd"
+            atomic_write(path, text)
+            written.add(path)
+        for stale in set(diagram_dir.glob("*.mmd")) - written:
+            stale.unlink()  # categories that no longer exist
         outputs["mermaid"] = mmd_path
-        log.info(f"✓ Mermaid: {mmd_path}")
+        outputs["diagrams"] = diagram_dir
+        log.info(f"✓ Mermaid: {mmd_path} (+{len(diagrams)} in {diagram_dir})")
 
         return outputs
 
@@ -1184,129 +2582,445 @@ class ReportGenerator:
 # Main Pipeline
 # ═══════════════════════════════════════════════════════════════════════════
 
+def _progress_logger(
+    total: int, sink: Callable[[ModuleAnalysis], Any] | None = None
+) -> Callable[[ModuleAnalysis], None]:
+    """on_result callback that logs roughly every 10% of ``total``.
+
+    Each analysis is also handed to ``sink`` (e.g. ``ModuleStream.add``).
+    """
+    done = 0
+    step = max(1, total // 10)
+
+    def on_result(analysis: ModuleAnalysis):
+        nonlocal done
+        if sink:
+            sink(analysis)
+        done += 1
+        if done % step == 0 or done == total:
+            log.info(f"   [{done}/{total}] {analysis.path}")
+
+    return on_result
+
+
+def _populate_report_stats(report: ArchitectureReport):
+    """(Re)compute totals, category summary and security findings from modules."""
+    report.total_modules = len(report.modules)
+    report.total_lines = sum(m.lines_of_code for m in report.modules)
+
+    # Category summary
+    report.category_summary = {}
+    for m in report.modules:
+        report.category_summary[m.category] = report.category_summary.get(m.category, 0) + 1
+
+    # Security findings from analysis
+    report.security_findings = []
+    for m in report.modules:
+        for concern in m.security_concerns:
+            report.security_findings.append(
+                SecurityFinding(
+                    id=f"sec_{m.name}_{len(report.security_findings)}",
+                    severity=Severity.WARNING,
+                    module=m.path,
+                    title="Security Concern",
+                    description=concern,
+                )
+            )
+
+
+def _load_previous_report(
+    config: AnalysisConfig, cache: CacheLayer | None
+) -> ArchitectureReport | None:
+    """Latest report from the cache history, else the JSON in the output dir."""
+    data = None
+    if cache:
+        data = cache.load_report()
+    if data is None:
+        json_path = config.output_dir / "AI-ARCHITECTURE-REPORT.json"
+        if json_path.exists():
+            data = json.loads(json_path.read_text())
+    if data is None or data.get("repository") != str(config.repo_root):
+        return None
+    try:
+        return report_from_dict(data)
+    except (TypeError, ValueError, KeyError) as e:
+        log.warning(f"Previous report is unreadable: {e}")
+        return None
+
+
+async def _analyze_full(
+    config: AnalysisConfig,
+    static_analyzer: StaticAnalyzer,
+    llm_analyzer: LLMAnalyzer,
+    sink: Callable[[ModuleAnalysis], Any] | None = None,
+) -> ArchitectureReport:
+    """Discover, ingest, graph and analyze every module."""
+    with span("discover") as info:
+        modules = static_analyzer.discover_modules()
+        info["modules"] = len(modules)
+    log.info(f"📁 Found {len(modules)} Nix modules")
+
+    # Single-read ingest: content, hash and static metrics per file
+    with span("ingest", files=len(modules)):
+        sources = static_analyzer.ingest(modules)
+
+    # Build dependency graph
+    with span("graph") as info:
+        dep_graph = static_analyzer.build_import_graph(modules, sources)
+        info["edges"] = len(dep_graph.edges)
+    log.info(
+        f"🔗 Built dependency graph: {len(dep_graph.edges)} edges, {len(dep_graph.orphans)} orphans, "
+        f"{dep_graph.layer_count} layers, {len(dep_graph.strongly_connected)} import cycles"
+    )
+
+    # LLM analysis
+    with span("llm_analysis", modules=len(sources)):
+        analyses = await llm_analyzer.analyze_all(sources, _progress_logger(len(sources), sink))
+
+    report = ArchitectureReport(
+        timestamp=datetime.now().isoformat(),
+        repository=str(config.repo_root),
+        model_used=config.model,
+        modules=analyses,
+        dependency_graph=dep_graph,
+    )
+    _populate_report_stats(report)
+    return report
+
+
+async def _analyze_incremental(
+    config: AnalysisConfig,
+    previous: ArchitectureReport,
+    static_analyzer: StaticAnalyzer,
+    llm_analyzer: LLMAnalyzer,
+    sink: Callable[[ModuleAnalysis], Any] | None = None,
+) -> ArchitectureReport:
+    """Patch ``previous`` for the files changed in ``config.since``.
+
+    Changed files are re-ingested and re-analyzed, their importers (reverse
+    graph edges) are re-analyzed with the cache bypassed, and the graph is
+    updated in place instead of rebuilt.
+    """
+    with span("discover", since=config.since):
+        changed, removed = static_analyzer.changed_since(config.since)
+    log.info(f"📁 {config.since}: {len(changed)} changed, {len(removed)} removed Nix files")
+
+    with span("ingest", files=len(changed)):
+        sources = static_analyzer.ingest(changed)
+    with span("graph"):
+        # Removed modules drop out of the patched graph along with their
+        # edges, so their importers are looked up in the previous one
+        removed_importers = static_analyzer.importers_of(previous.dependency_graph, removed)
+        removed_impact = static_analyzer.impact_of(previous.dependency_graph, removed)
+
+        if static_analyzer.is_path_keyed(previous.dependency_graph):
+            graph = static_analyzer.update_import_graph(
+                previous.dependency_graph, sources, removed
+            )
+        else:
+            # Graphs from older reports collapse same-named files; rebuild once
+            graph = static_analyzer.build_import_graph(static_analyzer.discover_modules())
+
+        changed_paths = {s.rel_path for s in sources}
+        importers = set(static_analyzer.importers_of(graph, list(changed_paths)))
+        importers = [
+            p for p in sorted(importers.union(removed_importers))
+            if str(p.relative_to(config.repo_root)) not in changed_paths
+        ]
+    with span("ingest", files=len(importers), importers=True):
+        importer_sources = static_analyzer.ingest(importers)
+    with span("impact"):
+        impact = static_analyzer.impact_of(graph, list(changed_paths))
+        impact |= removed_impact - set(removed)
+    log.info(
+        f"🔗 Patched dependency graph; {len(importer_sources)} direct importers re-analyzed, "
+        f"{len(impact)} modules transitively affected"
+    )
+
+    targets = sources + importer_sources
+    with span("llm_analysis", modules=len(targets)):
+        analyses = await llm_analyzer.analyze_all(
+            targets,
+            _progress_logger(len(targets), sink),
+            refresh={s.rel_path for s in importer_sources},
+        )
+
+    # Patch the module list in place, keeping the previous order
+    updated = {a.path: a for a in analyses}
+    removed_set = set(removed)
+    modules = [
+        updated.pop(m.path, m) for m in previous.modules if m.path not in removed_set
+    ]
+    modules.extend(updated.values())
+
+    report = previous
+    report.timestamp = datetime.now().isoformat()
+    report.model_used = config.model
+    report.modules = modules
+    report.dependency_graph = graph
+    report.auto_fixes = []
+    _populate_report_stats(report)
+    return report
+
+
+def _log_llm_timing(client: OllamaClient):
+    """Summarize prefill vs. decode time and prompt-prefix reuse."""
+    if not client.timings:
+        return
+    st = client.stats
+    prefix_tokens = estimate_tokens(shared_prefix("module_analysis"))
+    if n := st["timed_server"]:
+        log.info(
+            f"🧠 LLM: {n} requests, prefill {st['prompt_eval_ms'] / 1000:.1f}s "
+            f"(avg {st['prompt_eval_ms'] / n:.0f}ms, {st['prompt_eval_tokens']:,} tokens), "
+            f"decode {st['eval_ms'] / 1000:.1f}s (avg {st['eval_ms'] / n:.0f}ms)"
+        )
+        log.info(
+            f"   Shared prompt prefix ~{prefix_tokens} tokens/request, "
+            f"~{st['prompt_tokens_reused']:,} prompt tokens served from the prefix cache"
+        )
+    if n := st["timed_client"]:
+        log.info(
+            f"🧠 LLM: {n} early-stopped streams, avg time to first token "
+            f"{st['ttft_ms'] / n:.0f}ms, avg decode {st['stream_decode_ms'] / n:.0f}ms"
+        )
+    if "limiter" in st:
+        lim = st["limiter"]
+        log.info(
+            f"   Concurrency limit {lim['limit']} (range {lim['low']}-{lim['high']}, "
+            f"+{lim['increases']}/-{lim['decreases']} adjustments)"
+        )
+    for ep in st.get("endpoints", []):
+        state = "" if ep["healthy"] else " (ejected)"
+        log.info(
+            f"   {ep['endpoint']} [{ep['flavor']}]{state}: {ep['completed']} done, "
+            f"{ep['failures']} failed, {ep['requests_per_s']} req/s, "
+            f"{ep['tokens_per_s']} tok/s, avg {ep['avg_latency_ms']}ms, "
+            f"limit {ep['concurrency_limit']}"
+        )
+
+
+def make_client(config: AnalysisConfig) -> OllamaClient | BackendPool:
+    """One Ollama client, or a balanced pool when several endpoints are configured."""
+    endpoints = [parse_endpoint(e) for e in config.endpoints]
+    endpoints = endpoints or [("ollama", OLLAMA_BASE_URL)]
+    # Pooled clients retry less and let the pool fail over instead
+    retries = 3 if len(endpoints) == 1 else 2
+    max_limit = config.max_concurrent_ceiling if config.adaptive_concurrency else None
+
+    clients = []
+    for flavor, url in endpoints:
+        if flavor == "llamacpp":
+            client = LlamaCppClient(
+                config.model,
+                url,
+                timeout=config.timeout,
+                max_retries=retries,
+                max_concurrent=config.max_concurrent,
+                max_limit=max_limit,
+            )
+        else:
+            client = OllamaClient(
+                model=config.model,
+                base_url=url,
+                timeout=config.timeout,
+                max_retries=retries,
+                max_concurrent=config.max_concurrent,
+                keep_alive=config.keep_alive,
+                max_limit=max_limit,
+            )
+        clients.append((flavor, client))
+
+    if len(clients) == 1 and clients[0][0] == "ollama":
+        return clients[0][1]
+    return BackendPool(clients)
+
+
 async def run_analysis(config: AnalysisConfig) -> ArchitectureReport:
-    """Run complete architecture analysis pipeline."""
+    """Run complete architecture analysis pipeline.
+
+    With ``config.trace`` set, per-stage and per-LLM-call spans are written
+    there (also when the run fails).
+    """
+    tracer = Tracer() if config.trace else None
+    token = activate(tracer)
+    try:
+        with span("run_analysis", repository=str(config.repo_root), model=config.model):
+            return await _run_analysis(config)
+    finally:
+        deactivate(token)
+        if tracer:
+            _save_trace(tracer, config)
+
+
+def _save_trace(tracer: Tracer, config: AnalysisConfig):
+    """Write the run's trace and log where the time went."""
+    try:
+        path = tracer.save(config.trace, config.trace_format)
+    except OSError as e:
+        log.error(f"Could not write trace to {config.trace}: {e}")
+        return
+    dropped = f", {tracer.dropped} dropped" if tracer.dropped else ""
+    log.info(f"⏱️  Trace: {path} ({len(tracer.spans)} spans, {config.trace_format}{dropped})")
+    stages = tracer.stage_totals("run_analysis")
+    if stages:
+        log.info("   " + ", ".join(f"{name} {secs:.1f}s" for name, secs in stages.items()))
+
+
+async def _run_analysis(config: AnalysisConfig) -> ArchitectureReport:
     start_time = time.monotonic()
 
     log.info("=" * 70)
     log.info(f"🚀 Architecture Analyzer v{VERSION}")
     log.info(f"   Repository: {config.repo_root}")
     log.info(f"   Model: {config.model}")
-    log.info(f"   Parallelism: {config.max_concurrent}x")
+    if len(config.endpoints) > 1:
+        log.info(f"   Parallelism: {config.max_concurrent}x per endpoint, {len(config.endpoints)} endpoints")
+    else:
+        log.info(f"   Parallelism: {config.max_concurrent}x")
     log.info("=" * 70)
 
     # Initialize components
-    cache = CacheLayer(config.cache_db) if config.use_cache else None
+    cache = (
+        CacheLayer(
+            config.cache_db,
+            model=config.model,
+            prompt_fp=cache_prompt_key(config.chunk_tokens),
+            repository=str(config.repo_root),
+        )
+        if config.use_cache
+        else None
+    )
     if cache:
         cache.__enter__()
-
-    async with OllamaClient(
-        model=config.model,
-        timeout=config.timeout,
-        max_concurrent=config.max_concurrent,
-    ) as client:
-        # Verify Ollama
+        if config.cache_invalidate == "all":
+            cache.clear()
+            log.info("🗑️  Cache cleared")
+        elif config.cache_invalidate == "model":
+            removed = cache.invalidate(model=config.model)
+            log.info(f"🗑️  Invalidated {removed} cached analyses for {config.model}")
+        elif config.cache_invalidate == "stale-prompts":
+            removed = cache.invalidate(stale_prompts=True)
+            log.info(f"🗑️  Invalidated {removed} analyses from old prompt templates")
+
+    async with make_client(config) as client:
+        # Verify the LLM backend(s)
         if not await client.check_health():
-            log.error("❌ Ollama not available or model not loaded")
-            raise RuntimeError("Ollama connection failed")
-        log.info("✓ Ollama connection verified")
+            log.error("❌ LLM backend not available or model not loaded")
+            raise RuntimeError("LLM backend connection failed")
+        if isinstance(client, BackendPool):
+            healthy = sum(ep.healthy for ep in client.endpoints)
+            log.info(f"✓ {healthy}/{len(client.endpoints)} LLM backends verified")
+        else:
+            log.info("✓ Ollama connection verified")
 
-        # Static analysis
         static_analyzer = StaticAnalyzer(config.repo_root)
-        modules = static_analyzer.discover_modules()
-        log.info(f"📁 Found {len(modules)} Nix modules")
-
-        static_results = {}
-        for path in modules:
-            static_results[path] = static_analyzer.analyze(path)
-
-        # Build dependency graph
-        dep_graph = static_analyzer.build_import_graph(modules)
-        log.info(f"🔗 Built dependency graph: {len(dep_graph.edges)} edges, {len(dep_graph.orphans)} orphans")
+        llm_analyzer = LLMAnalyzer(
+            client,
+            config.repo_root,
+            cache,
+            stream=config.stream,
+            queue_size=config.queue_size,
+            chunk_tokens=config.chunk_tokens,
+            dedup=config.dedup,
+        )
 
-        # LLM analysis
-        llm_analyzer = LLMAnalyzer(client, config.repo_root, cache)
-        analyses = await llm_analyzer.analyze_all(modules, static_results)
+        # Module records and metrics are written as analyses complete
+        stream = ModuleStream(config.output_dir)
+        try:
+            previous = _load_previous_report(config, cache) if config.since else None
+            if config.since and previous is None:
+                log.warning("⚠️ No previous report to patch, running full analysis")
 
-        # Build initial report
-        report = ArchitectureReport(
-            timestamp=datetime.now().isoformat(),
-            repository=str(config.repo_root),
-            model_used=config.model,
-            total_modules=len(modules),
-            total_lines=sum(m.lines_of_code for m in analyses),
-            modules=analyses,
-            dependency_graph=dep_graph,
-        )
+            if previous:
+                report = await _analyze_incremental(
+                    config, previous, static_analyzer, llm_analyzer, sink=stream.add
+                )
+            else:
+                report = await _analyze_full(
+                    config, static_analyzer, llm_analyzer, sink=stream.add
+                )
 
-        # Category summary
-        for m in analyses:
-            report.category_summary[m.category] = report.category_summary.get(m.category, 0) + 1
-
-        # Security findings from analysis
-        for m in analyses:
-            for concern in m.security_concerns:
-                report.security_findings.append(
-                    SecurityFinding(
-                        id=f"sec_{m.name}_{len(report.security_findings)}",
-                        severity=Severity.WARNING,
-                        module=m.path,
-                        title="Security Concern",
-                        description=concern,
+            # Generate AI summary (an incremental run keeps the previous one)
+            if not previous:
+                log.info("🧠 Generating architecture summary...")
+                with span("summary"):
+                    summary = await llm_analyzer.generate_summary(report)
+                report.executive_summary = summary.get("executive_summary", "")
+                report.architecture_patterns = summary.get("architecture_patterns", [])
+                report.technical_debt = summary.get("technical_debt", [])
+                report.priority_actions = summary.get("priority_actions", [])
+
+            # Calculate quality score
+            with span("scoring"):
+                self_analyzer = SelfAnalyzer(client, chunk_tokens=config.chunk_tokens)
+                report.quality_score = self_analyzer.calculate_quality_score(report)
+
+                # Get previous score for trend
+                if cache:
+                    report.quality_score.previous_score = cache.get_previous_score()
+                    if report.quality_score.previous_score is not None:
+                        diff = report.quality_score.overall - report.quality_score.previous_score
+                        if diff > 2:
+                            report.quality_score.trend = "improving"
+                        elif diff < -2:
+                            report.quality_score.trend = "degrading"
+
+            # Auto-fix generation
+            if config.auto_fix:
+                log.info("🔧 Generating auto-fixes...")
+                corrector = AutoCorrector(client, config.repo_root)
+                with span("auto_fix"):
+                    report.auto_fixes = await corrector.generate_all_fixes(report)
+                log.info(f"   Generated {len(report.auto_fixes)} fixes")
+
+                if not config.dry_run:
+                    safe = [f for f in report.auto_fixes if f.confidence > 0.8 and f.risk == "low"]
+                    with span("apply_fixes", fixes=len(safe)):
+                        applied = corrector.apply_fixes(safe, dry_run=False)
+                    if applied:
+                        log.info(f"   Applied {applied} fixes (backups in {corrector.backups.session})")
+
+            # Self-analysis
+            if config.self_analyze:
+                log.info("🔍 Running self-analysis...")
+                with span("self_analysis"):
+                    self_report = await self_analyzer.analyze_self()
+                if self_report.get("quality_score"):
+                    log.info(f"   Analyzer self-score: {self_report['quality_score']}/100")
+
+            report.analysis_duration_seconds = time.monotonic() - start_time
+
+            # Save to cache
+            if cache:
+                with span("cache_save"):
+                    cache.save_report(report)
+                    removed = cache.evict(
+                        max_bytes=config.cache_max_bytes,
+                        live_paths={m.path for m in report.modules},
                     )
+                    if any(removed.values()):
+                        log.info(
+                            f"🧹 Evicted {removed['analyses']} analyses, {removed['paths']} paths, "
+                            f"{removed['reports']} reports"
+                        )
+                    cache.__exit__(None, None, None)
+                cs = cache.stats
+                log.info(
+                    f"💾 Cache: {cs['hits']} hits, {cs['misses']} misses ({cs['hit_rate']:.0%}), "
+                    f"{cs['writes']} writes in {cs['batches']} batches, "
+                    f"avg read {cs['avg_read_ms']:.2f}ms, avg batch {cs['avg_batch_ms']:.1f}ms"
                 )
 
-        # Generate AI summary
-        log.info("🧠 Generating architecture summary...")
-        summary = await llm_analyzer.generate_summary(report)
-        report.executive_summary = summary.get("executive_summary", "")
-        report.architecture_patterns = summary.get("architecture_patterns", [])
-        report.technical_debt = summary.get("technical_debt", [])
-        report.priority_actions = summary.get("priority_actions", [])
-
-        # Calculate quality score
-        self_analyzer = SelfAnalyzer(client)
-        report.quality_score = self_analyzer.calculate_quality_score(report)
-        
-        # Get previous score for trend
-        if cache:
-            report.quality_score.previous_score = cache.get_previous_score()
-            if report.quality_score.previous_score is not None:
-                diff = report.quality_score.overall - report.quality_score.previous_score
-                if diff > 2:
-                    report.quality_score.trend = "improving"
-                elif diff < -2:
-                    report.quality_score.trend = "degrading"
-
-        # Auto-fix generation
-        if config.auto_fix:
-            log.info("🔧 Generating auto-fixes...")
-            corrector = AutoCorrector(client, config.repo_root)
-            report.auto_fixes = await corrector.generate_all_fixes(report)
-            log.info(f"   Generated {len(report.auto_fixes)} fixes")
-
-            if not config.dry_run:
-                for fix in report.auto_fixes:
-                    if fix.confidence > 0.8 and fix.risk == "low":
-                        corrector.apply_fix(fix, dry_run=False)
-
-        # Self-analysis
-        if config.self_analyze:
-            log.info("🔍 Running self-analysis...")
-            self_report = await self_analyzer.analyze_self()
-            if self_report.get("quality_score"):
-                log.info(f"   Analyzer self-score: {self_report['quality_score']}/100")
-
-        report.analysis_duration_seconds = time.monotonic() - start_time
-
-        # Save to cache
-        if cache:
-            cache.save_report(report)
-            cache.__exit__(None, None, None)
-
-        # Generate reports
-        generator = ReportGenerator(config.output_dir)
-        generator.save_all(report)
+            _log_llm_timing(client)
+
+            # Generate reports
+            generator = ReportGenerator(config.output_dir)
+            with span("report"):
+                generator.save_all(report, stream)
+        except BaseException:
+            stream.abort()
+            raise
 
         # Final summary
         log.info("=" * 70)
@@ -1348,7 +3062,25 @@ def main():
         "--parallel", "-p",
         type=int,
         default=MAX_CONCURRENT,
-        help=f"Max concurrent requests (default: {MAX_CONCURRENT})",
+        help=f"Max concurrent requests per endpoint (default: {MAX_CONCURRENT})",
+    )
+    parser.add_argument(
+        "--parallel-max",
+        type=int,
+        default=MAX_CONCURRENT_CEILING,
+        help=f"Ceiling for the adaptive concurrency limit (default: {MAX_CONCURRENT_CEILING})",
+    )
+    parser.add_argument(
+        "--fixed-parallel",
+        action="store_true",
+        help="Keep --parallel fixed instead of adapting it to backend throughput",
+    )
+    parser.add_argument(
+        "--endpoint", "-e",
+        action="append",
+        metavar="[FLAVOR=]URL",
+        help="LLM endpoint, repeatable; FLAVOR is ollama (default) or llamacpp "
+        "(default: $LLM_ENDPOINTS or $OLLAMA_HOST)",
     )
     parser.add_argument(
         "--timeout", "-t",
@@ -1361,6 +3093,48 @@ def main():
         action="store_true",
         help="Disable caching",
     )
+    parser.add_argument(
+        "--no-dedup",
+        action="store_true",
+        help="Analyze near-duplicate modules in full instead of reusing or diffing",
+    )
+    parser.add_argument(
+        "--cache-max-mb",
+        type=int,
+        default=CACHE_MAX_BYTES // (1024 * 1024),
+        help=f"Evict least recently analyzed entries above this size (default: {CACHE_MAX_BYTES // (1024 * 1024)})",
+    )
+    parser.add_argument(
+        "--cache-compact",
+        action="store_true",
+        help="Apply the cache size limit, compress stored reports, VACUUM and exit",
+    )
+    parser.add_argument(
+        "--cache-invalidate",
+        choices=["model", "stale-prompts", "all"],
+        help="Drop cached analyses for the selected model, for outdated prompt templates, or all",
+    )
+    parser.add_argument(
+        "--since",
+        metavar="REV",
+        help="Incremental mode: only re-analyze .nix files changed in this git range",
+    )
+    parser.add_argument(
+        "--keep-alive",
+        default=KEEP_ALIVE,
+        help=f"How long Ollama keeps the model loaded between requests (default: {KEEP_ALIVE})",
+    )
+    parser.add_argument(
+        "--chunk-tokens",
+        type=int,
+        default=CHUNK_TOKEN_BUDGET,
+        help=f"Split modules larger than this many code tokens (default: {CHUNK_TOKEN_BUDGET})",
+    )
+    parser.add_argument(
+        "--no-stream",
+        action="store_true",
+        help="Wait for full completions instead of stopping at the closing JSON brace",
+    )
     parser.add_argument(
         "--auto-fix",
         action="store_true",
@@ -1371,10 +3145,27 @@ def main():
         action="store_true",
         help="Apply auto-fixes (requires --auto-fix)",
     )
+    parser.add_argument(
+        "--rollback-fixes",
+        action="store_true",
+        help=f"Restore the files patched by the last --apply-fixes run (backups: {FIX_BACKUP_DIR})",
+    )
+    parser.add_argument(
+        "--trace",
+        type=Path,
+        metavar="FILE",
+        help="Write per-stage and per-LLM-call timing spans to FILE",
+    )
+    parser.add_argument(
+        "--trace-format",
+        choices=TRACE_FORMATS,
+        default="chrome",
+        help="Trace file format: Chrome trace events (Perfetto) or OTLP/JSON (default: chrome)",
+    )
     parser.add_argument(
         "--self-test",
         action="store_true",
-        help="Run self-analysis only",
+        help="Also have the LLM review the analyzer's own source (one uncached call per chunk, ~40)",
     )
     parser.add_argument(
         "--verbose", "-v",
@@ -1387,15 +3178,48 @@ def main():
     if args.verbose:
         logging.getLogger().setLevel(logging.DEBUG)
 
+    if args.rollback_fixes:
+        store = BackupStore(FIX_BACKUP_DIR)
+        sessions = store.sessions()
+        if not sessions:
+            log.error(f"No fix backups under {FIX_BACKUP_DIR}")
+            sys.exit(1)
+        restored = store.restore(args.repo, sessions[-1])
+        log.info(f"↩️ Restored {len(restored)} files from {sessions[-1].name}")
+        return
+
+    if args.cache_compact:
+        with CacheLayer(CACHE_DB_PATH, model=args.model) as cache:
+            removed = cache.evict(max_bytes=args.cache_max_mb * 1024 * 1024)
+            before, after = cache.compact()
+        log.info(f"🧹 Evicted {removed['analyses']} analyses, {removed['reports']} reports")
+        log.info(f"✓ Compacted {CACHE_DB_PATH}: {before / 1e6:.1f} MB → {after / 1e6:.1f} MB")
+        return
+
     config = AnalysisConfig(
         repo_root=args.repo,
         output_dir=args.output,
         model=args.model,
         max_concurrent=args.parallel,
+        max_concurrent_ceiling=args.parallel_max,
+        adaptive_concurrency=not args.fixed_parallel,
+        endpoints=args.endpoint or LLM_ENDPOINTS,
+        queue_size=PROMPT_QUEUE_SIZE,
+        chunk_tokens=args.chunk_tokens,
+        keep_alive=args.keep_alive,
         timeout=args.timeout,
         use_cache=not args.no_cache,
+        dedup=not args.no_dedup,
+        cache_db=CACHE_DB_PATH,
+        cache_max_bytes=args.cache_max_mb * 1024 * 1024,
+        cache_invalidate=args.cache_invalidate,
+        stream=not args.no_stream,
+        since=args.since,
         auto_fix=args.auto_fix,
         dry_run=not args.apply_fixes,
+        trace=args.trace,
+        trace_format=args.trace_format,
+        self_analyze=args.self_test,
     )
 
     # Handle signals
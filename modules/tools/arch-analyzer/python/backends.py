@@ -0,0 +1,428 @@
+#!/usr/bin/env python3
+"""
+Inference Backends for Architecture Analyzer
+=============================================
+llama.cpp client and a load-balancing pool over several LLM endpoints.
+
+- Endpoints are Ollama (``/api/generate``) or llama.cpp (``/v1/chat/completions``)
+- Requests go to the healthy endpoint with the fewest outstanding requests
+- Failing endpoints are ejected and re-admitted by a ``check_health_sync`` probe
+- Per-endpoint request, token and throughput counters
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+import urllib.error
+import urllib.request
+from dataclasses import dataclass
+from typing import Any
+
+from chunking import estimate_tokens
+from concurrency import AdaptiveLimiter
+from models import RequestTiming
+from tracing import record, span
+from transport import AsyncHTTPTransport
+
+log = logging.getLogger(__name__)
+
+BACKEND_FLAVORS = ("ollama", "llamacpp")
+HEALTH_INTERVAL = 15.0  # seconds between probes of ejected endpoints
+EJECT_AFTER = 2  # consecutive failures before an endpoint is ejected
+
+
+def parse_endpoint(spec: str) -> tuple[str, str]:
+    """Split ``[flavor=]url`` into (flavor, url); bare URLs are Ollama."""
+    flavor, sep, url = spec.partition("=")
+    if not sep:
+        return "ollama", spec.rstrip("/")
+    flavor = flavor.strip().lower().replace(".", "").replace("-", "")
+    if flavor not in BACKEND_FLAVORS:
+        raise ValueError(f"Unknown backend flavor {flavor!r} in {spec!r}")
+    return flavor, url.strip().rstrip("/")
+
+
+# ═══════════════════════════════════════════════════════════════════════════
+# llama.cpp Client - OpenAI-compatible server
+# ═══════════════════════════════════════════════════════════════════════════
+
+class LlamaCppClient:
+    """Async llama.cpp client on the OpenAI-compatible chat endpoint.
+
+    Same interface as ``OllamaClient``. ``stream=True`` callers expect a
+    single JSON object, which llama.cpp enforces with a JSON grammar
+    (``response_format``) so generation ends at the closing brace.
+    """
+
+    def __init__(
+        self,
+        model: str,
+        base_url: str,
+        timeout: int = 120,
+        max_retries: int = 3,
+        max_concurrent: int = 8,
+        max_limit: int | None = None,
+    ):
+        self.model = model
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.limiter = AdaptiveLimiter(max_concurrent, max_limit=max_limit)
+        self.max_concurrent = self.limiter.max_limit
+        self.timings: list[RequestTiming] = []
+        self._transport: AsyncHTTPTransport | None = None
+        self._stats = {"requests": 0, "errors": 0, "tokens": 0, "streams_aborted": 0}
+
+    async def __aenter__(self):
+        self._transport = AsyncHTTPTransport(limit_per_host=self.max_concurrent)
+        return self
+
+    async def __aexit__(self, *args):
+        if self._transport:
+            await self._transport.close()
+            self._transport = None
+
+    @property
+    def stats(self) -> dict:
+        stats = self._stats.copy()
+        stats["concurrency_limit"] = self.limiter.limit
+        stats["limiter"] = self.limiter.stats
+        stats.update({
+            "timed_server": len(self.timings),
+            "timed_client": 0,
+            "prompt_eval_ms": sum(t.prompt_eval_ms for t in self.timings),
+            "eval_ms": sum(t.eval_ms for t in self.timings),
+            "ttft_ms": 0,
+            "stream_decode_ms": 0,
+            "prompt_eval_tokens": sum(t.prompt_eval_count for t in self.timings),
+            "eval_tokens": sum(t.eval_count for t in self.timings),
+            "prompt_tokens_reused": sum(
+                max(0, t.prompt_tokens_est - t.prompt_eval_count) for t in self.timings
+            ),
+        })
+        if self._transport:
+            stats.update(self._transport.stats)
+        return stats
+
+    def _sync_request(self, url: str) -> tuple[int, str]:
+        """Make synchronous GET request."""
+        try:
+            with urllib.request.urlopen(url, timeout=self.timeout) as resp:
+                return resp.status, resp.read().decode()
+        except urllib.error.HTTPError as e:
+            return e.code, e.read().decode()
+        except urllib.error.URLError as e:
+            raise ConnectionError(f"Connection failed: {e.reason}")
+
+    def check_health_sync(self) -> bool:
+        """Check that the server is up and has finished loading its model."""
+        try:
+            # /health answers 503 while the model is still loading
+            status, _ = self._sync_request(f"{self.base_url}/health")
+            if status == 404:
+                status, _ = self._sync_request(f"{self.base_url}/v1/models")
+            return status == 200
+        except Exception as e:
+            log.error(f"llama.cpp health check failed ({self.base_url}): {e}")
+        return False
+
+    async def check_health(self) -> bool:
+        return await asyncio.to_thread(self.check_health_sync)
+
+    def _build_payload(
+        self,
+        prompt: str,
+        system: str | None,
+        temperature: float,
+        max_tokens: int,
+        json_mode: bool,
+    ) -> dict[str, Any]:
+        """Build a /v1/chat/completions request body."""
+        messages = [{"role": "system", "content": system}] if system else []
+        messages.append({"role": "user", "content": prompt})
+        payload = {
+            "model": self.model,
+            "messages": messages,
+            "temperature": temperature,
+            "max_tokens": max_tokens,
+            "stream": False,
+            # Reuse the KV cache of the longest matching prompt prefix
+            "cache_prompt": True,
+        }
+        if json_mode:
+            payload["response_format"] = {"type": "json_object"}
+        return payload
+
+    def _record_timing(self, payload: dict[str, Any], data: dict[str, Any]):
+        timings = data.get("timings")
+        if not timings:
+            return
+        est = estimate_tokens("".join(m["content"] for m in payload["messages"]))
+        self.timings.append(RequestTiming(
+            prompt_tokens_est=est,
+            prompt_eval_count=timings.get("prompt_n", 0),
+            prompt_eval_ms=timings.get("prompt_ms", 0.0),
+            eval_count=timings.get("predicted_n", 0),
+            eval_ms=timings.get("predicted_ms", 0.0),
+        ))
+        now = time.monotonic()
+        decode_start = now - timings.get("predicted_ms", 0.0) / 1000
+        record("prefill", decode_start - timings.get("prompt_ms", 0.0) / 1000, decode_start,
+               tokens=timings.get("prompt_n", 0))
+        record("decode", decode_start, now, tokens=timings.get("predicted_n", 0))
+
+    async def generate(
+        self,
+        prompt: str,
+        system: str | None = None,
+        temperature: float = 0.1,
+        max_tokens: int = 2048,
+        stream: bool = False,
+    ) -> str:
+        """Generate completion asynchronously with retry logic."""
+        self._stats["requests"] += 1
+        payload = self._build_payload(prompt, system, temperature, max_tokens, stream)
+
+        with span("llm.generate", "llm", endpoint=self.base_url) as info:
+            for attempt in range(self.max_retries):
+                info["attempts"] = attempt + 1
+                queued = time.monotonic()
+                await self.limiter.acquire()
+                started = time.monotonic()
+                record("queue_wait", queued, started)
+                ok, tokens = False, 0
+                try:
+                    resp = await self._transport.request_json(
+                        "POST",
+                        f"{self.base_url}/v1/chat/completions",
+                        payload,
+                        timeout=self.timeout,
+                    )
+                    if resp.status == 200:
+                        data = resp.json()
+                        tokens = data.get("usage", {}).get("completion_tokens", 0)
+                        self._stats["tokens"] += tokens
+                        self._record_timing(payload, data)
+                        ok = True
+                        info["tokens"] = tokens
+                        choices = data.get("choices") or [{}]
+                        return choices[0].get("message", {}).get("content", "")
+                    self._stats["errors"] += 1
+                    log.warning(f"llama.cpp error (attempt {attempt + 1}): {resp.text()[:100]}")
+                except ConnectionError as e:
+                    self._stats["errors"] += 1
+                    log.warning(f"Connection error (attempt {attempt + 1}): {e}")
+                except Exception as e:
+                    self._stats["errors"] += 1
+                    log.warning(f"Error (attempt {attempt + 1}): {e}")
+                finally:
+                    self.limiter.release(time.monotonic() - started, tokens, ok)
+
+                if attempt < self.max_retries - 1:
+                    await asyncio.sleep(2**attempt)
+
+            return ""
+
+    async def batch_generate(
+        self, prompts: list[tuple[str, str]], temperature: float = 0.1
+    ) -> list[str]:
+        """Process multiple prompts in parallel."""
+        tasks = [self.generate(prompt, system, temperature) for prompt, system in prompts]
+        return await asyncio.gather(*tasks)
+
+
+# ═══════════════════════════════════════════════════════════════════════════
+# Backend Pool - Least-outstanding-requests balancing
+# ═══════════════════════════════════════════════════════════════════════════
+
+@dataclass
+class _Endpoint:
+    """Balancing state for one backend client."""
+    client: Any
+    flavor: str
+    healthy: bool = True
+    outstanding: int = 0
+    completed: int = 0
+    failures: int = 0
+    consecutive_failures: int = 0
+    latency_s: float = 0.0
+    active_s: float = 0.0  # wall time with at least one request in flight
+    active_since: float = 0.0
+
+    @property
+    def name(self) -> str:
+        return self.client.base_url
+
+    def stats(self) -> dict[str, Any]:
+        active = self.active_s or 1e-9
+        tokens = self.client.stats.get("tokens", 0)
+        return {
+            "endpoint": self.name,
+            "flavor": self.flavor,
+            "healthy": self.healthy,
+            "outstanding": self.outstanding,
+            "completed": self.completed,
+            "failures": self.failures,
+            "tokens": tokens,
+            "active_s": round(self.active_s, 2),
+            "requests_per_s": round(self.completed / active, 2),
+            "tokens_per_s": round(tokens / active, 1),
+            "avg_latency_ms": round(self.latency_s * 1000 / max(self.completed, 1)),
+            "concurrency_limit": self.client.limiter.limit,
+        }
+
+
+class BackendPool:
+    """Spread generations over several backends.
+
+    Each request goes to the healthy endpoint with the fewest requests in
+    flight (ties broken by fewest completed), and fails over to the next one
+    if it returns nothing. ``EJECT_AFTER`` consecutive failures eject an
+    endpoint; a background task probes ejected endpoints with
+    ``check_health_sync`` and re-admits them once they answer.
+
+    The pool exposes the client interface used by the analyzers, with
+    ``max_concurrent`` summed over endpoints so worker counts scale with
+    the pool.
+    """
+
+    def __init__(
+        self,
+        clients: list[tuple[str, Any]],
+        health_interval: float = HEALTH_INTERVAL,
+        eject_after: int = EJECT_AFTER,
+    ):
+        if not clients:
+            raise ValueError("BackendPool needs at least one backend")
+        self.endpoints = [_Endpoint(client, flavor) for flavor, client in clients]
+        self.health_interval = health_interval
+        self.eject_after = eject_after
+        self.model = self.endpoints[0].client.model
+        self._health_task: asyncio.Task | None = None
+
+    async def __aenter__(self):
+        for ep in self.endpoints:
+            await ep.client.__aenter__()
+        self._health_task = asyncio.create_task(self._health_loop())
+        return self
+
+    async def __aexit__(self, *args):
+        if self._health_task:
+            self._health_task.cancel()
+            try:
+                await self._health_task
+            except asyncio.CancelledError:
+                pass
+        for ep in self.endpoints:
+            await ep.client.__aexit__(*args)
+
+    @property
+    def max_concurrent(self) -> int:
+        return sum(ep.client.max_concurrent for ep in self.endpoints if ep.healthy) or 1
+
+    @property
+    def timings(self) -> list[RequestTiming]:
+        return [t for ep in self.endpoints for t in ep.client.timings]
+
+    @property
+    def stats(self) -> dict:
+        """Client counters summed over endpoints, plus per-endpoint stats."""
+        stats: dict[str, Any] = {}
+        for ep in self.endpoints:
+            for key, value in ep.client.stats.items():
+                if isinstance(value, (int, float)):
+                    stats[key] = stats.get(key, 0) + value
+        stats["endpoints"] = [ep.stats() for ep in self.endpoints]
+        return stats
+
+    # ── health ────────────────────────────────────────────────────────────
+
+    async def check_health(self) -> bool:
+        """Probe every endpoint; unhealthy ones start ejected."""
+        results = await asyncio.gather(
+            *(asyncio.to_thread(ep.client.check_health_sync) for ep in self.endpoints)
+        )
+        for ep, ok in zip(self.endpoints, results):
+            ep.healthy = ok
+            if not ok:
+                log.warning(f"⚠️ Backend {ep.name} unavailable, ejected")
+        return any(results)
+
+    async def _health_loop(self):
+        while True:
+            await asyncio.sleep(self.health_interval)
+            for ep in self.endpoints:
+                if ep.healthy:
+                    continue
+                if await asyncio.to_thread(ep.client.check_health_sync):
+                    ep.healthy = True
+                    ep.consecutive_failures = 0
+                    log.info(f"✓ Backend {ep.name} healthy again, re-admitted")
+
+    # ── balancing ─────────────────────────────────────────────────────────
+
+    def _pick(self, tried: set[int]) -> _Endpoint | None:
+        candidates = [
+            ep for ep in self.endpoints if ep.healthy and id(ep) not in tried
+        ]
+        if not candidates:
+            # Everything is ejected: fall back to untried endpoints rather than fail
+            candidates = [ep for ep in self.endpoints if id(ep) not in tried]
+        if not candidates:
+            return None
+        return min(candidates, key=lambda ep: (ep.outstanding, ep.completed))
+
+    def _begin(self, ep: _Endpoint) -> float:
+        now = time.monotonic()
+        if ep.outstanding == 0:
+            ep.active_since = now
+        ep.outstanding += 1
+        return now
+
+    def _end(self, ep: _Endpoint, started: float):
+        now = time.monotonic()
+        ep.outstanding -= 1
+        ep.latency_s += now - started
+        if ep.outstanding == 0:
+            ep.active_s += now - ep.active_since
+
+    async def generate(
+        self,
+        prompt: str,
+        system: str | None = None,
+        temperature: float = 0.1,
+        max_tokens: int = 2048,
+        stream: bool = False,
+    ) -> str:
+        """Generate on the least-loaded endpoint, failing over on errors."""
+        tried: set[int] = set()
+        while (ep := self._pick(tried)) is not None:
+            tried.add(id(ep))
+            started = self._begin(ep)
+            try:
+                response = await ep.client.generate(
+                    prompt, system, temperature, max_tokens, stream=stream
+                )
+            finally:
+                self._end(ep, started)
+
+            if response:
+                ep.completed += 1
+                ep.consecutive_failures = 0
+                return response
+
+            ep.failures += 1
+            ep.consecutive_failures += 1
+            if ep.healthy and ep.consecutive_failures >= self.eject_after:
+                ep.healthy = False
+                log.warning(f"⚠️ Backend {ep.name} failed {ep.consecutive_failures}x, ejected")
+        return ""
+
+    async def batch_generate(
+        self, prompts: list[tuple[str, str]], temperature: float = 0.1
+    ) -> list[str]:
+        """Process multiple prompts in parallel."""
+        tasks = [self.generate(prompt, system, temperature) for prompt, system in prompts]
+        return await asyncio.gather(*tasks)
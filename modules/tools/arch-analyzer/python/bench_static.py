@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Static Analysis Microbenchmark
+==============================
+Compares StaticAnalyzer.analyze_content (single-pass scanner) against the
+previous multi-pass implementation and reports per-MB throughput.
+
+Usage:
+    python bench_static.py [--repo /etc/nixos] [--rounds 5]
+"""
+
+from __future__ import annotations
+
+import argparse
+import re
+import sys
+import time
+from pathlib import Path
+from typing import Any, Callable
+
+from analyzer import StaticAnalyzer
+
+# Previous implementation, kept verbatim as the baseline
+IMPORT_PATTERN = re.compile(r"import\s+([^\s;]+)")
+OPTION_PATTERN = re.compile(r"(\w+)\s*=\s*(?:mkOption|mkEnableOption)")
+MKIF_PATTERN = re.compile(r"mkIf\s+config\.([^\s]+)")
+SERVICE_PATTERN = re.compile(r"systemd\.services\.(\w+)")
+HARDCODED_SECRET = re.compile(
+    r'(password|apiKey|secret|token)\s*=\s*"[^"]+"|\'[^\']+\'', re.IGNORECASE
+)
+
+
+def legacy_analyze(content: str) -> dict[str, Any]:
+    """Multi-pass static analysis as shipped before the combined scanner."""
+    lines = content.splitlines()
+    result = {
+        "lines_of_code": len(lines),
+        "blank_lines": sum(1 for l in lines if not l.strip()),
+        "comment_lines": sum(1 for l in lines if l.strip().startswith("#")),
+        "has_documentation": "description" in content or "# " in content[:500],
+    }
+    result["imports"] = IMPORT_PATTERN.findall(content)
+    result["options_count"] = len(OPTION_PATTERN.findall(content))
+    result["options_defined"] = OPTION_PATTERN.findall(content)
+    result["services_defined"] = SERVICE_PATTERN.findall(content)
+    result["has_security_content"] = any(
+        k in content.lower()
+        for k in ["firewall", "security", "hardening", "permission", "auth"]
+    )
+    result["hardcoded_secrets"] = bool(HARDCODED_SECRET.search(content))
+    result["config_dependencies"] = MKIF_PATTERN.findall(content)
+    return result
+
+
+# Snippets where overlapping matches are easy to get wrong
+EDGE_CASES = [
+    "x = mkIf config.systemd.services.foo.enable {};",
+    "enable = mkEnableOption \"auth\"; systemd.services.bar = mkIf config.security.x {};",
+]
+
+
+def bench(fn: Callable[[str], Any], corpus: list[str], rounds: int) -> float:
+    """Best-of-N seconds to analyze the whole corpus."""
+    best = float("inf")
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for content in corpus:
+            fn(content)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Static analysis throughput benchmark")
+    parser.add_argument("--repo", "-r", type=Path, default=Path("/etc/nixos"))
+    parser.add_argument("--rounds", "-n", type=int, default=5)
+    args = parser.parse_args()
+
+    modules = StaticAnalyzer(args.repo).discover_modules()
+    corpus = [p.read_text(errors="replace") for p in modules]
+    if not corpus:
+        print(f"No .nix files under {args.repo}", file=sys.stderr)
+        sys.exit(1)
+    megabytes = sum(len(c.encode()) for c in corpus) / 1e6
+
+    # Imports now come from the Nix tokenizer, which also reads imports lists
+    def comparable(result: dict[str, Any]) -> dict[str, Any]:
+        return {k: v for k, v in result.items() if k != "imports"}
+
+    mismatches = [
+        str(p) for p, c in zip([*modules, *EDGE_CASES], [*corpus, *EDGE_CASES])
+        if comparable(legacy_analyze(c)) != comparable(StaticAnalyzer.analyze_content(c))
+    ]
+
+    legacy = bench(legacy_analyze, corpus, args.rounds)
+    scanner = bench(StaticAnalyzer.analyze_content, corpus, args.rounds)
+
+    print(f"Corpus: {len(corpus)} files, {megabytes:.2f} MB (best of {args.rounds})")
+    print(f"  multi-pass   {legacy * 1000:8.1f} ms  {megabytes / legacy:8.1f} MB/s")
+    print(f"  single-pass  {scanner * 1000:8.1f} ms  {megabytes / scanner:8.1f} MB/s")
+    print(f"  speedup      {legacy / scanner:8.2f}x")
+    if mismatches:
+        print(f"  {len(mismatches)} files differ, e.g. {mismatches[0]}")
+    else:
+        print("  results identical on every file")
+
+
+if __name__ == "__main__":
+    main()
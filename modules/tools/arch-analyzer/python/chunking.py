@@ -0,0 +1,289 @@
+#!/usr/bin/env python3
+"""
+Token-Aware Chunking for Architecture Analyzer
+===============================================
+Splits large sources into prompt-sized chunks on structural boundaries
+and merges the per-chunk LLM results back into one analysis.
+
+- Nix: breaks between bindings, preferring the shallowest attribute-set depth
+- Python: breaks between top-level (then nested) definitions
+- Chunks never exceed the token budget unless a single line does
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Any, Callable
+
+# Rough code tokenization ratio for BPE tokenizers (Qwen/Llama on Nix/Python)
+CHARS_PER_TOKEN = 3.5
+
+COMPLEXITY_ORDER = ["low", "medium", "high", "critical"]
+
+
+@dataclass
+class Chunk:
+    """A contiguous slice of a source file."""
+    index: int
+    total: int
+    start_line: int  # 1-based, inclusive
+    end_line: int  # 1-based, inclusive
+    text: str
+
+    @property
+    def tokens(self) -> int:
+        return estimate_tokens(self.text)
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate used to size prompts."""
+    return int(len(text) / CHARS_PER_TOKEN) + 1
+
+
+# ═══════════════════════════════════════════════════════════════════════════
+# Boundary detection
+# ═══════════════════════════════════════════════════════════════════════════
+
+def nix_break_depths(lines: list[str]) -> list[int | None]:
+    """Nesting depth after each line, or None where a break is not allowed.
+
+    A break is allowed after line i when the lexer is outside any string or
+    block comment and the line ends a binding (``;``), closes a bracket, or
+    is blank/comment-only. Depth counts open ``{ [ (``.
+    """
+    depths: list[int | None] = []
+    depth = 0
+    in_string = False  # "..."
+    in_indented = False  # ''...''
+    in_comment = False  # /* ... */
+
+    for line in lines:
+        i, n = 0, len(line)
+        while i < n:
+            ch = line[i]
+            nxt = line[i + 1] if i + 1 < n else ""
+            if in_comment:
+                if ch == "*" and nxt == "/":
+                    in_comment = False
+                    i += 1
+            elif in_string:
+                if ch == "\\":
+                    i += 1
+                elif ch == '"':
+                    in_string = False
+            elif in_indented:
+                if ch == "'" and nxt == "'":
+                    # ''' and ''$ are escapes inside indented strings
+                    if i + 2 < n and line[i + 2] in "'$\\":
+                        i += 2
+                    else:
+                        in_indented = False
+                        i += 1
+            elif ch == "#":
+                break
+            elif ch == "/" and nxt == "*":
+                in_comment = True
+                i += 1
+            elif ch == '"':
+                in_string = True
+            elif ch == "'" and nxt == "'":
+                in_indented = True
+                i += 1
+            elif ch in "{[(":
+                depth += 1
+            elif ch in "}])":
+                depth = max(0, depth - 1)
+            i += 1
+
+        stripped = line.split("#", 1)[0].rstrip()
+        ends_statement = not stripped or stripped.endswith((";", "}", "]", ")"))
+        if in_string or in_indented or in_comment or not ends_statement:
+            depths.append(None)
+        else:
+            depths.append(depth)
+    return depths
+
+
+def python_break_depths(lines: list[str]) -> list[int | None]:
+    """Indentation level of the *next* line, so breaks fall before definitions."""
+    depths: list[int | None] = []
+    for i in range(len(lines)):
+        following = next((l for l in lines[i + 1:] if l.strip()), None)
+        if following is None:
+            depths.append(0)
+            continue
+        indent = len(following) - len(following.lstrip())
+        starts_block = following.lstrip().startswith(("def ", "async def ", "class ", "@", "#"))
+        depths.append(indent // 4 if starts_block or indent == 0 else None)
+    return depths
+
+
+# ═══════════════════════════════════════════════════════════════════════════
+# Splitting
+# ═══════════════════════════════════════════════════════════════════════════
+
+def split_source(
+    content: str,
+    budget_tokens: int,
+    language: str = "nix",
+) -> list[Chunk]:
+    """Split ``content`` into chunks of at most ``budget_tokens`` each."""
+    lines = content.splitlines(keepends=True)
+    if not lines or estimate_tokens(content) <= budget_tokens:
+        return [Chunk(0, 1, 1, max(1, len(lines)), content)]
+
+    depth_fn: Callable[[list[str]], list[int | None]] = (
+        python_break_depths if language == "python" else nix_break_depths
+    )
+    depths = depth_fn([l.rstrip("\n") for l in lines])
+    budget_chars = int(budget_tokens * CHARS_PER_TOKEN)
+
+    spans = _split_span(lines, depths, 0, len(lines), budget_chars)
+    chunks = [
+        Chunk(i, len(spans), start + 1, end, "".join(lines[start:end]))
+        for i, (start, end) in enumerate(spans)
+    ]
+    return chunks
+
+
+def _split_span(
+    lines: list[str],
+    depths: list[int | None],
+    start: int,
+    end: int,
+    budget_chars: int,
+) -> list[tuple[int, int]]:
+    """Recursively split lines[start:end] at the shallowest break points."""
+    size = sum(len(l) for l in lines[start:end])
+    if size <= budget_chars or end - start <= 1:
+        return [(start, end)]
+
+    # Candidate breaks after line i (exclusive end = i + 1), inside the span
+    candidates = [
+        (depths[i], i + 1) for i in range(start, end - 1) if depths[i] is not None
+    ]
+    if not candidates:
+        return _split_lines(lines, start, end, budget_chars)
+
+    shallowest = min(d for d, _ in candidates)
+    cuts = [pos for d, pos in candidates if d == shallowest]
+
+    # Greedily pack the pieces between cuts into budget-sized spans
+    spans: list[tuple[int, int]] = []
+    piece_start = start
+    current_start = start
+    current_size = 0
+    for cut in cuts + [end]:
+        piece_size = sum(len(l) for l in lines[piece_start:cut])
+        if current_size and current_size + piece_size > budget_chars:
+            spans.append((current_start, piece_start))
+            current_start, current_size = piece_start, 0
+        current_size += piece_size
+        piece_start = cut
+    spans.append((current_start, end))
+
+    if len(spans) == 1:
+        # Every break at this depth leaves one oversized piece: go deeper
+        deeper = [(d, p) for d, p in candidates if d > shallowest]
+        if not deeper:
+            return _split_lines(lines, start, end, budget_chars)
+        masked = list(depths)
+        for i in range(start, end - 1):
+            if masked[i] == shallowest:
+                masked[i] = None
+        return _split_span(lines, masked, start, end, budget_chars)
+
+    result: list[tuple[int, int]] = []
+    for s, e in spans:
+        result.extend(_split_span(lines, depths, s, e, budget_chars))
+    return result
+
+
+def _split_lines(
+    lines: list[str], start: int, end: int, budget_chars: int
+) -> list[tuple[int, int]]:
+    """Fallback: pack whole lines without regard to structure."""
+    spans: list[tuple[int, int]] = []
+    current_start, current_size = start, 0
+    for i in range(start, end):
+        if current_size and current_size + len(lines[i]) > budget_chars:
+            spans.append((current_start, i))
+            current_start, current_size = i, 0
+        current_size += len(lines[i])
+    spans.append((current_start, end))
+    return spans
+
+
+# ═══════════════════════════════════════════════════════════════════════════
+# Merging
+# ═══════════════════════════════════════════════════════════════════════════
+
+def _union(lists: list[list[Any]]) -> list[Any]:
+    seen, merged = set(), []
+    for items in lists:
+        for item in items or []:
+            key = str(item).strip().lower()
+            if key not in seen:
+                seen.add(key)
+                merged.append(item)
+    return merged
+
+
+def _offset_issues(pairs: list[tuple[dict[str, Any], Chunk]]) -> list[dict]:
+    """Concatenate issues, shifting chunk-relative lines to file lines."""
+    issues = []
+    for data, chunk in pairs:
+        for issue in data.get("issues", []) or []:
+            if not isinstance(issue, dict):
+                continue
+            issue = dict(issue)
+            if isinstance(issue.get("line"), int):
+                issue["line"] += chunk.start_line - 1
+            issues.append(issue)
+    return issues
+
+
+def merge_module_results(results: list[dict[str, Any]], chunks: list[Chunk]) -> dict[str, Any]:
+    """Reduce per-chunk ``module_analysis`` JSON into one result."""
+    pairs = [(r, c) for r, c in zip(results, chunks) if r]
+    if not pairs:
+        return {}
+    if len(chunks) == 1:
+        return pairs[0][0]
+    results = [r for r, _ in pairs]
+
+    complexities = [
+        r.get("complexity") for r in results if r.get("complexity") in COMPLEXITY_ORDER
+    ]
+    return {
+        # The first chunk holds the header, arguments and usually the option tree
+        "purpose": next((r["purpose"] for r in results if r.get("purpose")), ""),
+        "complexity": max(complexities, key=COMPLEXITY_ORDER.index) if complexities else "medium",
+        "dependencies": _union([r.get("dependencies", []) for r in results]),
+        "options_defined": _union([r.get("options_defined", []) for r in results]),
+        "security_concerns": _union([r.get("security_concerns", []) for r in results]),
+        "issues": _offset_issues(pairs),
+        "recommendations": _union([r.get("recommendations", []) for r in results]),
+    }
+
+
+def merge_self_results(results: list[dict[str, Any]], chunks: list[Chunk]) -> dict[str, Any]:
+    """Reduce per-chunk ``self_analysis`` JSON into one result."""
+    pairs = [(r, c) for r, c in zip(results, chunks) if r]
+    if not pairs:
+        return {}
+    results = [r for r, _ in pairs]
+
+    # Weight each chunk's score by its size
+    scored = [
+        (r["quality_score"], c.end_line - c.start_line + 1)
+        for r, c in pairs
+        if isinstance(r.get("quality_score"), (int, float))
+    ]
+    total_weight = sum(w for _, w in scored)
+    return {
+        "quality_score": round(sum(s * w for s, w in scored) / total_weight) if scored else None,
+        "issues": _offset_issues(pairs),
+        "improvements": _union([r.get("improvements", []) for r in results]),
+        "missing_features": _union([r.get("missing_features", []) for r in results]),
+    }
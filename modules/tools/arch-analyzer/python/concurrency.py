@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+Adaptive Concurrency for Architecture Analyzer
+===============================================
+AIMD limiter for in-flight LLM requests against one backend.
+
+- Additive increase while completed-token throughput keeps improving
+- Multiplicative decrease on errors or when latency exceeds the baseline
+- Decisions are made once per "round" (as many completions as the limit),
+  so every in-flight slot contributes a sample before the limit moves
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import statistics
+import time
+from collections import deque
+
+log = logging.getLogger(__name__)
+
+LATENCY_TOLERANCE = 2.0  # round median latency vs. baseline that counts as queueing
+BACKOFF = 0.75  # multiplicative decrease factor
+GAIN_THRESHOLD = 0.05  # relative throughput change treated as real
+PROBE_EVERY = 5  # flat rounds before probing one extra slot
+BASELINE_DRIFT = 0.05  # how fast the latency baseline follows slower rounds
+
+
+class AdaptiveLimiter:
+    """Gate for in-flight requests whose limit adapts to the backend.
+
+    Usage:
+        await limiter.acquire()
+        try:
+            ...
+        finally:
+            limiter.release(latency_s, tokens, ok)
+
+    With ``max_limit=None`` the limit is pinned at ``initial`` and the
+    limiter only enforces it.
+    """
+
+    def __init__(self, initial: int, min_limit: int = 1, max_limit: int | None = None):
+        if max_limit is None:
+            min_limit = initial
+        self.min_limit = max(1, min_limit)
+        self.max_limit = max(initial, max_limit or initial)
+        self.limit = max(self.min_limit, min(initial, self.max_limit))
+        self.inflight = 0
+        self.increases = 0
+        self.decreases = 0
+        self.low = self.high = self.limit
+        self.baseline: float | None = None
+        self._waiters: deque[asyncio.Future] = deque()
+        self._prev_throughput = 0.0
+        self._flat_rounds = 0
+        self._reset_round(time.monotonic())
+
+    @property
+    def adaptive(self) -> bool:
+        return self.max_limit > self.min_limit
+
+    @property
+    def stats(self) -> dict[str, float]:
+        return {
+            "limit": self.limit,
+            "inflight": self.inflight,
+            "low": self.low,
+            "high": self.high,
+            "increases": self.increases,
+            "decreases": self.decreases,
+            "baseline_ms": round((self.baseline or 0.0) * 1000),
+            "throughput_tps": round(self._prev_throughput, 1),
+        }
+
+    async def acquire(self):
+        """Wait for a free slot under the current limit.
+
+        Slots freed by ``release`` are handed to waiters in FIFO order, so a
+        new caller cannot take one ahead of the queue.
+        """
+        if self.inflight < self.limit and not self._waiters:
+            self.inflight += 1
+        else:
+            fut = asyncio.get_running_loop().create_future()
+            self._waiters.append(fut)
+            try:
+                await fut
+            except asyncio.CancelledError:
+                if fut.done() and not fut.cancelled():
+                    # Cancelled after the slot was handed over: pass it on
+                    self.inflight -= 1
+                    self._wake()
+                elif fut in self._waiters:
+                    self._waiters.remove(fut)
+                raise
+        if self.inflight >= self.limit:
+            self._saturated = True
+
+    def release(self, latency_s: float, tokens: int = 0, ok: bool = True):
+        """Return a slot and record the request's outcome."""
+        self.inflight -= 1
+        if self.adaptive:
+            self._record(latency_s, tokens, ok)
+        self._wake()
+
+    # ── internals ─────────────────────────────────────────────────────────
+
+    def _wake(self):
+        # The slot is counted for the waiter before it runs
+        while self._waiters and self.inflight < self.limit:
+            fut = self._waiters.popleft()
+            if not fut.done():
+                fut.set_result(None)
+                self.inflight += 1
+
+    def _reset_round(self, now: float):
+        self._round_start = now
+        self._latencies: list[float] = []
+        self._tokens = 0
+        self._errors = 0
+        self._saturated = self.inflight >= self.limit
+
+    def _record(self, latency_s: float, tokens: int, ok: bool):
+        self._latencies.append(latency_s)
+        self._tokens += tokens
+        self._errors += not ok
+        # Errors act immediately; everything else waits for a full round
+        if self._errors or len(self._latencies) >= self.limit:
+            self._end_round()
+
+    def _end_round(self):
+        now = time.monotonic()
+        elapsed = max(now - self._round_start, 1e-6)
+        throughput = self._tokens / elapsed
+        median = statistics.median(self._latencies)
+        if self.baseline is None or median < self.baseline:
+            self.baseline = median
+        else:
+            self.baseline += (median - self.baseline) * BASELINE_DRIFT
+
+        if self._errors:
+            self._set(int(self.limit * BACKOFF), "errors")
+        elif median > self.baseline * LATENCY_TOLERANCE:
+            self._set(int(self.limit * BACKOFF), f"latency {median * 1000:.0f}ms")
+        elif self._saturated:
+            if throughput > self._prev_throughput * (1 + GAIN_THRESHOLD):
+                self._flat_rounds = 0
+                self._set(self.limit + 1, f"{throughput:.0f} tok/s")
+            elif throughput < self._prev_throughput * (1 - GAIN_THRESHOLD):
+                # The last extra slot only added queueing
+                self._set(self.limit - 1, f"{throughput:.0f} tok/s")
+            else:
+                self._flat_rounds += 1
+                if self._flat_rounds >= PROBE_EVERY:
+                    self._flat_rounds = 0
+                    self._set(self.limit + 1, "probe")
+
+        self._prev_throughput = throughput
+        self._reset_round(now)
+
+    def _set(self, limit: int, reason: str):
+        limit = max(self.min_limit, min(limit, self.max_limit))
+        if limit == self.limit:
+            return
+        if limit > self.limit:
+            self.increases += 1
+        else:
+            self.decreases += 1
+        log.debug(f"Concurrency limit {self.limit} → {limit} ({reason})")
+        self.limit = limit
+        self.low = min(self.low, limit)
+        self.high = max(self.high, limit)
@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+"""
+Mermaid Diagrams for Architecture Analyzer
+===========================================
+Summarized dependency diagrams whose size is bounded for any repository.
+
+- Overview: one node per category, edges aggregated between categories
+  and cut to the heaviest ``OVERVIEW_EDGES``
+- Per-category drill-down: the most central modules of one category, with
+  the rest folded into a "more" node and other categories as clusters
+- Edges are ranked by the betweenness centrality of their endpoints
+"""
+
+from __future__ import annotations
+
+import re
+from collections import Counter
+
+from models import Complexity, DependencyEdge, DependencyGraph, ModuleAnalysis
+
+DIAGRAM_DIR = "diagrams"  # per-category diagrams, under the output directory
+MAX_CLUSTERS = 40  # categories shown in the overview; the rest become "other"
+OVERVIEW_EDGES = 60
+DETAIL_NODES = 25  # modules shown per category diagram
+DETAIL_EDGES = 80
+
+STYLES = [
+    "",
+    "    classDef critical fill:#ff6b6b,stroke:#c92a2a",
+    "    classDef high fill:#ffd43b,stroke:#f59f00",
+    "    classDef cluster fill:#e7f5ff,stroke:#1c7ed6",
+]
+
+
+def node_id(key: str) -> str:
+    return re.sub(r"\W", "_", key)
+
+
+def _label(text: str) -> str:
+    return '"' + text.replace('"', "'") + '"'
+
+
+def _complexity_class(modules: list[ModuleAnalysis]) -> str:
+    levels = {m.complexity for m in modules}
+    if Complexity.CRITICAL in levels:
+        return ":::critical"
+    if Complexity.HIGH in levels:
+        return ":::high"
+    return ""
+
+
+def overview_diagram(graph: DependencyGraph, modules: dict[str, ModuleAnalysis]) -> str:
+    """One node per category, with the heaviest inter-category edges."""
+    totals = Counter(node.category for node in graph.nodes.values())
+    shown = {cat for cat, _ in totals.most_common(MAX_CLUSTERS)}
+
+    def cluster(key: str) -> str:
+        category = graph.nodes[key].category
+        return category if category in shown else "other"
+
+    weights: Counter[tuple[str, str]] = Counter()
+    imports: Counter[tuple[str, str]] = Counter()
+    for edge in graph.edges:
+        a, b = cluster(edge.source), cluster(edge.target)
+        if a != b:
+            imports[a, b] += 1
+            # Edges through central modules say more about the architecture
+            weights[a, b] += 1 + (
+                graph.nodes[edge.source].centrality + graph.nodes[edge.target].centrality
+            ) * len(graph.nodes)
+
+    members: dict[str, list[ModuleAnalysis]] = {}
+    sizes: Counter[str] = Counter()
+    for key in graph.nodes:
+        sizes[cluster(key)] += 1
+        if key in modules:
+            members.setdefault(cluster(key), []).append(modules[key])
+
+    lines = ["graph LR"]
+    for cat, size in sorted(sizes.items()):
+        style = _complexity_class(members.get(cat, []))
+        lines.append(f"    cat_{node_id(cat)}[{_label(f'{cat} ({size})')}]{style}")
+    for (a, b), _ in weights.most_common(OVERVIEW_EDGES):
+        lines.append(f"    cat_{node_id(a)} -->|{imports[a, b]}| cat_{node_id(b)}")
+    if len(weights) > OVERVIEW_EDGES:
+        lines.append(f"    %% {len(weights) - OVERVIEW_EDGES} lighter category edges omitted")
+    lines.extend(STYLES)
+    return "\n".join(lines)
+
+
+def category_diagram(
+    graph: DependencyGraph,
+    category: str,
+    modules: dict[str, ModuleAnalysis],
+    keys: list[str] | None = None,
+    edges: list[DependencyEdge] | None = None,
+) -> str:
+    """The most central modules of ``category`` and their neighbours.
+
+    ``keys`` (the category's modules) and ``edges`` (those touching it)
+    save a scan of the whole graph when rendering many categories.
+    """
+    if keys is None:
+        keys = [k for k, n in graph.nodes.items() if n.category == category]
+    ranked = sorted(
+        keys,
+        key=lambda k: (
+            -graph.nodes[k].centrality,
+            -(graph.nodes[k].in_degree + graph.nodes[k].out_degree),
+            k,
+        ),
+    )
+    shown = set(ranked[:DETAIL_NODES])
+    hidden = len(keys) - len(shown)
+    more = f"more_{node_id(category)}"
+
+    # Endpoints are (module key, None) for shown modules, (None, None) for
+    # the "more" node and (None, category) for another category's cluster;
+    # ids are only built for the edges that are kept
+    def endpoint(key: str) -> tuple[str | None, str | None]:
+        if key in shown:
+            return key, None
+        other = graph.nodes[key].category
+        return None, (None if other == category else other)
+
+    def ident(end: tuple[str | None, str | None]) -> str:
+        key, other = end
+        if key is not None:
+            return node_id(key)
+        return more if other is None else f"cat_{node_id(other)}"
+
+    nodes = graph.nodes
+    scored: dict[tuple, float] = {}
+    for edge in graph.edges if edges is None else edges:
+        source, target = nodes[edge.source], nodes[edge.target]
+        if category != source.category and category != target.category:
+            continue
+        pair = endpoint(edge.source), endpoint(edge.target)
+        if pair[0] == pair[1]:
+            continue
+        score = source.centrality + target.centrality
+        if score > scored.get(pair, -1.0):
+            scored[pair] = score
+    top = sorted(scored, key=lambda e: -scored[e])[:DETAIL_EDGES]
+    kept = [(ident(a), ident(b)) for a, b in top]
+    clusters = {other for pair in top for key, other in pair if key is None and other}
+
+    lines = ["graph TD", f"    subgraph {node_id(category)}[{_label(category)}]"]
+    for key in sorted(shown):
+        module = modules.get(key)
+        style = _complexity_class([module]) if module else ""
+        lines.append(f"        {node_id(key)}[{_label(nodes[key].name)}]{style}")
+    if hidden:
+        lines.append(f"        {more}[{_label(f'… {hidden} more')}]")
+    lines.append("    end")
+
+    for other in sorted(clusters):
+        lines.append(f"    cat_{node_id(other)}[{_label(other)}]:::cluster")
+    for a, b in kept:
+        lines.append(f"    {a} --> {b}")
+    if len(scored) > len(kept):
+        lines.append(f"    %% {len(scored) - len(kept)} edges omitted")
+    lines.extend(STYLES)
+    return "\n".join(lines)
+
+
+def diagram_names(categories: list[str]) -> dict[str, str]:
+    """File name (without suffix) per category, unique even when ids collide."""
+    names: dict[str, str] = {}
+    used: set[str] = set()
+    for category in sorted(categories):
+        base = name = node_id(category)
+        n = 1
+        while name in used:  # foo-bar and foo_bar
+            n += 1
+            name = f"{base}_{n}"
+        used.add(name)
+        names[category] = name
+    return names
+
+
+def render_diagrams(
+    graph: DependencyGraph, modules: list[ModuleAnalysis]
+) -> tuple[str, dict[str, str]]:
+    """The overview and one drill-down diagram per category (keyed by category)."""
+    by_path = {m.path: m for m in modules}
+    members: dict[str, list[str]] = {}
+    for key, node in graph.nodes.items():
+        members.setdefault(node.category, []).append(key)
+    touching: dict[str, list[DependencyEdge]] = {category: [] for category in members}
+    for edge in graph.edges:
+        source, target = graph.nodes[edge.source].category, graph.nodes[edge.target].category
+        touching[source].append(edge)
+        if target != source:
+            touching[target].append(edge)
+
+    diagrams = {
+        category: category_diagram(graph, category, by_path, members[category], touching[category])
+        for category in sorted(members)
+    }
+    return overview_diagram(graph, by_path), diagrams
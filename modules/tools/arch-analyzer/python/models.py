@@ -72,6 +72,7 @@ class ModuleAnalysis:
     analysis_time_ms: int = 0
     content_hash: str = ""
     last_modified: str = ""
+    derived_from: str | None = None  # near-duplicate whose analysis this was derived from
     error: str | None = None
 
 
@@ -154,12 +155,13 @@ class QualityScore:
 
 @dataclass
 class DependencyGraph:
-    """Dependency graph between modules."""
+    """Dependency graph between modules, keyed by repo-relative path."""
     nodes: dict[str, ModuleNode] = field(default_factory=dict)
     edges: list[DependencyEdge] = field(default_factory=list)
     
     # Graph metrics
-    strongly_connected: list[list[str]] = field(default_factory=list)
+    strongly_connected: list[list[str]] = field(default_factory=list)  # import cycles
+    layer_count: int = 0
     orphans: list[str] = field(default_factory=list)
     entry_points: list[str] = field(default_factory=list)
 
@@ -172,6 +174,8 @@ class ModuleNode:
     path: str
     in_degree: int = 0
     out_degree: int = 0
+    layer: int = 0  # topological layer, 0 = imports nothing
+    centrality: float = 0.0  # normalized betweenness
 
 
 @dataclass
@@ -212,6 +216,36 @@ class ArchitectureReport:
     priority_actions: list[str] = field(default_factory=list)
 
 
+@dataclass
+class SourceFile:
+    """A module read once during ingest, shared by every later stage."""
+    path: Path
+    rel_path: str
+    category: str
+    content: str = ""
+    content_hash: str = ""
+    static: dict[str, Any] = field(default_factory=dict)
+    error: str | None = None
+
+
+@dataclass
+class RequestTiming:
+    """Prefill vs. decode time of one completed generation.
+
+    ``source`` is "server" when the backend reported its own counters
+    (Ollama's final ``done`` record, llama.cpp's ``timings``) and "client"
+    when the stream was cut short and the split was measured around the
+    first token instead; client prefill is time to first token and includes
+    any queueing in front of the request.
+    """
+    prompt_tokens_est: int
+    prompt_eval_count: int
+    prompt_eval_ms: float
+    eval_count: int
+    eval_ms: float
+    source: str = "server"
+
+
 @dataclass
 class CacheEntry:
     """Cache entry for incremental analysis."""
@@ -228,10 +262,23 @@ class AnalysisConfig:
     output_dir: Path
     model: str = "qwen2.5-coder:7b-instruct"
     max_concurrent: int = 8
+    max_concurrent_ceiling: int = 32
+    adaptive_concurrency: bool = True
+    endpoints: list[str] = field(default_factory=list)  # [flavor=]url, empty = OLLAMA_HOST
+    queue_size: int = 16
+    chunk_tokens: int = 1536  # code tokens per prompt before a module is split
     timeout: int = 120
+    keep_alive: str | None = "30m"  # Ollama keep_alive, keeps the prefix cache warm
     use_cache: bool = True
+    dedup: bool = True  # derive near-duplicate modules from their closest neighbour
+    stream: bool = True
+    since: str | None = None  # git revision range for incremental runs
     cache_db: Path = Path("/var/lib/arch-analyzer/cache.db")
-    self_analyze: bool = True
+    cache_invalidate: str | None = None  # model, stale-prompts, all
+    cache_max_bytes: int | None = 512 * 1024 * 1024
+    self_analyze: bool = False  # LLM review of analyzer.py, ~40 uncached calls
     auto_fix: bool = False
     dry_run: bool = True
     verbose: bool = False
+    trace: Path | None = None  # timing spans output file
+    trace_format: str = "chrome"  # chrome or otlp
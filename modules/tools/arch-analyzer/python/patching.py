@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Batched Patch Application for Architecture Analyzer
+====================================================
+Applies line-range fixes one file at a time.
+
+- Stale hunks are rejected, overlaps are resolved by priority, and
+  offsets are carried forward so later hunks land on the right lines
+- Each file is written once, atomically (temp file + fsync + rename)
+- Originals are backed up to disk per session before being replaced
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import shutil
+import tempfile
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Iterator, TextIO
+
+
+@dataclass
+class Hunk:
+    """Replace lines ``start``..``end`` (1-based, inclusive) of a file."""
+    key: str  # fix id
+    start: int
+    end: int
+    original: str  # expected current text of the range, "" to skip the check
+    replacement: str
+    priority: float = 0.0  # of two overlapping hunks, the higher one is kept
+
+
+def apply_hunks(content: str, hunks: list[Hunk]) -> tuple[str, list[str], dict[str, str]]:
+    """Apply non-overlapping hunks to ``content`` in one pass.
+
+    Hunks are accepted in priority order (input order for ties), so a hunk
+    only loses to an overlapping one of higher priority. The accepted ones
+    are then applied in line order, with offsets carried forward.
+
+    Returns:
+        Tuple of (new content, applied hunk keys, {rejected key: reason})
+    """
+    lines = content.splitlines(keepends=True)
+    total = len(lines)  # hunk ranges refer to the original lines
+    accepted: list[Hunk] = []
+    rejected: dict[str, str] = {}
+    for hunk in sorted(hunks, key=lambda h: -h.priority):
+        if hunk.start < 1 or hunk.end < hunk.start - 1 or hunk.end > total:
+            rejected[hunk.key] = f"lines {hunk.start}-{hunk.end} out of range"
+            continue
+        current = [line.rstrip("\r\n") for line in lines[hunk.start - 1:hunk.end]]
+        if hunk.original and current != hunk.original.splitlines():
+            rejected[hunk.key] = "file changed since the fix was generated"
+            continue
+        # An insertion (end == start - 1) only overlaps ranges it falls inside
+        other = next(
+            (h for h in accepted if hunk.start <= h.end and h.start <= hunk.end), None
+        )
+        if other is not None:
+            rejected[hunk.key] = (
+                f"overlaps {other.key} (lines {other.start}-{other.end}), which takes priority"
+            )
+            continue
+        accepted.append(hunk)
+
+    applied: list[str] = []
+    offset = 0
+    for hunk in sorted(accepted, key=lambda h: (h.start, h.end)):
+        start, end = hunk.start - 1 + offset, hunk.end + offset
+        replacement = hunk.replacement.splitlines(keepends=True)
+        # Keep the line break after the range (or at the end of the file)
+        ends_line = end < len(lines) or (end > start and lines[end - 1].endswith("\n"))
+        if replacement and not replacement[-1].endswith("\n") and ends_line:
+            replacement[-1] += "\n"
+        lines[start:end] = replacement
+        offset += len(replacement) - (end - start)
+        applied.append(hunk.key)
+    return "".join(lines), applied, rejected
+
+
+@contextmanager
+def atomic_open(path: Path) -> Iterator[TextIO]:
+    """Text handle whose content replaces ``path`` only if the block succeeds.
+
+    Written to a temp file in the same directory, fsynced and renamed, so
+    readers never see a partial file.
+    """
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w") as f:
+            yield f
+            f.flush()
+            os.fsync(f.fileno())
+        if path.exists():
+            shutil.copymode(path, tmp)
+        os.replace(tmp, path)
+    except BaseException:
+        Path(tmp).unlink(missing_ok=True)
+        raise
+
+
+def atomic_write(path: Path, content: str):
+    """Replace ``path`` with ``content`` so readers never see a partial file."""
+    with atomic_open(path) as f:
+        f.write(content)
+
+
+class BackupStore:
+    """On-disk backups of patched files, one directory per session.
+
+    Layout: ``<root>/<session>/files/<rel_path>`` plus a ``manifest.json``
+    listing the paths saved in that session.
+    """
+
+    MANIFEST = "manifest.json"
+
+    def __init__(self, root: Path):
+        self.root = root
+        self._session: Path | None = None
+        self._saved: list[str] = []
+
+    @property
+    def session(self) -> Path:
+        """Directory of the current session, created on first use."""
+        if self._session is None:
+            name = datetime.now().strftime("%Y%m%dT%H%M%S.%f")
+            self._session = self.root / name
+            (self._session / "files").mkdir(parents=True, exist_ok=True)
+        return self._session
+
+    def save(self, rel_path: str, content: str):
+        """Back up a file's current content before it is replaced."""
+        target = self.session / "files" / rel_path
+        target.parent.mkdir(parents=True, exist_ok=True)
+        if target.exists():
+            return  # keep the first (pre-session) version
+        atomic_write(target, content)
+        self._saved.append(rel_path)
+        manifest = {"created": self.session.name, "files": self._saved}
+        atomic_write(self.session / self.MANIFEST, json.dumps(manifest, indent=2))
+
+    def sessions(self) -> list[Path]:
+        """Sessions with a manifest, oldest first."""
+        if not self.root.is_dir():
+            return []
+        return sorted(p for p in self.root.iterdir() if (p / self.MANIFEST).is_file())
+
+    def files(self, session: Path) -> list[str]:
+        return json.loads((session / self.MANIFEST).read_text()).get("files", [])
+
+    def latest(self, rel_path: str) -> Path | None:
+        """Newest backup of ``rel_path`` across sessions."""
+        for session in reversed(self.sessions()):
+            backup = session / "files" / rel_path
+            if backup.is_file():
+                return backup
+        return None
+
+    def restore(self, repo_root: Path, session: Path) -> list[str]:
+        """Put every file saved in ``session`` back; returns restored paths."""
+        restored = []
+        for rel_path in self.files(session):
+            backup = session / "files" / rel_path
+            if backup.is_file():
+                atomic_write(repo_root / rel_path, backup.read_text())
+                restored.append(rel_path)
+        return restored
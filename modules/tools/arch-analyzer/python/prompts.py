@@ -5,6 +5,9 @@ LLM Prompt Templates for Architecture Analyzer
 Structured prompts for Ollama/LLM integration.
 """
 
+import hashlib
+import string
+
 PROMPTS = {
     # =========================================================================
     # MODULE ANALYSIS - Semantic understanding of individual modules
@@ -16,7 +19,22 @@ Focus on: purpose, complexity, dependencies, security implications, and issues.
 Be concise and technical. Use only facts from the code provided.
 Respond ONLY with valid JSON, no markdown or explanation.""",
 
-        "template": """Analyze this NixOS module and provide structured analysis.
+        # Instructions and schema come before any per-file field so every
+        # request shares the same token prefix (see shared_prefix()).
+        "template": """Analyze the NixOS module below and provide structured analysis.
+
+Respond with this exact JSON structure:
+{{
+  "purpose": "One sentence describing what this module does",
+  "complexity": "low|medium|high|critical",
+  "dependencies": ["explicit nix module dependencies found"],
+  "options_defined": ["list of mkOption/mkEnableOption names"],
+  "security_concerns": ["security issues if any, empty if none"],
+  "issues": [
+    {{"severity": "info|warning|error", "message": "issue description", "line": null}}
+  ],
+  "recommendations": ["improvement suggestions"]
+}}
 
 FILE: {filename}
 CATEGORY: {category}
@@ -24,7 +42,23 @@ LINES: {lines}
 
 ```nix
 {code}
-```
+```"""
+    },
+
+    # =========================================================================
+    # MODULE DELTA - Update a near-duplicate's analysis from a diff
+    # =========================================================================
+    "module_delta": {
+        "system": """You are an expert NixOS configuration analyst specializing in Nix modules.
+Analyze code precisely and provide structured, factual analysis.
+Focus on: purpose, complexity, dependencies, security implications, and issues.
+Be concise and technical. Use only facts from the code provided.
+Respond ONLY with valid JSON, no markdown or explanation.""",
+
+        "template": """A NixOS module is a near-copy of a reference module that was already analyzed.
+Update the reference analysis so it describes the new module: change only what
+the diff affects, keep everything else, and drop entries the diff removes.
+Line numbers refer to the new module.
 
 Respond with this exact JSON structure:
 {{
@@ -37,7 +71,20 @@ Respond with this exact JSON structure:
     {{"severity": "info|warning|error", "message": "issue description", "line": null}}
   ],
   "recommendations": ["improvement suggestions"]
-}}"""
+}}
+
+FILE: {filename}
+CATEGORY: {category}
+LINES: {lines}
+REFERENCE: {reference}
+
+REFERENCE ANALYSIS:
+{reference_analysis}
+
+DIFF (reference -> this module):
+```diff
+{diff}
+```"""
     },
 
     # =========================================================================
@@ -154,14 +201,7 @@ Identify issues, bugs, improvements, and rate overall quality.
 Be critical but constructive.
 Respond ONLY with valid JSON.""",
 
-        "template": """Analyze this architecture analyzer code for quality and issues.
-
-FILE: {filename}
-LINES: {lines}
-
-```python
-{code}
-```
+        "template": """Analyze the architecture analyzer code below for quality and issues.
 
 Check for:
 - Bugs or logic errors
@@ -179,7 +219,14 @@ Respond with this exact JSON:
   ],
   "improvements": ["specific suggestions"],
   "missing_features": ["features that should be added"]
-}}"""
+}}
+
+FILE: {filename}
+LINES: {lines}
+
+```python
+{code}
+```"""
     },
 
     # =========================================================================
@@ -237,3 +284,40 @@ def get_prompt(name: str, **kwargs) -> tuple[str, str]:
     template = prompt_config["template"].format(**kwargs)
     
     return system, template
+
+
+
+def prompt_fingerprint(name: str) -> str:
+    """Stable short hash of a prompt's system message and template.
+
+    Used in cache keys so edits to a template invalidate only the results
+    produced with the old wording.
+    """
+    if name not in PROMPTS:
+        raise ValueError(f"Unknown prompt: {name}")
+
+    prompt_config = PROMPTS[name]
+    h = hashlib.blake2b(digest_size=8)
+    h.update(prompt_config["system"].encode())
+    h.update(b"\0")
+    h.update(prompt_config["template"].encode())
+    return h.hexdigest()
+
+
+def shared_prefix(name: str) -> str:
+    """System message plus the template text before its first placeholder.
+
+    This part is identical for every request made with the prompt, so a
+    server with prefix caching (Ollama, llama.cpp ``cache_prompt``) only
+    evaluates it once per loaded model.
+    """
+    if name not in PROMPTS:
+        raise ValueError(f"Unknown prompt: {name}")
+
+    prompt_config = PROMPTS[name]
+    prefix = []
+    for literal, field_name, _, _ in string.Formatter().parse(prompt_config["template"]):
+        prefix.append(literal)
+        if field_name is not None:
+            break
+    return prompt_config["system"] + "\n" + "".join(prefix)
@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+"""
+Nix Import Resolution for Architecture Analyzer
+================================================
+Finds the files a Nix module imports and resolves them to repo paths.
+
+- A small tokenizer skips comments and strings (including ``${}``
+  interpolation), so commented-out or quoted paths are not edges
+- Path literals are collected from ``imports = <expr>;`` bindings (plain
+  lists, ``lib.optionals``, ``++`` concatenations) and ``import <path>``
+- Directories resolve to their ``default.nix``; results are memoized per
+  importing directory
+"""
+
+from __future__ import annotations
+
+import os
+import re
+from pathlib import Path
+from typing import Iterator
+
+# Path literals are ./a, ../a/b.nix or ./. ; an interpolated tail is
+# checked separately. Unnamed alternatives (whitespace, comments) are skipped.
+TOKEN = re.compile(
+    r"\s+|#[^\n]*|/\*.*?(?:\*/|\Z)"
+    r"|(?P<str>\"|'')"
+    r"|(?P<path>\.{1,2}(?:/[\w.+-]+)+)"
+    r"|(?P<id>[A-Za-z_][\w'-]*)"
+    r"|(?P<punct>.)",
+    re.DOTALL,
+)
+
+# Everything extract_imports has to look at: comment and string openers
+# (so their contents are skipped) and the two import keywords
+LANDMARK = re.compile(r"#|/\*|\"|''|(?<![\w'-])imports?(?![\w'-])")
+
+# String bodies up to an interpolation or the closing quote; ''' ''$ and
+# ''\x are escapes inside indented strings
+STRING_BODY = re.compile(r'(?:[^"\\$]+|\\.|\$(?!\{))*', re.DOTALL)
+INDENTED_BODY = re.compile(r"(?:[^'$]+|'(?!')|''(?:'|\$|\\.)|\$(?!\{))*", re.DOTALL)
+
+CODE_RUN = re.compile(r"[^\"'{}]*")  # interpolated code up to a brace or quote
+
+OPENERS = "([{"
+CLOSERS = ")]}"
+
+
+def tokenize(content: str, start: int = 0) -> Iterator[tuple[str, str, int]]:
+    """Yield (kind, text, end) tokens: ``path``, ``id``, ``str`` or ``punct``.
+
+    Whitespace and comments are dropped; string bodies are returned as a
+    single opaque ``str`` token. Paths with interpolation are skipped.
+    """
+    i, n = start, len(content)
+    match = TOKEN.match
+    while i < n:
+        m = match(content, i)
+        kind = m.lastgroup
+        i = m.end()
+        if kind is None:  # whitespace or comment
+            continue
+        if kind == "str":
+            i = _string_end(content, m.start())
+            yield "str", content[m.start():i], i
+        elif kind == "path" and content.startswith(("${", "/${"), i):
+            i = _skip_interpolated_path(content, i)
+        else:
+            yield kind, m.group(), i
+
+
+def _string_end(content: str, start: int) -> int:
+    """Offset just past the string starting at ``start``."""
+    indented = content[start] == "'"
+    body = INDENTED_BODY if indented else STRING_BODY
+    quote = 2 if indented else 1
+    i, n = start + quote, len(content)
+    while i < n:
+        i = body.match(content, i).end()
+        if content.startswith("${", i):
+            i = _interpolation_end(content, i + 2)
+        elif i < n:
+            return i + quote
+    return n
+
+
+def _interpolation_end(content: str, i: int) -> int:
+    """Offset just past the ``}`` closing an interpolation opened before ``i``."""
+    depth, n = 1, len(content)
+    while depth:
+        i = CODE_RUN.match(content, i).end()
+        if i >= n:
+            break
+        ch = content[i]
+        if ch == '"' or content.startswith("''", i):
+            i = _string_end(content, i)
+            continue
+        if ch == "{":
+            depth += 1
+        elif ch == "}":
+            depth -= 1
+        i += 1
+    return i
+
+
+def _skip_interpolated_path(content: str, i: int) -> int:
+    """Skip the rest of a path such as ``./hosts/${name}/default.nix``."""
+    n = len(content)
+    while i < n:
+        if content.startswith("${", i):
+            i = _interpolation_end(content, i + 2)
+        elif content[i].isalnum() or content[i] in "/._+-":
+            i += 1
+        else:
+            break
+    return i
+
+
+def extract_imports(content: str) -> list[str]:
+    """Path literals a module imports, in source order without duplicates.
+
+    Covers every path inside an ``imports = ...;`` binding and the
+    argument of each ``import`` call. Text between keywords is skipped
+    with one regex search; only the bindings themselves are tokenized.
+    """
+    found: dict[str, None] = {}
+    i = 0
+    search = LANDMARK.search
+    while m := search(content, i):
+        i = m.end()
+        landmark = m.group()
+        if landmark == "#":
+            end = content.find("\n", i)
+            i = len(content) if end < 0 else end + 1
+        elif landmark == "/*":
+            end = content.find("*/", i)
+            i = len(content) if end < 0 else end + 2
+        elif landmark in ('"', "''"):
+            i = _string_end(content, m.start())
+        elif landmark == "import":
+            # The argument may be parenthesized: import (./foo.nix) {}
+            tokens = tokenize(content, i)
+            kind, text, end = next(tokens, ("", "", i))
+            while (kind, text) == ("punct", "("):
+                kind, text, end = next(tokens, ("", "", end))
+            if kind == "path":
+                found[text] = None
+                i = end
+        else:  # imports
+            i = _collect_binding(content, i, found)
+    return list(found)
+
+
+def _collect_binding(content: str, i: int, found: dict[str, None]) -> int:
+    """Collect paths of an ``imports = ...;`` binding; returns where it ends."""
+    tokens = tokenize(content, i)
+    first = next(tokens, None)
+    if first is None or first[:2] != ("punct", "="):
+        return i
+    depth = 0
+    end = first[2]
+    for kind, text, end in tokens:
+        if kind == "path":
+            found[text] = None
+        elif kind == "punct":
+            if text in OPENERS:
+                depth += 1
+            elif text in CLOSERS:
+                depth -= 1
+                if depth < 0:
+                    break
+            elif text == ";" and depth == 0:
+                break
+    return end
+
+
+class ImportResolver:
+    """Maps import path literals to repo-relative module paths.
+
+    Lookups are memoized per importing directory, since sibling modules
+    tend to import the same shared files.
+    """
+
+    def __init__(self, repo_root: Path):
+        self.repo_root = os.path.abspath(repo_root)
+        self._memo: dict[str, dict[str, str | None]] = {}
+
+    def resolve(self, importer: Path, spec: str) -> str | None:
+        """Relative path of the ``.nix`` file ``spec`` refers to, if in the repo."""
+        directory = os.path.dirname(os.path.abspath(importer))
+        memo = self._memo.setdefault(directory, {})
+        if spec not in memo:
+            memo[spec] = self._resolve(directory, spec)
+        return memo[spec]
+
+    def _resolve(self, directory: str, spec: str) -> str | None:
+        if not spec.startswith(("./", "../")):
+            return None
+        target = os.path.normpath(os.path.join(directory, spec))
+        if os.path.isdir(target):
+            target = os.path.join(target, "default.nix")
+        if not target.endswith(".nix") or not os.path.isfile(target):
+            return None
+        rel_path = os.path.relpath(target, self.repo_root)
+        if rel_path.startswith(".."):
+            return None
+        return rel_path
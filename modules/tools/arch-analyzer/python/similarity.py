@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Near-Duplicate Detection for Architecture Analyzer
+===================================================
+Bottom-k MinHash sketches over 4-token shingles of Nix source.
+
+- Whitespace is ignored; comments and attribute values are kept, so two
+  host modules that differ in a few values still score close to 1.0
+  while modules that only share boilerplate do not
+- Sketches are fixed-size and persisted next to the analysis cache
+- ``SimilarityIndex.best_match`` finds the closest analyzed module
+"""
+
+from __future__ import annotations
+
+import difflib
+import hashlib
+import heapq
+import re
+import struct
+from dataclasses import dataclass
+
+SKETCH_SIZE = 128  # smallest shingle hashes kept per module
+REUSE_THRESHOLD = 1.0  # candidates for reuse as-is, if their token sequences match too
+DELTA_THRESHOLD = 0.75  # analyze only the diff against the neighbour
+MAX_SIZE_RATIO = 1.5  # neighbours must be within this line-count ratio
+MIN_TOKENS = 64  # smaller modules are cheap to analyze and too noisy to match
+
+TOKEN_PATTERN = re.compile(
+    r'"(?:[^"\\]|\\.)*"|/\*.*?\*/|#[^\n]*|[A-Za-z_][\w\'-]*|\d+|\S', re.DOTALL
+)
+_MASK = (1 << 64) - 1
+
+Sketch = tuple[int, ...]
+
+
+def tokenize(content: str) -> list[str]:
+    """Nix tokens (strings and comments whole) with layout removed."""
+    return TOKEN_PATTERN.findall(content)
+
+
+def _mix(h: int) -> int:
+    """splitmix64 finalizer: spreads combined token hashes over 64 bits."""
+    h = ((h ^ (h >> 30)) * 0xBF58476D1CE4E5B9) & _MASK
+    h = ((h ^ (h >> 27)) * 0x94D049BB133111EB) & _MASK
+    return h ^ (h >> 31)
+
+
+def sketch(content: str, size: int = SKETCH_SIZE) -> Sketch:
+    """Sorted ``size`` smallest 64-bit hashes of the token shingles.
+
+    Modules under ``MIN_TOKENS`` get an empty sketch and never match.
+    """
+    tokens = tokenize(content)
+    if len(tokens) < MIN_TOKENS:
+        return ()
+    # Hash each distinct token once, then combine each run of 4 arithmetically
+    memo: dict[str, int] = {}
+    ids = []
+    for tok in tokens:
+        h = memo.get(tok)
+        if h is None:
+            h = int.from_bytes(hashlib.blake2b(tok.encode(), digest_size=8).digest(), "little")
+            memo[tok] = h
+        ids.append(h)
+    hashes = {
+        _mix((a ^ (b << 1) ^ (c << 2) ^ (d << 3)) & _MASK)
+        for a, b, c, d in zip(ids, ids[1:], ids[2:], ids[3:])
+    }
+    return tuple(heapq.nsmallest(size, hashes))
+
+
+def similarity(a: Sketch, b: Sketch, size: int = SKETCH_SIZE) -> float:
+    """Bottom-k estimate of the Jaccard similarity of two shingle sets."""
+    if not a or not b:
+        return 0.0
+    union = sorted(set(a) | set(b))[:size]
+    both = set(a) & set(b)
+    return sum(1 for h in union if h in both) / len(union)
+
+
+def pack_sketch(s: Sketch) -> bytes:
+    return struct.pack(f"<{len(s)}Q", *s)
+
+
+def unpack_sketch(blob: bytes) -> Sketch:
+    return struct.unpack(f"<{len(blob) // 8}Q", blob)
+
+
+def unified_delta(old: str, new: str, old_name: str, new_name: str) -> str:
+    """Unified diff from a neighbour module to this one."""
+    return "".join(
+        difflib.unified_diff(
+            old.splitlines(keepends=True),
+            new.splitlines(keepends=True),
+            fromfile=old_name,
+            tofile=new_name,
+            n=2,
+        )
+    )
+
+
+# ═══════════════════════════════════════════════════════════════════════════
+# Index
+# ═══════════════════════════════════════════════════════════════════════════
+
+@dataclass
+class IndexEntry:
+    """An analyzed module that later modules may be derived from."""
+    key: str  # content hash
+    sketch: Sketch
+    lines: int
+    category: str
+
+
+class SimilarityIndex:
+    """In-memory nearest-neighbour lookup over module sketches.
+
+    Candidates are restricted to the same category and a similar size
+    before sketches are compared, which keeps the linear scan cheap for
+    repositories with a few thousand modules.
+    """
+
+    def __init__(self):
+        self._by_category: dict[str, list[IndexEntry]] = {}
+        self._keys: set[str] = set()
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._keys
+
+    def add(self, entry: IndexEntry):
+        if entry.key in self._keys:
+            return
+        self._keys.add(entry.key)
+        self._by_category.setdefault(entry.category, []).append(entry)
+
+    def best_match(
+        self,
+        s: Sketch,
+        lines: int,
+        category: str,
+        threshold: float = DELTA_THRESHOLD,
+    ) -> tuple[IndexEntry, float] | None:
+        """Closest entry scoring at least ``threshold``, if any."""
+        best: tuple[IndexEntry, float] | None = None
+        for entry in self._by_category.get(category, []):
+            low, high = sorted((max(lines, 1), max(entry.lines, 1)))
+            if high / low > MAX_SIZE_RATIO:
+                continue
+            score = similarity(s, entry.sketch)
+            if score >= threshold and (best is None or score > best[1]):
+                best = (entry, score)
+        return best
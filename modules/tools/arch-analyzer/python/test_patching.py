@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+"""Tests for patching.apply_hunks (run with ``python -m unittest``)."""
+
+import unittest
+
+from patching import Hunk, apply_hunks
+
+CONTENT = "a\nb\nc\nd\ne\n"
+
+
+class ApplyHunksTest(unittest.TestCase):
+    def test_higher_priority_wins_overlap(self):
+        hunks = [
+            Hunk("low", 1, 2, "a\nb", "X", priority=0.3),
+            Hunk("high", 2, 3, "b\nc", "Y", priority=0.9),
+        ]
+        content, applied, rejected = apply_hunks(CONTENT, hunks)
+        self.assertEqual(content, "a\nY\nd\ne\n")
+        self.assertEqual(applied, ["high"])
+        self.assertIn("low", rejected)
+
+    def test_offsets_carry_forward(self):
+        hunks = [
+            Hunk("grow", 1, 1, "a", "a1\na2\na3"),
+            Hunk("insert", 3, 2, "", "new"),
+            Hunk("drop", 4, 5, "d\ne", ""),
+        ]
+        content, applied, rejected = apply_hunks(CONTENT, hunks)
+        self.assertEqual(content, "a1\na2\na3\nb\nnew\nc\n")
+        self.assertEqual(applied, ["grow", "insert", "drop"])
+        self.assertEqual(rejected, {})
+
+    def test_stale_text_rejected(self):
+        hunks = [
+            Hunk("stale", 2, 2, "not b", "X", priority=0.9),
+            Hunk("fresh", 2, 3, "b\nc", "Y", priority=0.1),
+        ]
+        content, applied, rejected = apply_hunks(CONTENT, hunks)
+        self.assertEqual(content, "a\nY\nd\ne\n")
+        self.assertEqual(applied, ["fresh"])
+        self.assertEqual(rejected, {"stale": "file changed since the fix was generated"})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,265 @@
+#!/usr/bin/env python3
+"""
+Run Tracing for Architecture Analyzer
+======================================
+Nested wall-clock spans for pipeline stages and LLM calls.
+
+- ``span()`` times a block; ``record()`` adds a span measured elsewhere
+  (e.g. prefill/decode split from server counters)
+- Spans nest through a context variable, so they follow asyncio tasks
+  and ``asyncio.to_thread`` calls
+- Concurrent spans get separate lanes (trace "threads") so each lane
+  nests cleanly in a trace viewer
+- Export as Chrome trace-event JSON (chrome://tracing, Perfetto) or
+  OTLP/JSON spans
+
+Without an active tracer ``span()`` and ``record()`` do nothing.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar, Token
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Iterator, TextIO
+
+from patching import atomic_open
+
+TRACE_FORMATS = ("chrome", "otlp")
+TRACE_MAX_SPANS = 1_000_000  # spans kept per run; later ones are only counted
+SERVICE_NAME = "arch-analyzer"
+
+
+@dataclass
+class Span:
+    """One timed operation; times are ``time.monotonic()`` seconds."""
+    name: str
+    category: str
+    start: float
+    end: float = 0.0
+    span_id: int = 0
+    parent_id: int | None = None
+    lane: int = 0
+    args: dict[str, Any] = field(default_factory=dict)
+
+
+@dataclass
+class _Open:
+    """The innermost open span of a context, and who opened it."""
+    tracer: Tracer
+    span: Span | None
+    owner: object
+
+
+_active: ContextVar[_Open | None] = ContextVar("arch_trace", default=None)
+
+
+def _owner() -> object:
+    """The task (or thread, outside an event loop) running the caller."""
+    try:
+        task = asyncio.current_task()
+    except RuntimeError:
+        task = None
+    return task if task is not None else threading.get_ident()
+
+
+class Tracer:
+    """Collects spans for one run and writes them out."""
+
+    def __init__(self, max_spans: int = TRACE_MAX_SPANS):
+        self.spans: list[Span] = []
+        self.max_spans = max_spans
+        self.dropped = 0
+        self.trace_id = os.urandom(16).hex()
+        # Monotonic clock offset to wall-clock nanoseconds, for OTLP
+        self._wall_offset_ns = time.time_ns() - int(time.monotonic() * 1e9)
+        self._next_id = 0
+        self._busy: set[int] = set()
+        self._lock = threading.Lock()
+
+    def _open(self, name: str, category: str, start: float, parent: _Open | None,
+              args: dict[str, Any], leaf: bool = False) -> tuple[Span, bool]:
+        """Create a span under ``parent``; returns it and whether it took a new lane.
+
+        ``leaf`` spans (already measured, inside their parent) always
+        share the parent's lane.
+        """
+        with self._lock:
+            self._next_id += 1
+            span = Span(name, category, start, span_id=self._next_id, args=args)
+            new_lane = True
+            if parent is not None and parent.span is not None:
+                span.parent_id = parent.span.span_id
+                # A span of the same task nests in its parent's lane; one
+                # started concurrently elsewhere needs a free lane
+                if leaf or parent.owner is _owner():
+                    span.lane = parent.span.lane
+                    new_lane = False
+            if new_lane:
+                lane = 0
+                while lane in self._busy:
+                    lane += 1
+                self._busy.add(lane)
+                span.lane = lane
+        return span, new_lane
+
+    def _close(self, span: Span, new_lane: bool):
+        with self._lock:
+            if new_lane:
+                self._busy.discard(span.lane)
+            self._keep(span)
+
+    def _keep(self, span: Span):
+        if len(self.spans) < self.max_spans:
+            self.spans.append(span)
+        else:
+            self.dropped += 1
+
+    # ── export ────────────────────────────────────────────────────────────
+
+    def chrome_events(self) -> Iterator[dict[str, Any]]:
+        """Trace events: one complete (``X``) event per span plus lane names."""
+        origin = min((s.start for s in self.spans), default=0.0)
+        lanes = sorted({s.lane for s in self.spans})
+        yield {"ph": "M", "name": "process_name", "pid": 1, "args": {"name": SERVICE_NAME}}
+        for lane in lanes:
+            yield {
+                "ph": "M", "name": "thread_name", "pid": 1, "tid": lane,
+                "args": {"name": "pipeline" if lane == 0 else f"lane {lane}"},
+            }
+        for s in sorted(self.spans, key=lambda s: (s.lane, s.start, -s.end)):
+            # Round both ends, so abutting spans do not overlap by a rounding error
+            ts = round((s.start - origin) * 1e6, 1)
+            yield {
+                "ph": "X",
+                "name": s.name,
+                "cat": s.category,
+                "pid": 1,
+                "tid": s.lane,
+                "ts": ts,
+                "dur": round(round((s.end - origin) * 1e6, 1) - ts, 1),
+                "args": s.args,
+            }
+
+    def write_chrome(self, out: TextIO):
+        """Write Chrome trace-event JSON, one event per line."""
+        out.write('{"displayTimeUnit": "ms", "traceEvents": [\n')
+        for i, event in enumerate(self.chrome_events()):
+            out.write(",\n" if i else "")
+            out.write(json.dumps(event, default=str))
+        out.write("\n]}\n")
+
+    def otlp_spans(self) -> Iterator[dict[str, Any]]:
+        """Spans in the OTLP/JSON encoding (hex ids, string nanoseconds)."""
+        for s in self.spans:
+            span = {
+                "traceId": self.trace_id,
+                "spanId": f"{s.span_id:016x}",
+                "name": s.name,
+                "kind": 1,  # SPAN_KIND_INTERNAL
+                "startTimeUnixNano": str(int(s.start * 1e9) + self._wall_offset_ns),
+                "endTimeUnixNano": str(int(s.end * 1e9) + self._wall_offset_ns),
+                "attributes": [_otlp_attribute("category", s.category)]
+                + [_otlp_attribute(k, v) for k, v in s.args.items()],
+            }
+            if s.parent_id is not None:
+                span["parentSpanId"] = f"{s.parent_id:016x}"
+            yield span
+
+    def write_otlp(self, out: TextIO):
+        """Write an OTLP/JSON ``ExportTraceServiceRequest``, one span per line."""
+        resource = {"attributes": [_otlp_attribute("service.name", SERVICE_NAME)]}
+        out.write('{"resourceSpans": [{"resource": ')
+        out.write(json.dumps(resource))
+        out.write(', "scopeSpans": [{"scope": {"name": "%s"}, "spans": [\n' % SERVICE_NAME)
+        for i, span in enumerate(self.otlp_spans()):
+            out.write(",\n" if i else "")
+            out.write(json.dumps(span))
+        out.write("\n]}]}]}\n")
+
+    def save(self, path: Path, fmt: str = "chrome") -> Path:
+        """Write the trace to ``path`` in one of ``TRACE_FORMATS``."""
+        if fmt not in TRACE_FORMATS:
+            raise ValueError(f"Unknown trace format {fmt!r}, expected one of {TRACE_FORMATS}")
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with atomic_open(path) as out:
+            if fmt == "otlp":
+                self.write_otlp(out)
+            else:
+                self.write_chrome(out)
+        return path
+
+    def stage_totals(self, parent: str) -> dict[str, float]:
+        """Seconds spent per child span of the spans named ``parent``, longest first."""
+        parents = {s.span_id for s in self.spans if s.name == parent}
+        totals: dict[str, float] = {}
+        for s in self.spans:
+            if s.parent_id in parents:
+                totals[s.name] = totals.get(s.name, 0.0) + s.end - s.start
+        return dict(sorted(totals.items(), key=lambda kv: -kv[1]))
+
+
+def _otlp_attribute(key: str, value: Any) -> dict[str, Any]:
+    if isinstance(value, bool):
+        typed = {"boolValue": value}
+    elif isinstance(value, int):
+        typed = {"intValue": str(value)}
+    elif isinstance(value, float):
+        typed = {"doubleValue": value}
+    else:
+        typed = {"stringValue": str(value)}
+    return {"key": key, "value": typed}
+
+
+def activate(tracer: Tracer | None) -> Token:
+    """Make ``tracer`` receive spans from this context (and tasks it starts)."""
+    return _active.set(_Open(tracer, None, _owner()) if tracer else None)
+
+
+def deactivate(token: Token):
+    _active.reset(token)
+
+
+@contextmanager
+def span(name: str, category: str = "stage", **args: Any) -> Iterator[dict[str, Any]]:
+    """Time the enclosed block as a child of the current span.
+
+    Yields the span's attribute dict, so results known only at the end
+    (token counts, cache hits) can be attached.
+    """
+    parent = _active.get()
+    if parent is None:
+        yield args
+        return
+    tracer = parent.tracer
+    current, new_lane = tracer._open(name, category, time.monotonic(), parent, args)
+    token = _active.set(_Open(tracer, current, _owner()))
+    try:
+        yield current.args
+    finally:
+        _active.reset(token)
+        current.end = time.monotonic()
+        tracer._close(current, new_lane)
+
+
+def record(name: str, start: float, end: float, category: str = "llm", **args: Any):
+    """Add an already-measured span under the current one.
+
+    ``start``/``end`` are ``time.monotonic()`` values; the span is clamped
+    to start no earlier than its parent.
+    """
+    parent = _active.get()
+    if parent is None:
+        return
+    if parent.span is not None:
+        start = max(start, parent.span.start)
+    tracer = parent.tracer
+    done, new_lane = tracer._open(name, category, start, parent, args, leaf=True)
+    done.end = max(start, end)
+    tracer._close(done, new_lane)
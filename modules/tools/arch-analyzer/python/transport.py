@@ -0,0 +1,379 @@
+#!/usr/bin/env python3
+"""
+Async HTTP Transport for Architecture Analyzer
+===============================================
+Minimal HTTP/1.1 client on top of asyncio streams (stdlib only).
+
+Features:
+- Persistent keep-alive connections, pooled per host
+- Per-host connection limits (in-flight requests wait for a free slot)
+- Content-Length, chunked and read-until-close bodies
+- Line streaming for NDJSON endpoints (Ollama ``stream: true``)
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import ssl
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator
+from urllib.parse import urlsplit
+
+DEFAULT_LIMIT_PER_HOST = 32
+DEFAULT_IDLE_TIMEOUT = 60.0
+USER_AGENT = "arch-analyzer"
+
+
+class TransportError(ConnectionError):
+    """Raised when a request cannot be completed at the transport level."""
+
+
+@dataclass
+class HTTPResponse:
+    """A fully-read HTTP response."""
+    status: int
+    headers: dict[str, str] = field(default_factory=dict)
+    body: bytes = b""
+
+    def text(self) -> str:
+        return self.body.decode(errors="replace")
+
+    def json(self) -> Any:
+        return json.loads(self.body)
+
+
+# ═══════════════════════════════════════════════════════════════════════════
+# Connections
+# ═══════════════════════════════════════════════════════════════════════════
+
+class _Connection:
+    """A single keep-alive HTTP/1.1 connection."""
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.reader = reader
+        self.writer = writer
+        self.reusable = True
+        self.idle_since = 0.0
+
+    @property
+    def closed(self) -> bool:
+        return self.writer.is_closing() or self.reader.at_eof()
+
+    def close(self):
+        self.reusable = False
+        try:
+            self.writer.close()
+        except Exception:
+            pass
+
+
+class _HostPool:
+    """Idle connections and an in-flight limit for one (scheme, host, port)."""
+
+    def __init__(self, limit: int):
+        self.idle: deque[_Connection] = deque()
+        self.slots = asyncio.Semaphore(limit)
+        self.opened = 0
+        self.reused = 0
+
+
+class StreamingResponse:
+    """An HTTP response whose body is consumed incrementally.
+
+    Leaving the ``stream()`` context before the body is fully read closes the
+    underlying connection, which makes the server abort the request.
+    """
+
+    def __init__(self, conn: _Connection, status: int, headers: dict[str, str]):
+        self._conn = conn
+        self.status = status
+        self.headers = headers
+        self.complete = False
+        self._chunks = _iter_body(conn, status, headers)
+
+    async def iter_chunks(self) -> AsyncIterator[bytes]:
+        async for chunk in self._chunks:
+            yield chunk
+        self.complete = True
+
+    async def iter_lines(self) -> AsyncIterator[bytes]:
+        buf = b""
+        async for chunk in self.iter_chunks():
+            buf += chunk
+            while b"\n" in buf:
+                line, buf = buf.split(b"\n", 1)
+                if line.strip():
+                    yield line
+        if buf.strip():
+            yield buf
+
+    async def read(self) -> bytes:
+        return b"".join([c async for c in self.iter_chunks()])
+
+
+# ═══════════════════════════════════════════════════════════════════════════
+# Transport
+# ═══════════════════════════════════════════════════════════════════════════
+
+class AsyncHTTPTransport:
+    """Pooled keep-alive HTTP/1.1 transport for JSON APIs."""
+
+    def __init__(
+        self,
+        limit_per_host: int = DEFAULT_LIMIT_PER_HOST,
+        idle_timeout: float = DEFAULT_IDLE_TIMEOUT,
+        connect_timeout: float = 10.0,
+    ):
+        self.limit_per_host = limit_per_host
+        self.idle_timeout = idle_timeout
+        self.connect_timeout = connect_timeout
+        self._pools: dict[tuple[str, str, int], _HostPool] = {}
+        self._ssl_context: ssl.SSLContext | None = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        await self.close()
+
+    @property
+    def stats(self) -> dict[str, int]:
+        return {
+            "connections_opened": sum(p.opened for p in self._pools.values()),
+            "connections_reused": sum(p.reused for p in self._pools.values()),
+            "connections_idle": sum(len(p.idle) for p in self._pools.values()),
+        }
+
+    async def close(self):
+        """Close all idle connections."""
+        for pool in self._pools.values():
+            while pool.idle:
+                pool.idle.popleft().close()
+        self._pools.clear()
+
+    async def request(
+        self,
+        method: str,
+        url: str,
+        body: bytes | None = None,
+        headers: dict[str, str] | None = None,
+        timeout: float | None = None,
+    ) -> HTTPResponse:
+        """Send a request and read the whole response body."""
+        async def _do() -> HTTPResponse:
+            async with self.stream(method, url, body, headers) as resp:
+                data = await resp.read()
+                return HTTPResponse(resp.status, resp.headers, data)
+
+        try:
+            return await asyncio.wait_for(_do(), timeout)
+        except asyncio.TimeoutError:
+            raise TransportError(f"Request timed out after {timeout}s: {url}") from None
+
+    async def request_json(
+        self,
+        method: str,
+        url: str,
+        payload: Any = None,
+        timeout: float | None = None,
+    ) -> HTTPResponse:
+        """Send a JSON payload (if any) and read the response."""
+        body = json.dumps(payload).encode() if payload is not None else None
+        return await self.request(method, url, body, timeout=timeout)
+
+    def stream(
+        self,
+        method: str,
+        url: str,
+        body: bytes | None = None,
+        headers: dict[str, str] | None = None,
+    ) -> "_StreamContext":
+        """Open a request whose response body is read incrementally.
+
+        Usage:
+            async with transport.stream("POST", url, body) as resp:
+                async for line in resp.iter_lines():
+                    ...
+        """
+        return _StreamContext(self, method, url, body, headers)
+
+    # ── internals ─────────────────────────────────────────────────────────
+
+    def _pool_for(self, key: tuple[str, str, int]) -> _HostPool:
+        pool = self._pools.get(key)
+        if pool is None:
+            pool = _HostPool(self.limit_per_host)
+            self._pools[key] = pool
+        return pool
+
+    async def _acquire(self, key: tuple[str, str, int]) -> tuple[_Connection, bool]:
+        """Return (connection, reused) — slot must already be held."""
+        pool = self._pools[key]
+        loop = asyncio.get_running_loop()
+        while pool.idle:
+            conn = pool.idle.pop()
+            if conn.closed or loop.time() - conn.idle_since > self.idle_timeout:
+                conn.close()
+                continue
+            pool.reused += 1
+            return conn, True
+
+        scheme, host, port = key
+        ssl_ctx = None
+        if scheme == "https":
+            if self._ssl_context is None:
+                self._ssl_context = ssl.create_default_context()
+            ssl_ctx = self._ssl_context
+        try:
+            reader, writer = await asyncio.wait_for(
+                asyncio.open_connection(host, port, ssl=ssl_ctx),
+                self.connect_timeout,
+            )
+        except (OSError, asyncio.TimeoutError) as e:
+            raise TransportError(f"Connection failed: {host}:{port}: {e}") from None
+        pool.opened += 1
+        return _Connection(reader, writer), False
+
+    def _release(self, key: tuple[str, str, int], conn: _Connection):
+        pool = self._pools.get(key)
+        if pool is not None and conn.reusable and not conn.closed:
+            conn.idle_since = asyncio.get_running_loop().time()
+            pool.idle.append(conn)
+        else:
+            conn.close()
+
+
+class _StreamContext:
+    """Async context manager returned by ``AsyncHTTPTransport.stream``."""
+
+    def __init__(self, transport, method, url, body, headers):
+        self._transport = transport
+        self._method = method
+        self._url = url
+        self._body = body
+        self._headers = headers or {}
+        self._key: tuple[str, str, int] | None = None
+        self._conn: _Connection | None = None
+        self._resp: StreamingResponse | None = None
+
+    async def __aenter__(self) -> StreamingResponse:
+        parts = urlsplit(self._url)
+        scheme = parts.scheme or "http"
+        host = parts.hostname or "localhost"
+        port = parts.port or (443 if scheme == "https" else 80)
+        target = parts.path or "/"
+        if parts.query:
+            target += "?" + parts.query
+        self._key = (scheme, host, port)
+
+        pool = self._transport._pool_for(self._key)
+        await pool.slots.acquire()
+        try:
+            self._resp = await self._send(host, port, target)
+        except BaseException:
+            pool.slots.release()
+            raise
+        return self._resp
+
+    async def __aexit__(self, exc_type, *args):
+        pool = self._transport._pools.get(self._key)
+        try:
+            if self._conn is not None:
+                if exc_type is not None or not self._resp.complete:
+                    # Unread body: the connection cannot be reused
+                    self._conn.close()
+                self._transport._release(self._key, self._conn)
+        finally:
+            if pool is not None:
+                pool.slots.release()
+
+    async def _send(self, host: str, port: int, target: str) -> StreamingResponse:
+        default_port = 443 if self._key[0] == "https" else 80
+        head = [
+            f"{self._method} {target} HTTP/1.1",
+            f"Host: {host}" if port == default_port else f"Host: {host}:{port}",
+            f"User-Agent: {USER_AGENT}",
+            "Connection: keep-alive",
+            "Accept-Encoding: identity",
+        ]
+        if self._body is not None:
+            head.append("Content-Type: application/json")
+            head.append(f"Content-Length: {len(self._body)}")
+        head.extend(f"{k}: {v}" for k, v in self._headers.items())
+        request = ("\r\n".join(head) + "\r\n\r\n").encode() + (self._body or b"")
+
+        # A pooled connection may have been closed by the server while idle;
+        # retry once on a fresh connection if nothing was received.
+        for _ in range(2):
+            conn, reused = await self._transport._acquire(self._key)
+            try:
+                conn.writer.write(request)
+                await conn.writer.drain()
+                status, headers = await _read_head(conn.reader)
+            except (ConnectionError, asyncio.IncompleteReadError, OSError) as e:
+                conn.close()
+                if reused:
+                    continue
+                raise TransportError(f"Request failed: {host}:{port}: {e}") from None
+            except BaseException:
+                conn.close()
+                raise
+            self._conn = conn
+            if headers.get("connection", "").lower() == "close":
+                conn.reusable = False
+            return StreamingResponse(conn, status, headers)
+        raise TransportError(f"Request failed: {host}:{port}: connection reset")
+
+
+async def _read_head(reader: asyncio.StreamReader) -> tuple[int, dict[str, str]]:
+    """Read the status line and headers."""
+    status_line = await reader.readuntil(b"\r\n")
+    parts = status_line.decode("latin-1").split(" ", 2)
+    if len(parts) < 2 or not parts[0].startswith("HTTP/"):
+        raise ConnectionError(f"Malformed status line: {status_line[:60]!r}")
+    status = int(parts[1])
+
+    headers: dict[str, str] = {}
+    while True:
+        line = await reader.readuntil(b"\r\n")
+        if line == b"\r\n":
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    if parts[0] == "HTTP/1.0" and headers.get("connection", "").lower() != "keep-alive":
+        headers["connection"] = "close"
+    return status, headers
+
+
+async def _iter_body(
+    conn: _Connection, status: int, headers: dict[str, str]
+) -> AsyncIterator[bytes]:
+    """Yield body chunks according to the framing in ``headers``."""
+    reader = conn.reader
+    if status in (204, 304) or 100 <= status < 200:
+        return
+    if "chunked" in headers.get("transfer-encoding", "").lower():
+        while True:
+            size_line = await reader.readuntil(b"\r\n")
+            size = int(size_line.split(b";", 1)[0].strip(), 16)
+            if size == 0:
+                # Trailers (usually none) end with an empty line
+                while await reader.readuntil(b"\r\n") != b"\r\n":
+                    pass
+                return
+            yield await reader.readexactly(size)
+            await reader.readexactly(2)
+    elif "content-length" in headers:
+        remaining = int(headers["content-length"])
+        while remaining > 0:
+            chunk = await reader.read(min(remaining, 65536))
+            if not chunk:
+                raise asyncio.IncompleteReadError(b"", remaining)
+            remaining -= len(chunk)
+            yield chunk
+    else:
+        conn.reusable = False
+        while chunk := await reader.read(65536):
+            yield chunk
@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+"""
+Streaming Report Writers for Architecture Analyzer
+===================================================
+Per-module outputs written while the analysis runs instead of after it.
+
+- ``modules.jsonl``: one JSON record per module, in completion order
+- ``module-metrics.sqlite``: one row of numeric metrics per module, for
+  dashboards that should not parse the full JSON report
+- The full JSON report is encoded one module at a time
+
+Files are built under temporary names and renamed into place when the
+run finishes, so a crashed run never leaves a half-written output.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import sqlite3
+from dataclasses import asdict, fields, is_dataclass
+from enum import Enum
+from pathlib import Path
+from typing import Any, TextIO
+
+from models import ArchitectureReport, ModuleAnalysis, Severity
+
+METRICS_BATCH_SIZE = 256  # rows per insert transaction
+
+METRICS_SCHEMA = """
+CREATE TABLE modules (
+    path TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    category TEXT NOT NULL,
+    lines_of_code INTEGER NOT NULL,
+    complexity TEXT NOT NULL,
+    options INTEGER NOT NULL,
+    dependencies INTEGER NOT NULL,
+    issues INTEGER NOT NULL,
+    critical_issues INTEGER NOT NULL,
+    error_issues INTEGER NOT NULL,
+    warning_issues INTEGER NOT NULL,
+    security_concerns INTEGER NOT NULL,
+    has_documentation INTEGER NOT NULL,
+    analysis_time_ms INTEGER NOT NULL,
+    derived_from TEXT,
+    error TEXT,
+    in_degree INTEGER,
+    out_degree INTEGER,
+    layer INTEGER,
+    centrality REAL
+);
+CREATE INDEX idx_modules_category ON modules(category);
+CREATE TABLE report (
+    timestamp TEXT,
+    repository TEXT,
+    model TEXT,
+    total_modules INTEGER,
+    total_lines INTEGER,
+    quality_score INTEGER,
+    duration_seconds REAL
+);
+"""
+
+
+def to_jsonable(obj: Any) -> Any:
+    """Dataclasses and enums as plain JSON-ready values."""
+    if isinstance(obj, Enum):
+        return obj.value
+    if is_dataclass(obj):
+        return {k: to_jsonable(v) for k, v in asdict(obj).items()}
+    if isinstance(obj, list):
+        return [to_jsonable(i) for i in obj]
+    if isinstance(obj, dict):
+        return {k: to_jsonable(v) for k, v in obj.items()}
+    return obj
+
+
+def write_report_json(report: ArchitectureReport, out: TextIO):
+    """Write the report as JSON, encoding one module at a time.
+
+    Only a single module is ever held as a dict, instead of a converted
+    copy of the whole report.
+    """
+    def nested(value: Any) -> str:
+        text = json.dumps(to_jsonable(value), indent=2, ensure_ascii=False, default=str)
+        return text.replace("\n", "\n  ")
+
+    out.write("{")
+    for i, f in enumerate(fields(report)):
+        out.write(",\n" if i else "\n")
+        out.write(f"  {json.dumps(f.name)}: ")
+        if f.name != "modules":
+            out.write(nested(getattr(report, f.name)))
+            continue
+        out.write("[")
+        for j, module in enumerate(report.modules):
+            out.write(",\n    " if j else "\n    ")
+            out.write(nested(module).replace("\n", "\n  "))
+        out.write("\n  ]" if report.modules else "]")
+    out.write("\n}\n")
+
+
+class ModuleStream:
+    """Writes each module's JSON record and metrics row as it completes.
+
+    Pass ``add`` as (or from) the ``on_result`` callback of
+    ``LLMAnalyzer.analyze_all``, then call ``finish`` with the final report
+    to add any modules not seen (e.g. unchanged ones in an incremental
+    run), fill in graph metrics and move the files into place.
+    """
+
+    JSONL_NAME = "modules.jsonl"
+    METRICS_NAME = "module-metrics.sqlite"
+
+    def __init__(self, output_dir: Path):
+        output_dir.mkdir(parents=True, exist_ok=True)
+        self.jsonl_path = output_dir / self.JSONL_NAME
+        self.metrics_path = output_dir / self.METRICS_NAME
+        self._jsonl_tmp = output_dir / f".{self.JSONL_NAME}.tmp"
+        self._metrics_tmp = output_dir / f".{self.METRICS_NAME}.tmp"
+        self._metrics_tmp.unlink(missing_ok=True)
+
+        self._jsonl = self._jsonl_tmp.open("w")
+        self._db = sqlite3.connect(self._metrics_tmp)
+        self._db.execute("PRAGMA journal_mode = OFF")
+        self._db.execute("PRAGMA synchronous = OFF")
+        self._db.executescript(METRICS_SCHEMA)
+        self._rows: list[tuple] = []
+        self._written: set[str] = set()
+
+    def add(self, analysis: ModuleAnalysis):
+        """Record one finished module (later records for a path are ignored)."""
+        if analysis.path in self._written:
+            return
+        self._written.add(analysis.path)
+        self._jsonl.write(
+            json.dumps(to_jsonable(analysis), ensure_ascii=False, default=str) + "\n"
+        )
+        self._rows.append(self._metrics_row(analysis))
+        if len(self._rows) >= METRICS_BATCH_SIZE:
+            self._flush_rows()
+
+    def finish(self, report: ArchitectureReport) -> dict[str, Path]:
+        """Complete both outputs from ``report`` and move them into place."""
+        for module in report.modules:
+            self.add(module)
+        self._flush_rows()
+
+        with self._db:
+            self._db.executemany(
+                """UPDATE modules SET in_degree = ?, out_degree = ?, layer = ?, centrality = ?
+                   WHERE path = ?""",
+                [
+                    (n.in_degree, n.out_degree, n.layer, n.centrality, key)
+                    for key, n in report.dependency_graph.nodes.items()
+                ],
+            )
+            self._db.execute(
+                "INSERT INTO report VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    report.timestamp,
+                    report.repository,
+                    report.model_used,
+                    report.total_modules,
+                    report.total_lines,
+                    report.quality_score.overall,
+                    report.analysis_duration_seconds,
+                ),
+            )
+        self._db.close()
+        self._jsonl.close()
+        os.replace(self._metrics_tmp, self.metrics_path)
+        os.replace(self._jsonl_tmp, self.jsonl_path)
+        return {"jsonl": self.jsonl_path, "metrics": self.metrics_path}
+
+    def abort(self):
+        """Discard partial outputs (the previous run's files stay in place)."""
+        self._db.close()
+        self._jsonl.close()
+        self._metrics_tmp.unlink(missing_ok=True)
+        self._jsonl_tmp.unlink(missing_ok=True)
+
+    def _flush_rows(self):
+        if not self._rows:
+            return
+        with self._db:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO modules VALUES "
+                "(?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, NULL, NULL, NULL, NULL)",
+                self._rows,
+            )
+        self._rows.clear()
+
+    @staticmethod
+    def _metrics_row(m: ModuleAnalysis) -> tuple:
+        severities = [i.severity for i in m.issues]
+        return (
+            m.path,
+            m.name,
+            m.category,
+            m.lines_of_code,
+            m.complexity.value,
+            len(m.options_defined),
+            len(m.dependencies),
+            len(m.issues),
+            severities.count(Severity.CRITICAL),
+            severities.count(Severity.ERROR),
+            severities.count(Severity.WARNING),
+            len(m.security_concerns),
+            int(m.has_documentation),
+            m.analysis_time_ms,
+            m.derived_from,
+            m.error,
+        )
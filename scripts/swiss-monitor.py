@@ -3,8 +3,12 @@
 Swiss Monitor - Real-time Log Monitoring with Semantic ML Analysis
 
 A unified monitoring tool for NixOS SOC infrastructure that:
-- Streams logs from multiple sources (journald, Suricata, FIM)
-- Classifies events using local Ollama LLM
+- Streams logs from multiple sources (journald, Suricata, FIM), read
+  in-process with inotify file tailers and a cursor-tracking journal reader
+- Classifies events using local Ollama LLM, once per log template
+  (messages differing only in PIDs, IPs, ports or timestamps)
+- Folds repeats into windowed counts, raises rate alerts and correlates
+  events across sources (e.g. a file change soon after an SSH login)
 - Provides colorized terminal output with Rich
 - Supports JSON output for pipeline integration
 
@@ -20,14 +24,22 @@ Examples:
 
 import argparse
 import asyncio
+import ctypes
+import ctypes.util
+import heapq
 import json
+import os
+import re
+import struct
 import subprocess
 import sys
+import time
+from collections import OrderedDict, deque
 from dataclasses import dataclass
 from datetime import datetime
 from enum import Enum
 from pathlib import Path
-from typing import AsyncIterator, Optional
+from typing import AsyncIterator, Callable, Optional
 
 try:
     import aiohttp
@@ -41,6 +53,58 @@ except ImportError:
     RICH_AVAILABLE = False
     print("Warning: Rich not available, using plain output", file=sys.stderr)
 
+try:
+    from systemd import journal
+    SYSTEMD_AVAILABLE = True
+except ImportError:
+    SYSTEMD_AVAILABLE = False
+
+
+# Read offsets and the journal cursor, so a restart resumes where it stopped
+STATE_DIR = Path(os.environ.get(
+    "SWISS_MONITOR_STATE", Path.home() / ".local" / "state" / "swiss-monitor"
+))
+READ_CHUNK = 1 << 20         # bytes per read while catching up on a file
+POLL_INTERVAL = 1.0          # seconds between checks when no event arrives
+STATE_SAVE_INTERVAL = 2.0    # seconds between offset/cursor saves
+
+QUEUE_MAX_EVENTS = 10_000   # events buffered between sources and the output loop
+OVERFLOW_POLICIES = ("block", "drop", "spill")
+BATCH_MAX_EVENTS = 512       # events processed and written per batch
+BATCH_LINGER = 0.02          # seconds a batch waits to fill once it has an event
+IDLE_NOTICE = 30.0           # seconds without events before "Waiting for events..."
+
+ML_WORKERS = 2               # concurrent classification requests
+ML_BATCH_SIZE = 16           # log messages per classification prompt
+ML_QUEUE_MAX = 2_000         # events waiting for the model; more go out unclassified
+ML_BUDGET = 0.3              # seconds a batch waits for its classification
+CLASSIFY_TIMEOUT = 15        # seconds per classification request
+CLASSIFY_TOKENS_PER_MESSAGE = 30
+ML_CACHE_MAX = 5_000         # template classifications kept
+ML_CACHE_TTL = 3600.0        # seconds before a template is classified again
+
+TEMPLATE_DEPTH = 2           # leading tokens that route a message in the template tree
+TEMPLATE_SIMILARITY = 0.5    # share of tokens that must agree to join a template
+TEMPLATE_MAX_CHILDREN = 100  # distinct tokens per tree level before "<*>"
+TEMPLATE_MAX = 10_000        # templates kept; the least recently seen are dropped
+
+WINDOW_SECONDS = 60.0        # tumbling window for repeat suppression, per (source, signature, src_ip)
+WINDOW_BURST = 1             # events of a key shown per window; later repeats are only counted
+RATE_WINDOW = 60.0           # sliding window for rate alerts
+RATE_BUCKETS = 12            # resolution of the sliding window
+RATE_THRESHOLD = 100         # events of a key within RATE_WINDOW that raise a rate alert
+AGG_MAX_KEYS = 50_000        # keys tracked; past this the least recently seen are flushed
+AGG_TICK = 1.0               # seconds between window flushes while no events arrive
+CORRELATION_MAX_PENDING = 1_000  # trigger events remembered per correlation rule
+
+# Peer address in sshd and similar messages ("... from 10.0.0.1 port 22")
+SRC_IP_RE = re.compile(r"\bfrom (\d{1,3}(?:\.\d{1,3}){3}|[0-9a-fA-F]*:[0-9a-fA-F:.]+)")
+
+JOURNAL_PRIORITIES = {
+    "emerg": 0, "alert": 1, "crit": 2, "err": 3,
+    "warning": 4, "notice": 5, "info": 6, "debug": 7,
+}
+
 
 class Severity(Enum):
     CRITICAL = "critical"
@@ -50,6 +114,9 @@ class Severity(Enum):
     INFO = "info"
 
 
+SEVERITY_RANK = {severity: rank for rank, severity in enumerate(Severity)}  # 0 = critical
+
+
 @dataclass
 class LogEvent:
     """Represents a parsed log event"""
@@ -60,6 +127,10 @@ class LogEvent:
     category: str = ""
     raw: str = ""
     ml_classification: Optional[str] = None
+    src_ip: str = ""
+    signature: str = ""          # rule or alert id; the message without numbers is used if empty
+    count: int = 1               # events this line stands for (summaries, rate alerts)
+    suppressed: bool = False     # folded into a later summary instead of being shown
 
 
 class OllamaClassifier:
@@ -83,15 +154,27 @@ class OllamaClassifier:
         Classify a log message using Ollama.
         Returns (severity, category) tuple.
         """
-        if not self.session:
-            return Severity.INFO, "unclassified"
-            
-        prompt = f"""Analyze this log message and classify it:
+        return (await self.classify_batch([log_message]))[0]
+
+    async def classify_batch(self, messages: list[str]) -> list[tuple[Severity, str]]:
+        """
+        Classify several log messages with one prompt.
+        Returns a (severity, category) tuple per message, in order;
+        messages the model skipped come back unclassified.
+        """
+        unclassified = [(Severity.INFO, "unclassified")] * len(messages)
+        if not self.session or not messages:
+            return unclassified
+
+        numbered = "\n".join(
+            f"{i}. {message[:500]}" for i, message in enumerate(messages, 1)
+        )
+        prompt = f"""Analyze these {len(messages)} log messages and classify each one:
 
-Log: {log_message[:500]}
+{numbered}
 
-Respond with ONLY a JSON object (no markdown):
-{{"severity": "critical|high|medium|low|info", "category": "short category name"}}"""
+Respond with ONLY a JSON array (no markdown), one object per message in the same order:
+[{{"severity": "critical|high|medium|low|info", "category": "short category name"}}]"""
 
         try:
             async with self.session.post(
@@ -100,9 +183,12 @@ Respond with ONLY a JSON object (no markdown):
                     "model": self.model,
                     "prompt": prompt,
                     "stream": False,
-                    "options": {"temperature": 0.1, "num_predict": 50}
+                    "options": {
+                        "temperature": 0.1,
+                        "num_predict": CLASSIFY_TOKENS_PER_MESSAGE * len(messages),
+                    }
                 },
-                timeout=aiohttp.ClientTimeout(total=5)
+                timeout=aiohttp.ClientTimeout(total=CLASSIFY_TIMEOUT)
             ) as resp:
                 if resp.status == 200:
                     data = await resp.json()
@@ -115,15 +201,325 @@ Respond with ONLY a JSON object (no markdown):
                             response_text = response_text.split("\n", 1)[1].rsplit("```", 1)[0]
                         
                         result = json.loads(response_text)
-                        severity = Severity(result.get("severity", "info").lower())
-                        category = result.get("category", "general")[:30]
-                        return severity, category
-                    except (json.JSONDecodeError, ValueError):
+                        if isinstance(result, dict):
+                            result = [result]
+                        results = [self._parse_result(item) for item in result[:len(messages)]]
+                        return results + unclassified[len(results):]
+                    except (json.JSONDecodeError, ValueError, TypeError):
                         pass
         except Exception:
             pass
             
-        return Severity.INFO, "unclassified"
+        return unclassified
+
+    @staticmethod
+    def _parse_result(item: dict) -> tuple[Severity, str]:
+        try:
+            severity = Severity(str(item.get("severity", "info")).lower())
+        except ValueError:
+            severity = Severity.INFO
+        category = str(item.get("category", "general"))[:30]
+        return severity, category
+
+
+class TemplateMiner:
+    """Online log template miner in the style of Drain
+
+    Variable fields (IPs, UUIDs, hex ids, numbers) are masked, then messages
+    are routed through a fixed-depth tree keyed on token count and the first
+    ``depth`` tokens. Within a leaf a message joins the most similar template
+    if enough tokens agree; tokens that differ become ``<*>``. Templates are
+    evicted least recently used past ``max_templates``.
+    """
+
+    WILDCARD = "<*>"
+    # Variable fields, tried in order at each position in one regex pass
+    MASKS = [
+        ("UUID", r"\b[0-9a-f]{8}(?:-[0-9a-f]{4}){3}-[0-9a-f]{12}\b"),
+        ("IP", r"\b\d{1,3}(?:\.\d{1,3}){3}(?::\d+)?\b"),
+        ("TIME", r"\b\d{1,2}:\d{2}:\d{2}(?:\.\d+)?\b"),
+        ("IP", r"(?<![\w:])(?:[0-9a-f]{0,4}:){2,7}[0-9a-f]{0,4}(?![\w:])"),
+        ("HEX", r"\b0x[0-9a-f]+\b|\b(?=[0-9a-f]*\d)(?=[0-9a-f]*[a-f])[0-9a-f]+\b"),
+        ("NUM", r"\b\d+(?:\.\d+)*\b"),
+    ]
+    _MASK_RE = re.compile(
+        "|".join(f"(?P<{name}{i}>{pattern})" for i, (name, pattern) in enumerate(MASKS)),
+        re.I
+    )
+    _PLACEHOLDERS = {f"{name}{i}": f"<{name}>" for i, (name, _) in enumerate(MASKS)}
+
+    def __init__(
+        self,
+        depth: int = TEMPLATE_DEPTH,
+        similarity: float = TEMPLATE_SIMILARITY,
+        max_children: int = TEMPLATE_MAX_CHILDREN,
+        max_templates: int = TEMPLATE_MAX
+    ):
+        self.depth = depth
+        self.similarity = similarity
+        self.max_children = max_children
+        self.max_templates = max_templates
+        self._tree: dict[int, dict] = {}
+        self._templates: OrderedDict[int, list[str]] = OrderedDict()
+        self._leaves: dict[int, list[int]] = {}  # template id -> its leaf
+        self._next_id = 0
+
+    def __len__(self) -> int:
+        return len(self._templates)
+
+    def add(self, message: str) -> tuple[int, str]:
+        """Match or create the template of a message; returns (id, template)"""
+        tokens = self.mask(message).split()
+        leaf = self._leaf(tokens)
+
+        best, best_score = None, (-1.0, -1)
+        for template_id in leaf:
+            template = self._templates[template_id]
+            same = wildcards = 0
+            for a, b in zip(template, tokens):
+                if a == self.WILDCARD:
+                    wildcards += 1
+                elif a == b:
+                    same += 1
+            # Prefer the most specific of equally similar templates
+            score = (same / len(tokens) if tokens else 1.0, -wildcards)
+            if score > best_score:
+                best, best_score = template_id, score
+
+        if best is not None and best_score[0] >= self.similarity:
+            template = self._templates[best]
+            for i, (a, b) in enumerate(zip(template, tokens)):
+                if a != b:
+                    template[i] = self.WILDCARD
+            self._templates.move_to_end(best)
+            return best, " ".join(template)
+
+        self._next_id += 1
+        self._templates[self._next_id] = tokens
+        self._leaves[self._next_id] = leaf
+        leaf.append(self._next_id)
+        if len(self._templates) > self.max_templates:
+            evicted, _ = self._templates.popitem(last=False)
+            self._leaves.pop(evicted).remove(evicted)
+        return self._next_id, " ".join(tokens)
+
+    @classmethod
+    def mask(cls, message: str) -> str:
+        """Message with variable fields replaced by ``<IP>``, ``<NUM>`` etc."""
+        return cls._MASK_RE.sub(lambda match: cls._PLACEHOLDERS[match.lastgroup], message)
+
+    def _leaf(self, tokens: list[str]) -> list[int]:
+        """Leaf for a token list: token count, then the first ``depth`` tokens"""
+        node = self._tree.setdefault(len(tokens), {})
+        for token in tokens[:self.depth]:
+            # Masked fields and crowded levels share the wildcard branch,
+            # so the tree cannot grow a branch per variable value
+            if token.startswith("<") or (
+                token not in node and len(node) >= self.max_children
+            ):
+                token = self.WILDCARD
+            node = node.setdefault(token, {})
+        return node.setdefault(None, [])
+
+
+class ClassificationCache:
+    """LRU cache of classifications by template id, entries expire after ``ttl`` seconds"""
+
+    def __init__(self, max_entries: int = ML_CACHE_MAX, ttl: float = ML_CACHE_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: OrderedDict[int, tuple[float, tuple[Severity, str]]] = OrderedDict()
+
+    def get(self, key: int) -> Optional[tuple[Severity, str]]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if time.monotonic() - entry[0] > self.ttl:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry[1]
+
+    def put(self, key: int, result: tuple[Severity, str]):
+        self._entries[key] = (time.monotonic(), result)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+
+@dataclass
+class _PendingBatch:
+    """Events of one output batch waiting for classification"""
+    remaining: int
+    done: asyncio.Future
+    late: bool = False  # emitted before classification finished
+
+
+class ClassifierPool:
+    """Background workers that classify events off the output loop
+
+    Each message is reduced to its log template first; templates with a
+    cached classification are applied right away, so only unseen templates
+    are queued. Those are classified ``batch_size`` templates at a time by
+    ``workers`` concurrent model requests, one prompt per batch, with one
+    example message per template.
+    The caller waits on the returned batch at most for its latency budget;
+    results arriving after the batch was emitted go to ``on_late``.
+    At most ``max_pending`` events wait for the model; the rest of a storm
+    is emitted unclassified and counted in ``skipped``.
+    """
+
+    def __init__(
+        self,
+        classifier: OllamaClassifier,
+        on_late: Callable[[list[LogEvent]], None],
+        workers: int = ML_WORKERS,
+        batch_size: int = ML_BATCH_SIZE,
+        max_pending: int = ML_QUEUE_MAX,
+        cache_ttl: float = ML_CACHE_TTL
+    ):
+        self.classifier = classifier
+        self.on_late = on_late
+        self.workers = workers
+        self.batch_size = batch_size
+        self.max_pending = max_pending
+        self.classified = 0
+        self.skipped = 0
+        self.cached = 0  # events classified from the template cache
+        self.asked = 0   # templates sent to the model
+        self.miner = TemplateMiner()
+        self.cache = ClassificationCache(ttl=cache_ttl)
+        self._queue: deque[tuple[LogEvent, _PendingBatch, int]] = deque()
+        self._inflight: dict[int, asyncio.Future] = {}
+        self._ready = asyncio.Event()
+        self._tasks: list[asyncio.Task] = []
+
+    def start(self):
+        self._tasks = [asyncio.create_task(self._work()) for _ in range(self.workers)]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def submit(self, events: list[LogEvent]) -> _PendingBatch:
+        """Classify events from the template cache, queue the rest"""
+        loop = asyncio.get_running_loop()
+        misses = []
+        for event in events:
+            if not event.message:
+                continue
+            template_id, _ = self.miner.add(event.message)
+            cached = self.cache.get(template_id)
+            if cached is not None:
+                self._apply(event, *cached)
+                self.cached += 1
+            else:
+                misses.append((event, template_id))
+        room = max(0, self.max_pending - len(self._queue))
+        if len(misses) > room:
+            self.skipped += len(misses) - room
+            misses = misses[:room]
+        pending = _PendingBatch(remaining=len(misses), done=loop.create_future())
+        if not misses:
+            pending.done.set_result(None)
+            return pending
+        self._queue.extend((event, pending, template_id) for event, template_id in misses)
+        self._ready.set()
+        return pending
+
+    async def wait(self, pending: _PendingBatch, budget: float):
+        """Wait up to ``budget`` seconds; later results are reported as late"""
+        if not pending.done.done() and budget > 0:
+            try:
+                await asyncio.wait_for(asyncio.shield(pending.done), budget)
+            except asyncio.TimeoutError:
+                pass
+        if not pending.done.done():
+            pending.late = True
+
+    async def _work(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            await self._ready.wait()
+            # Take events until the batch holds ``batch_size`` templates
+            groups: dict[int, list[tuple[LogEvent, _PendingBatch]]] = {}
+            while self._queue:
+                template_id = self._queue[0][2]
+                if template_id not in groups and len(groups) >= self.batch_size:
+                    break
+                event, pending, _ = self._queue.popleft()
+                groups.setdefault(template_id, []).append((event, pending))
+            if not self._queue:
+                self._ready.clear()
+            if not groups:
+                continue
+
+            # Ask the model once per template: skip those cached or being
+            # asked by another worker since the events were queued
+            results: dict[int, tuple[Severity, str]] = {}
+            waiting: dict[int, asyncio.Future] = {}
+            asked: list[int] = []
+            for template_id in groups:
+                cached = self.cache.get(template_id)
+                if cached is not None:
+                    results[template_id] = cached
+                elif template_id in self._inflight:
+                    waiting[template_id] = self._inflight[template_id]
+                else:
+                    asked.append(template_id)
+                    self._inflight[template_id] = loop.create_future()
+            if asked:
+                answers = [(Severity.INFO, "unclassified")] * len(asked)
+                try:
+                    answers = await self.classifier.classify_batch(
+                        [groups[template_id][0][0].message for template_id in asked]
+                    )
+                finally:
+                    for template_id, answer in zip(asked, answers):
+                        self._inflight.pop(template_id).set_result(answer)
+                self.asked += len(asked)
+                for template_id, answer in zip(asked, answers):
+                    results[template_id] = answer
+                    # Failed requests are retried with the next event of the template
+                    if answer[1] != "unclassified":
+                        self.cache.put(template_id, answer)
+            for template_id, future in waiting.items():
+                results[template_id] = await asyncio.shield(future)
+
+            late = []
+            for template_id, group in groups.items():
+                self._resolve(group, *results[template_id], late)
+            if late:
+                self.on_late(late)
+
+    def _resolve(
+        self,
+        group: list[tuple[LogEvent, _PendingBatch]],
+        severity: Severity,
+        category: str,
+        late: list[LogEvent]
+    ):
+        """Apply one template's classification to its queued events"""
+        for event, pending in group:
+            if self._apply(event, severity, category) and pending.late:
+                late.append(event)
+            pending.remaining -= 1
+            if pending.remaining == 0 and not pending.done.done():
+                pending.done.set_result(None)
+
+    def _apply(self, event: LogEvent, severity: Severity, category: str) -> bool:
+        """Merge a classification into the event; True if it changed"""
+        changed = False
+        # Only upgrade severity, never downgrade
+        if SEVERITY_RANK[severity] < SEVERITY_RANK[event.severity]:
+            event.severity = severity
+            changed = True
+        if category and category != "unclassified":
+            event.ml_classification = category
+            self.classified += 1
+            changed = True
+        return changed
 
 
 class LogSource:
@@ -134,15 +530,330 @@ class LogSource:
         raise NotImplementedError
 
 
+class Inotify:
+    """Minimal inotify binding over ctypes (Linux only)"""
+
+    IN_MODIFY = 0x002
+    IN_MOVED_FROM = 0x040
+    IN_MOVED_TO = 0x080
+    IN_CREATE = 0x100
+    IN_DELETE = 0x200
+    IN_Q_OVERFLOW = 0x4000
+
+    _EVENT = struct.Struct("iIII")  # wd, mask, cookie, name length
+
+    def __init__(self):
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        try:
+            self._add_watch = libc.inotify_add_watch
+            init = libc.inotify_init1
+        except AttributeError:
+            raise OSError("inotify not supported on this platform")
+        self.fd = init(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err))
+
+    def watch(self, path: Path, mask: int):
+        if self._add_watch(self.fd, os.fsencode(path), mask) < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err), str(path))
+
+    def drain(self) -> set[str]:
+        """Read all pending events; returns the file names they concern ("*" on overflow)"""
+        names = set()
+        while True:
+            try:
+                buf = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                return names
+            pos = 0
+            while pos < len(buf):
+                _, mask, _, length = self._EVENT.unpack_from(buf, pos)
+                pos += self._EVENT.size
+                names.add(os.fsdecode(buf[pos:pos + length].rstrip(b"\0")))
+                pos += length
+                if mask & self.IN_Q_OVERFLOW:
+                    names.add("*")
+
+    def close(self):
+        os.close(self.fd)
+
+
+class FileTailer:
+    """Follow a growing file in-process, like ``tail -F``
+
+    Wakes on inotify events for the file's directory (or polls every
+    POLL_INTERVAL where inotify is unavailable) and reads whole chunks.
+    Rotation (rename or delete + create) is detected by inode and
+    truncation by size; the old file is drained before switching. The
+    offset of the last complete line is saved to ``state_file`` together
+    with the inode, so a restart resumes without gaps or repeats.
+    """
+
+    WATCH_MASK = (
+        Inotify.IN_MODIFY | Inotify.IN_CREATE | Inotify.IN_MOVED_TO
+        | Inotify.IN_MOVED_FROM | Inotify.IN_DELETE
+    )
+
+    def __init__(self, path: Path, state_file: Optional[Path] = None):
+        self.path = path
+        self.state_file = state_file
+        self._fd: Optional[int] = None
+        self._inode: Optional[int] = None
+        self._offset = 0           # bytes read from the current file
+        self._partial = b""        # incomplete last line
+        self._saved_at = 0.0
+
+    async def batches(self) -> AsyncIterator[list[bytes]]:
+        """Yield lists of complete lines (without newlines) as they are written"""
+        loop = asyncio.get_running_loop()
+        wake = asyncio.Event()
+        inotify = None
+        try:
+            inotify = Inotify()
+            inotify.watch(self.path.parent, self.WATCH_MASK)
+            loop.add_reader(inotify.fd, wake.set)
+        except OSError:
+            if inotify:
+                inotify.close()
+            inotify = None
+
+        self._resume()
+        try:
+            while True:
+                while self._fd is not None:
+                    lines = self._read_chunk()
+                    if lines is None:
+                        break
+                    if lines:
+                        yield lines
+                change = self._check_rotation()
+                if change:
+                    # Lines appended to the old file since the last read,
+                    # and an unterminated last line, come first
+                    if change == "rotated":
+                        while self._fd is not None:
+                            lines = self._read_chunk()
+                            if lines is None:
+                                break
+                            if lines:
+                                yield lines
+                    if self._partial:
+                        yield [self._partial]
+                        self._partial = b""
+                    if self._switch(change):
+                        continue
+                self._maybe_save()
+
+                # Wait for a change to this file (other files share the directory)
+                while True:
+                    try:
+                        await asyncio.wait_for(wake.wait(), POLL_INTERVAL)
+                    except asyncio.TimeoutError:
+                        break
+                    wake.clear()
+                    names = inotify.drain()
+                    if self.path.name in names or "*" in names:
+                        break
+        finally:
+            if inotify:
+                loop.remove_reader(inotify.fd)
+                inotify.close()
+            self.save_state()
+            self._close()
+
+    def _read_chunk(self) -> Optional[list[bytes]]:
+        """Complete lines from the next chunk, or None at end of file"""
+        data = os.read(self._fd, READ_CHUNK)
+        if not data:
+            return None
+        self._offset += len(data)
+        lines = (self._partial + data).split(b"\n")
+        self._partial = lines.pop()
+        return [line for line in lines if line]
+
+    def _open(self, offset: int = 0) -> bool:
+        try:
+            fd = os.open(self.path, os.O_RDONLY | os.O_CLOEXEC)
+        except FileNotFoundError:
+            return False
+        st = os.fstat(fd)
+        if offset < 0 or offset > st.st_size:
+            offset = st.st_size
+        os.lseek(fd, offset, os.SEEK_SET)
+        self._fd, self._inode = fd, st.st_ino
+        self._offset, self._partial = offset, b""
+        return True
+
+    def _close(self):
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+    def _resume(self):
+        """Open at the saved offset if it is still the same file, else at the end"""
+        saved = self._load_state()
+        try:
+            inode = os.stat(self.path).st_ino
+        except FileNotFoundError:
+            return
+        if saved and saved[0] == inode:
+            self._open(saved[1])
+        else:
+            self._open(-1)
+
+    def _check_rotation(self) -> Optional[str]:
+        """"rotated" if a new file is in place, "truncated" if it shrank, else None"""
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return None  # rotated away; keep reading the old file until the new one appears
+        if self._fd is None or st.st_ino != self._inode:
+            return "rotated"
+        if st.st_size < self._offset:  # truncated in place (copytruncate)
+            return "truncated"
+        return None
+
+    def _switch(self, change: str) -> bool:
+        """Move to the start of the new or truncated file; True if the position changed"""
+        if change == "rotated":
+            self._close()
+            return self._open(0)
+        os.lseek(self._fd, 0, os.SEEK_SET)
+        self._offset, self._partial = 0, b""
+        return True
+
+    def _load_state(self) -> Optional[tuple[int, int]]:
+        if not self.state_file:
+            return None
+        try:
+            inode, offset = self.state_file.read_text().split()
+            return int(inode), int(offset)
+        except (OSError, ValueError):
+            return None
+
+    def _maybe_save(self):
+        if time.monotonic() - self._saved_at >= STATE_SAVE_INTERVAL:
+            self.save_state()
+
+    def save_state(self):
+        """Persist inode and the offset just past the last complete line"""
+        self._saved_at = time.monotonic()
+        if not self.state_file or self._inode is None:
+            return
+        try:
+            self.state_file.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.state_file.with_suffix(".tmp")
+            tmp.write_text(f"{self._inode} {self._offset - len(self._partial)}\n")
+            os.replace(tmp, self.state_file)
+        except OSError:
+            pass
+
+
+class FileSource(LogSource):
+    """Base for sources that tail a JSON-lines file"""
+
+    name = "file"
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.tailer = FileTailer(path, STATE_DIR / f"{self.name}.offset")
+
+    async def stream(self) -> AsyncIterator[LogEvent]:
+        if not self.path.parent.is_dir():
+            return
+        async for lines in self.tailer.batches():
+            for line in lines:
+                event = self.parse(line)
+                if event:
+                    yield event
+
+    def parse(self, line: bytes) -> Optional[LogEvent]:
+        """Turn one line into an event, or None to skip it"""
+        raise NotImplementedError
+
+
 class JournaldSource(LogSource):
-    """Stream logs from systemd journal"""
+    """Stream logs from systemd journal
+
+    Reads the journal in-process when python-systemd is available and falls
+    back to ``journalctl -f``. Either way the cursor of the last record is
+    saved (one file per ``name``), so a restart continues where the previous
+    run stopped.
+    """
     
-    def __init__(self, units: list[str] = None, priority: str = "warning"):
+    def __init__(self, units: list[str] = None, priority: str = "warning", name: str = "journald"):
         self.units = units or []
         self.priority = priority
+        self.cursor_file = STATE_DIR / f"{name}.cursor"
         
     async def stream(self) -> AsyncIterator[LogEvent]:
-        cmd = ["journalctl", "-f", "-o", "json", "-p", self.priority]
+        if SYSTEMD_AVAILABLE:
+            stream = self._stream_native()
+        else:
+            stream = self._stream_journalctl()
+        async for event in stream:
+            yield event
+
+    async def _stream_native(self) -> AsyncIterator[LogEvent]:
+        reader = journal.Reader()
+        reader.log_level(JOURNAL_PRIORITIES.get(self.priority, 4))
+        for unit in self.units:
+            reader.add_match(_SYSTEMD_UNIT=unit if "." in unit else f"{unit}.service")
+
+        cursor = self._load_cursor()
+        if cursor:
+            reader.seek_cursor(cursor)
+            reader.get_next()  # the record at the cursor was already shown
+        else:
+            reader.seek_tail()
+            reader.get_previous()
+
+        loop = asyncio.get_running_loop()
+        wake = asyncio.Event()
+        loop.add_reader(reader.fileno(), wake.set)
+        saved_at = time.monotonic()
+        try:
+            while True:
+                while entry := reader.get_next():
+                    cursor = entry.get("__CURSOR", cursor)
+                    yield self._entry_event(entry)
+                if cursor and time.monotonic() - saved_at >= STATE_SAVE_INTERVAL:
+                    self._save_cursor(cursor)
+                    saved_at = time.monotonic()
+                try:
+                    await asyncio.wait_for(wake.wait(), POLL_INTERVAL)
+                except asyncio.TimeoutError:
+                    pass
+                wake.clear()
+                reader.process()
+        finally:
+            loop.remove_reader(reader.fileno())
+            if cursor:
+                self._save_cursor(cursor)
+            reader.close()
+
+    def _entry_event(self, entry: dict) -> LogEvent:
+        """Event from a python-systemd record (fields are already converted)"""
+        message = entry.get("MESSAGE", "")
+        if isinstance(message, bytes):
+            message = message.decode("utf-8", "replace")
+        ts = entry.get("__REALTIME_TIMESTAMP")
+        return LogEvent(
+            timestamp=ts.isoformat() if ts else datetime.now().isoformat(),
+            source=f"journald:{entry.get('_SYSTEMD_UNIT', 'system')}",
+            message=str(message),
+            severity=self._parse_priority(int(entry.get("PRIORITY", 6))),
+            src_ip=self._src_ip(str(message)),
+        )
+
+    async def _stream_journalctl(self) -> AsyncIterator[LogEvent]:
+        self.cursor_file.parent.mkdir(parents=True, exist_ok=True)
+        cmd = [
+            "journalctl", "-f", "-o", "json", "-p", self.priority,
+            f"--cursor-file={self.cursor_file}",
+        ]
         for unit in self.units:
             cmd.extend(["-u", unit])
             
@@ -152,25 +863,54 @@ class JournaldSource(LogSource):
             stderr=asyncio.subprocess.DEVNULL
         )
         
-        while True:
-            line = await proc.stdout.readline()
-            if not line:
-                break
-                
-            try:
-                data = json.loads(line.decode())
-                yield LogEvent(
-                    timestamp=datetime.fromtimestamp(
-                        int(data.get("__REALTIME_TIMESTAMP", 0)) / 1_000_000
-                    ).isoformat(),
-                    source=f"journald:{data.get('_SYSTEMD_UNIT', 'system')}",
-                    message=data.get("MESSAGE", ""),
-                    severity=self._parse_priority(data.get("PRIORITY", 6)),
-                    raw=line.decode()
-                )
-            except (json.JSONDecodeError, ValueError):
-                continue
+        try:
+            while True:
+                line = await proc.stdout.readline()
+                if not line:
+                    break
+
+                try:
+                    raw = line.decode("utf-8", "replace")
+                    data = json.loads(raw)
+                    message = data.get("MESSAGE", "")
+                    yield LogEvent(
+                        timestamp=datetime.fromtimestamp(
+                            int(data.get("__REALTIME_TIMESTAMP", 0)) / 1_000_000
+                        ).isoformat(),
+                        source=f"journald:{data.get('_SYSTEMD_UNIT', 'system')}",
+                        message=message,
+                        severity=self._parse_priority(int(data.get("PRIORITY", 6))),
+                        raw=raw,
+                        src_ip=self._src_ip(message)
+                    )
+                except (json.JSONDecodeError, ValueError, TypeError):
+                    continue
+        finally:
+            # journalctl writes the cursor file when it exits
+            if proc.returncode is None:
+                proc.terminate()
+                await proc.wait()
+
+    def _load_cursor(self) -> Optional[str]:
+        try:
+            return self.cursor_file.read_text().strip() or None
+        except OSError:
+            return None
+
+    def _save_cursor(self, cursor: str):
+        try:
+            self.cursor_file.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.cursor_file.with_suffix(".tmp")
+            tmp.write_text(cursor)
+            os.replace(tmp, self.cursor_file)
+        except OSError:
+            pass
     
+    @staticmethod
+    def _src_ip(message) -> str:
+        match = SRC_IP_RE.search(message) if isinstance(message, str) else None
+        return match.group(1) if match else ""
+
     @staticmethod
     def _parse_priority(priority: int) -> Severity:
         """Convert journald priority to Severity"""
@@ -185,46 +925,39 @@ class JournaldSource(LogSource):
         return Severity.INFO
 
 
-class SuricataSource(LogSource):
+class SuricataSource(FileSource):
     """Stream Suricata EVE JSON logs"""
+
+    name = "suricata"
     
     def __init__(self, eve_path: str = "/var/log/suricata/eve.json"):
-        self.eve_path = Path(eve_path)
-        
-    async def stream(self) -> AsyncIterator[LogEvent]:
-        if not self.eve_path.exists():
-            return
-            
-        proc = await asyncio.create_subprocess_exec(
-            "tail", "-f", "-n", "0", str(self.eve_path),
-            stdout=asyncio.subprocess.PIPE,
-            stderr=asyncio.subprocess.DEVNULL
-        )
-        
-        while True:
-            line = await proc.stdout.readline()
-            if not line:
-                break
-                
-            try:
-                data = json.loads(line.decode())
-                event_type = data.get("event_type", "unknown")
-                
-                # Skip non-alert events for now
-                if event_type != "alert":
-                    continue
-                    
-                alert = data.get("alert", {})
-                yield LogEvent(
-                    timestamp=data.get("timestamp", datetime.now().isoformat()),
-                    source=f"suricata:{event_type}",
-                    message=alert.get("signature", data.get("event_type", "")),
-                    severity=self._parse_severity(alert.get("severity", 3)),
-                    category=alert.get("category", ""),
-                    raw=line.decode()
-                )
-            except (json.JSONDecodeError, ValueError):
-                continue
+        super().__init__(Path(eve_path))
+
+    def parse(self, line: bytes) -> Optional[LogEvent]:
+        # Skip non-alert events for now; most of eve.json is flow, dns, http
+        # and stats records, rejected here without decoding them
+        if b'"alert"' not in line:
+            return None
+        try:
+            raw = line.decode("utf-8", "replace")
+            data = json.loads(raw)
+            event_type = data.get("event_type", "unknown")
+            if event_type != "alert":
+                return None
+
+            alert = data.get("alert", {})
+            return LogEvent(
+                timestamp=data.get("timestamp", datetime.now().isoformat()),
+                source=f"suricata:{event_type}",
+                message=alert.get("signature", data.get("event_type", "")),
+                severity=self._parse_severity(alert.get("severity", 3)),
+                category=alert.get("category", ""),
+                raw=raw,
+                src_ip=data.get("src_ip", ""),
+                signature=str(alert.get("signature_id", ""))
+            )
+        except (json.JSONDecodeError, ValueError):
+            return None
     
     @staticmethod
     def _parse_severity(sev: int) -> Severity:
@@ -238,39 +971,451 @@ class SuricataSource(LogSource):
         return Severity.LOW
 
 
-class FIMSource(LogSource):
+class FIMSource(FileSource):
     """Stream FIM (File Integrity Monitor) alerts"""
+
+    name = "fim"
     
     def __init__(self, fim_path: str = "/var/log/soc/fim-alerts.json"):
-        self.fim_path = Path(fim_path)
-        
-    async def stream(self) -> AsyncIterator[LogEvent]:
-        if not self.fim_path.exists():
-            return
-            
-        proc = await asyncio.create_subprocess_exec(
-            "tail", "-f", "-n", "0", str(self.fim_path),
-            stdout=asyncio.subprocess.PIPE,
-            stderr=asyncio.subprocess.DEVNULL
-        )
-        
-        while True:
-            line = await proc.stdout.readline()
+        super().__init__(Path(fim_path))
+
+    def parse(self, line: bytes) -> Optional[LogEvent]:
+        try:
+            raw = line.decode("utf-8", "replace")
+            data = json.loads(raw)
+            return LogEvent(
+                timestamp=data.get("timestamp", datetime.now().isoformat()),
+                source="fim",
+                message=f"{data.get('action', 'unknown')}: {data.get('path', '')}",
+                severity=Severity(data.get("severity", "medium")),
+                category="file_integrity",
+                raw=raw
+            )
+        except (json.JSONDecodeError, ValueError):
+            return None
+
+
+class EventBuffer:
+    """Bounded event queue between the sources and the output loop
+
+    When full, ``put`` follows the overflow policy:
+    - block: wait for room, slowing the sources down (tailers just lag)
+    - drop: discard the new event and count it
+    - spill: append it to a JSON-lines file on disk; spilled events are
+      read back in order once the queue has drained
+
+    While anything is spilled, new events are spilled too, so order is kept.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = QUEUE_MAX_EVENTS,
+        policy: str = "block",
+        spill_path: Optional[Path] = None
+    ):
+        if policy not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown overflow policy: {policy}")
+        self.maxsize = maxsize
+        self.policy = policy
+        self.spill_path = spill_path or STATE_DIR / "spill.jsonl"
+        self.dropped = 0
+        self.spilled = 0
+        self._events: deque[LogEvent] = deque()
+        self._readable = asyncio.Event()
+        self._writable = asyncio.Event()
+        self._writable.set()
+        self._spill_out = None     # append handle
+        self._spill_in = None      # read handle
+        self._spill_pending = 0    # events in the file not read back yet
+
+    def __len__(self) -> int:
+        return len(self._events) + self._spill_pending
+
+    async def put(self, event: LogEvent):
+        if self._spill_pending or len(self._events) >= self.maxsize:
+            if self.policy == "block":
+                while len(self._events) >= self.maxsize:
+                    self._writable.clear()
+                    await self._writable.wait()
+            elif self.policy == "drop":
+                self.dropped += 1
+                return
+            else:
+                self._spill(event)
+                return
+        self._events.append(event)
+        self._readable.set()
+
+    async def get_batch(
+        self,
+        max_events: int = BATCH_MAX_EVENTS,
+        linger: float = BATCH_LINGER,
+        timeout: float = IDLE_NOTICE
+    ) -> list[LogEvent]:
+        """Next batch of up to ``max_events``; empty if nothing arrived in ``timeout``"""
+        if not self._events and not self._refill():
+            self._readable.clear()
+            try:
+                await asyncio.wait_for(self._readable.wait(), timeout)
+            except asyncio.TimeoutError:
+                return []
+            # Coming out of idle, give a burst a moment to fill the batch
+            # instead of writing its first events one by one
+            if linger > 0:
+                await asyncio.sleep(linger)
+
+        count = min(max_events, len(self._events))
+        batch = [self._events.popleft() for _ in range(count)]
+        if len(self._events) < self.maxsize:
+            self._writable.set()
+        if len(self._events) < self.maxsize // 2:
+            self._refill()
+        return batch
+
+    def _spill(self, event: LogEvent):
+        if self._spill_out is None:
+            self.spill_path.parent.mkdir(parents=True, exist_ok=True)
+            self._spill_out = open(self.spill_path, "w")
+            self._spill_in = open(self.spill_path)
+        record = {
+            "timestamp": event.timestamp,
+            "source": event.source,
+            "message": event.message,
+            "severity": event.severity.value,
+            "category": event.category,
+            "raw": event.raw,
+            "src_ip": event.src_ip,
+            "signature": event.signature,
+        }
+        self._spill_out.write(json.dumps(record) + "\n")
+        self._spill_pending += 1
+        self.spilled += 1
+
+    def _refill(self) -> bool:
+        """Move spilled events back into the queue; True if any were moved"""
+        if not self._spill_pending:
+            return False
+        self._spill_out.flush()
+        room = max(1, self.maxsize - len(self._events))
+        moved = 0
+        while moved < room and self._spill_pending:
+            line = self._spill_in.readline()
             if not line:
                 break
-                
-            try:
-                data = json.loads(line.decode())
-                yield LogEvent(
-                    timestamp=data.get("timestamp", datetime.now().isoformat()),
-                    source="fim",
-                    message=f"{data.get('action', 'unknown')}: {data.get('path', '')}",
-                    severity=Severity(data.get("severity", "medium")),
-                    category="file_integrity",
-                    raw=line.decode()
-                )
-            except (json.JSONDecodeError, ValueError):
-                continue
+            data = json.loads(line)
+            data["severity"] = Severity(data["severity"])
+            self._events.append(LogEvent(**data))
+            self._spill_pending -= 1
+            moved += 1
+        if not self._spill_pending:
+            # Caught up: start the file over instead of letting it grow
+            self._spill_out.seek(0)
+            self._spill_out.truncate()
+            self._spill_in.seek(0)
+        if moved:
+            self._readable.set()
+        return moved > 0
+
+    def close(self):
+        for handle in (self._spill_out, self._spill_in):
+            if handle:
+                handle.close()
+
+
+@dataclass
+class CorrelationRule:
+    """Alert when a ``then`` event follows a ``first`` event within ``within`` seconds
+
+    Events match a side by source prefix and a regex on the message (empty
+    matches anything). With ``same_src_ip`` both events must share a source
+    address.
+    """
+    name: str
+    first_source: str
+    first_pattern: str
+    then_source: str
+    then_pattern: str
+    within: float
+    severity: Severity = Severity.HIGH
+    same_src_ip: bool = False
+
+
+SSH_LOGIN = r"^Accepted \S+ for "
+# Messages without a signature are keyed with numbers (PIDs, ports, addresses) collapsed
+DIGITS_RE = re.compile(r"\d+")
+
+CORRELATION_RULES = [
+    CorrelationRule(
+        "file-change-after-ssh-login",
+        "journald:sshd", SSH_LOGIN, "fim", "",
+        within=300, severity=Severity.CRITICAL,
+    ),
+    CorrelationRule(
+        "ssh-login-after-ids-alert",
+        "suricata", "", "journald:sshd", SSH_LOGIN,
+        within=600, severity=Severity.CRITICAL, same_src_ip=True,
+    ),
+]
+
+
+def event_epoch(event: LogEvent) -> Optional[float]:
+    """Event timestamp as epoch seconds, None if it does not parse"""
+    try:
+        return datetime.fromisoformat(event.timestamp).timestamp()
+    except (TypeError, ValueError):
+        return None
+
+
+class Correlator:
+    """Cross-source correlation over a bounded, time-evicted trigger history
+
+    Per rule, the latest ``first`` event is kept per join key (the source
+    address, or a single slot) for ``within`` seconds of arrival. A later
+    ``then`` event within that time produces a correlation event. Event
+    timestamps are compared as well when both parse, so a backlog read
+    after a restart is not correlated just because it arrives at once.
+    """
+
+    def __init__(self, rules: list[CorrelationRule], max_pending: int = CORRELATION_MAX_PENDING):
+        self.max_pending = max_pending
+        self.matched = 0
+        self._rules = [
+            (rule, re.compile(rule.first_pattern), re.compile(rule.then_pattern), OrderedDict())
+            for rule in rules
+        ]
+
+    def observe(self, event: LogEvent, now: float) -> list[LogEvent]:
+        """Record ``event`` as a trigger and return the correlations it completes"""
+        found = []
+        for rule, first, then, pending in self._rules:
+            while pending and now - next(iter(pending.values()))[0] > rule.within:
+                pending.popitem(last=False)
+            key = event.src_ip if rule.same_src_ip else ""
+
+            if event.source.startswith(rule.then_source) and then.search(event.message):
+                trigger = pending.get(key)
+                if trigger:
+                    correlated = self._correlate(rule, trigger[1], event)
+                    if correlated:
+                        found.append(correlated)
+
+            if event.source.startswith(rule.first_source) and first.search(event.message):
+                if rule.same_src_ip and not key:
+                    continue
+                pending.pop(key, None)
+                pending[key] = (now, event)
+                if len(pending) > self.max_pending:
+                    pending.popitem(last=False)
+        return found
+
+    def _correlate(
+        self,
+        rule: CorrelationRule,
+        first: LogEvent,
+        then: LogEvent
+    ) -> Optional[LogEvent]:
+        first_time, then_time = event_epoch(first), event_epoch(then)
+        gap = ""
+        if first_time is not None and then_time is not None:
+            if abs(then_time - first_time) > rule.within:
+                return None
+            gap = f" {then_time - first_time:.0f}s"
+        self.matched += 1
+        return LogEvent(
+            timestamp=then.timestamp,
+            source=f"correlation:{rule.name}",
+            message=f"{then.source}: {then.message} —{gap} after {first.source}: {first.message}",
+            severity=rule.severity,
+            category="correlation",
+            src_ip=then.src_ip or first.src_ip,
+            signature=rule.name,
+        )
+
+
+class _WindowState:
+    """Tumbling and sliding window counters of one (source, signature, src_ip) key"""
+
+    __slots__ = ("start", "seen", "shown", "suppressed", "severity", "last",
+                 "alerted", "buckets", "bucket", "rate")
+
+    def __init__(self, now: float):
+        self.start = now  # tumbling window start
+        self.seen = now
+        self.shown = 0
+        self.suppressed = 0
+        self.severity = Severity.INFO
+        self.last: Optional[LogEvent] = None  # latest suppressed event
+        self.alerted = False  # rate alert raised in this tumbling window
+        self.buckets = [0] * RATE_BUCKETS
+        self.bucket = int(now / (RATE_WINDOW / RATE_BUCKETS))
+        self.rate = 0  # events within the sliding window
+
+    def count(self, now: float) -> int:
+        """Add an event to the sliding window; returns the events within it"""
+        bucket = int(now / (RATE_WINDOW / RATE_BUCKETS))
+        for expired in range(self.bucket + 1, min(bucket, self.bucket + RATE_BUCKETS) + 1):
+            self.rate -= self.buckets[expired % RATE_BUCKETS]
+            self.buckets[expired % RATE_BUCKETS] = 0
+        self.bucket = max(self.bucket, bucket)
+        self.buckets[bucket % RATE_BUCKETS] += 1
+        self.rate += 1
+        return self.rate
+
+
+class EventAggregator:
+    """Streaming aggregation between classification and output
+
+    - Repeats of a (source, signature, src_ip) key beyond ``burst`` per
+      tumbling ``window`` are suppressed and emitted as one summary with
+      their count once the window has passed
+    - A key reaching ``rate_threshold`` events within the sliding
+      ``RATE_WINDOW`` raises one rate alert per tumbling window
+    - Correlation rules turn related events of different sources into
+      alerts, which are suppressed like any other event
+
+    State is bounded by ``max_keys`` and keys idle for a window are flushed,
+    so memory stays flat however many events arrive. Windows run on arrival
+    time (``time.monotonic()``).
+    """
+
+    def __init__(
+        self,
+        window: float = WINDOW_SECONDS,
+        burst: int = WINDOW_BURST,
+        rate_threshold: int = RATE_THRESHOLD,
+        rules: Optional[list[CorrelationRule]] = None,
+        max_keys: int = AGG_MAX_KEYS
+    ):
+        self.window = window
+        self.burst = burst
+        self.rate_threshold = rate_threshold
+        self.max_keys = max_keys
+        self.correlator = Correlator(CORRELATION_RULES if rules is None else rules)
+        self.suppressed = 0
+        self.rate_alerts = 0
+        self._keys: OrderedDict[tuple[str, str, str], _WindowState] = OrderedDict()
+        # (window end, key, window start) of windows holding suppressed repeats
+        self._due: list[tuple[float, tuple[str, str, str], float]] = []
+
+    def process(self, events: list[LogEvent], now: Optional[float] = None) -> list[LogEvent]:
+        """Events to emit for a batch: new, summaries, rate and correlation alerts"""
+        now = time.monotonic() if now is None else now
+        out: list[LogEvent] = []
+        for event in events:
+            self._add(event, now, out)
+            for correlated in self.correlator.observe(event, now):
+                self._add(correlated, now, out)
+        self._expire(now, out)
+        return out
+
+    def flush(self, now: Optional[float] = None, everything: bool = False) -> list[LogEvent]:
+        """Summaries of keys idle for a window (or all keys, on shutdown)"""
+        out: list[LogEvent] = []
+        if everything:
+            while self._keys:
+                self._close(*self._keys.popitem(last=False), out)
+            self._due.clear()
+        else:
+            self._expire(time.monotonic() if now is None else now, out)
+        return out
+
+    def _add(self, event: LogEvent, now: float, out: list[LogEvent]):
+        if self.window <= 0:
+            out.append(event)
+            return
+        key = (event.source, event.signature or DIGITS_RE.sub("#", event.message), event.src_ip)
+        state = self._keys.get(key)
+        if state is None:
+            state = self._keys[key] = _WindowState(now)
+            if len(self._keys) > self.max_keys:
+                self._close(*self._keys.popitem(last=False), out)
+        else:
+            self._keys.move_to_end(key)
+            if now - state.start >= self.window:
+                self._close(key, state, out)
+                state.start = now
+        state.seen = now
+
+        if state.count(now) >= self.rate_threshold and not state.alerted:
+            state.alerted = True
+            self.rate_alerts += 1
+            out.append(self._rate_alert(key, event, state.rate))
+
+        if state.shown < self.burst:
+            state.shown += 1
+            out.append(event)
+            return
+        if not state.suppressed:
+            heapq.heappush(self._due, (state.start + self.window, key, state.start))
+            if len(self._due) > 2 * self.max_keys:
+                self._rebuild_due()
+        state.suppressed += 1
+        state.last = event
+        if SEVERITY_RANK[event.severity] < SEVERITY_RANK[state.severity]:
+            state.severity = event.severity
+        event.suppressed = True
+        self.suppressed += 1
+
+    def _expire(self, now: float, out: list[LogEvent]):
+        # Windows with suppressed repeats close on time, whether or not
+        # their key sees another event; the key's state stays
+        while self._due and self._due[0][0] <= now:
+            _, key, start = heapq.heappop(self._due)
+            state = self._keys.get(key)
+            if state is not None and state.start == start and state.suppressed:
+                self._close(key, state, out)
+        # Keys are ordered by last event, so idle ones are at the front
+        while self._keys:
+            key, state = next(iter(self._keys.items()))
+            if now - state.seen < self.window:
+                break
+            del self._keys[key]
+            self._close(key, state, out)
+
+    def _rebuild_due(self):
+        """Drop entries of evicted keys and closed windows"""
+        self._due = [
+            (state.start + self.window, key, state.start)
+            for key, state in self._keys.items()
+            if state.suppressed
+        ]
+        heapq.heapify(self._due)
+
+    def _close(self, key: tuple[str, str, str], state: _WindowState, out: list[LogEvent]):
+        """End the tumbling window of a key, emitting its suppressed count"""
+        if state.suppressed and state.last:
+            last = state.last
+            out.append(LogEvent(
+                timestamp=last.timestamp,
+                source=last.source,
+                message=f"{last.message} [repeated {state.suppressed}× in "
+                        f"{max(state.seen - state.start, 1):.0f}s]",
+                severity=state.severity,
+                category=last.category,
+                ml_classification=last.ml_classification,
+                src_ip=last.src_ip,
+                signature=key[1],
+                count=state.suppressed,
+            ))
+        state.shown = state.suppressed = 0
+        state.severity = Severity.INFO
+        state.last = None
+        state.alerted = False
+
+    def _rate_alert(self, key: tuple[str, str, str], event: LogEvent, rate: int) -> LogEvent:
+        # One level above the triggering event
+        severity = list(Severity)[max(SEVERITY_RANK[event.severity] - 1, 0)]
+        origin = f" from {event.src_ip}" if event.src_ip else ""
+        return LogEvent(
+            timestamp=event.timestamp,
+            source=event.source,
+            message=f"Rate: {rate} events in {RATE_WINDOW:.0f}s{origin}: {event.message}",
+            severity=severity,
+            category="rate",
+            src_ip=event.src_ip,
+            signature=f"rate:{key[1]}",
+            count=rate,
+        )
 
 
 class SwissMonitor:
@@ -298,17 +1443,39 @@ class SwissMonitor:
         enable_ml: bool = False,
         json_output: bool = False,
         filter_severity: str = None,
-        ollama_model: str = "llama3.2:1b"
+        ollama_model: str = "llama3.2:1b",
+        ml_workers: int = ML_WORKERS,
+        ml_batch_size: int = ML_BATCH_SIZE,
+        ml_budget: float = ML_BUDGET,
+        ml_cache_ttl: float = ML_CACHE_TTL,
+        queue_size: int = QUEUE_MAX_EVENTS,
+        overflow: str = "block",
+        batch_size: int = BATCH_MAX_EVENTS,
+        window: float = WINDOW_SECONDS,
+        rate_threshold: int = RATE_THRESHOLD,
+        correlate: bool = True
     ):
         self.source_names = sources or ["journald", "suricata", "fim"]
         self.enable_ml = enable_ml
         self.json_output = json_output
         self.filter_severity = Severity(filter_severity) if filter_severity else None
         self.ollama_model = ollama_model
+        self.ml_workers = ml_workers
+        self.ml_batch_size = ml_batch_size
+        self.ml_budget = ml_budget
+        self.ml_cache_ttl = ml_cache_ttl
+        self.queue_size = queue_size
+        self.overflow = overflow
+        self.batch_size = batch_size
+        self.aggregator = EventAggregator(
+            window=window,
+            rate_threshold=rate_threshold,
+            rules=None if correlate else [],
+        )
         
         self.console = Console() if RICH_AVAILABLE else None
         self.event_count = 0
-        self.ml_count = 0
+        self.classifier_pool: Optional[ClassifierPool] = None
         
     def _create_sources(self) -> list[LogSource]:
         """Create log source instances"""
@@ -316,87 +1483,104 @@ class SwissMonitor:
         for name in self.source_names:
             if name == "journald":
                 sources.append(JournaldSource(
-                    units=["suricata", "docker", "sshd"],
+                    units=["suricata", "docker"],
                     priority="notice"
                 ))
+                # Logins ("Accepted ... for") are logged at info and feed the correlation rules
+                sources.append(JournaldSource(
+                    units=["sshd"],
+                    priority="info",
+                    name="journald-sshd"
+                ))
             elif name == "suricata":
                 sources.append(SuricataSource())
             elif name == "fim":
                 sources.append(FIMSource())
         return sources
     
-    async def _process_event(
-        self,
-        event: LogEvent,
-        classifier: Optional[OllamaClassifier]
-    ) -> Optional[LogEvent]:
-        """Process and optionally classify event"""
-        
-        # ML classification
-        if classifier and self.enable_ml and event.message:
-            severity, category = await classifier.classify(event.message)
-            # Only upgrade severity, never downgrade
-            if severity.value < event.severity.value:
-                event.severity = severity
-            if category and category != "unclassified":
-                event.ml_classification = category
-                self.ml_count += 1
-        
-        # Filter by severity
-        if self.filter_severity:
-            severity_order = [Severity.CRITICAL, Severity.HIGH, Severity.MEDIUM, Severity.LOW, Severity.INFO]
-            if severity_order.index(event.severity) > severity_order.index(self.filter_severity):
-                return None
-                
-        return event
-    
-    def _output_event(self, event: LogEvent):
-        """Output event to console or JSON"""
-        self.event_count += 1
-        
+    async def _process_batch(self, batch: list[LogEvent]) -> list[LogEvent]:
+        """Classify a batch within the ML budget, aggregate it and drop events below the severity filter"""
+        self.event_count += len(batch)
+        if self.classifier_pool:
+            pending = self.classifier_pool.submit(batch)
+            await self.classifier_pool.wait(pending, self.ml_budget)
+        return self._filter(self.aggregator.process(batch))
+
+    def _filter(self, events: list[LogEvent]) -> list[LogEvent]:
+        if not self.filter_severity:
+            return events
+        limit = SEVERITY_RANK[self.filter_severity]
+        return [event for event in events if SEVERITY_RANK[event.severity] <= limit]
+
+    def _output_late(self, events: list[LogEvent]):
+        """Re-emit events whose classification arrived after they were shown"""
+        shown = [event for event in events if not event.suppressed]
+        self._output_batch(self._filter(shown), late=True)
+
+    def _format_json(self, event: LogEvent, late: bool = False) -> str:
+        output = {
+            "timestamp": event.timestamp,
+            "source": event.source,
+            "severity": event.severity.value,
+            "message": event.message,
+            "category": event.category,
+        }
+        if event.src_ip:
+            output["src_ip"] = event.src_ip
+        if event.count != 1:
+            output["count"] = event.count
+        if event.ml_classification:
+            output["ml_classification"] = event.ml_classification
+        if late:
+            output["reclassified"] = True
+        return json.dumps(output)
+
+    def _format_rich(self, event: LogEvent, late: bool = False) -> "Text":
+        icon = self.SEVERITY_ICONS[event.severity]
+        color = self.SEVERITY_COLORS[event.severity]
+
+        text = Text()
+        if late:
+            text.append("↻ ", style="magenta")
+        text.append(f"{icon} ", style=color)
+        text.append(f"[{event.timestamp[11:19]}] ", style="dim")
+        text.append(f"[{event.source}] ", style="blue")
+        text.append(event.message[:100], style=color)
+
+        if event.ml_classification:
+            text.append(f" 🤖{event.ml_classification}", style="magenta")
+        return text
+
+    def _format_plain(self, event: LogEvent, late: bool = False) -> str:
+        icon = {"critical": "!", "high": "*", "medium": "+", "low": "-", "info": " "}
+        line = f"[{icon[event.severity.value]}] [{event.timestamp}] [{event.source}] {event.message}"
+        if event.ml_classification:
+            line += f" [ml:{event.ml_classification}]"
+        return f"[reclassified] {line}" if late else line
+
+    def _output_batch(self, events: list[LogEvent], late: bool = False):
+        """Output a batch to console or JSON with a single write"""
+        if not events:
+            return
+
         if self.json_output:
-            output = {
-                "timestamp": event.timestamp,
-                "source": event.source,
-                "severity": event.severity.value,
-                "message": event.message,
-                "category": event.category,
-            }
-            if event.ml_classification:
-                output["ml_classification"] = event.ml_classification
-            print(json.dumps(output))
+            sys.stdout.write("\n".join(self._format_json(e, late) for e in events) + "\n")
             sys.stdout.flush()
-            return
-        
-        if self.console:
-            icon = self.SEVERITY_ICONS[event.severity]
-            color = self.SEVERITY_COLORS[event.severity]
-            
-            text = Text()
-            text.append(f"{icon} ", style=color)
-            text.append(f"[{event.timestamp[11:19]}] ", style="dim")
-            text.append(f"[{event.source}] ", style="blue")
-            text.append(event.message[:100], style=color)
-            
-            if event.ml_classification:
-                text.append(f" 🤖{event.ml_classification}", style="magenta")
-            
-            self.console.print(text)
+        elif self.console:
+            self.console.print(Text("\n").join(self._format_rich(e, late) for e in events))
         else:
-            # Plain output
-            icon = {"critical": "!", "high": "*", "medium": "+", "low": "-", "info": " "}
-            print(f"[{icon[event.severity.value]}] [{event.timestamp}] [{event.source}] {event.message}")
+            sys.stdout.write("\n".join(self._format_plain(e, late) for e in events) + "\n")
+            sys.stdout.flush()
     
     async def _stream_source(
         self,
         source: LogSource,
-        classifier: Optional[OllamaClassifier],
-        queue: asyncio.Queue
+        buffer: EventBuffer
     ):
-        """Stream events from a source to the queue"""
+        """Stream events from a source to the buffer"""
         try:
             async for event in source.stream():
-                await queue.put((source, event))
+                await buffer.put(event)
         except asyncio.CancelledError:
             pass
         except Exception as e:
@@ -419,39 +1603,76 @@ class SwissMonitor:
                 border_style="green"
             ))
         
-        # Create event queue
-        queue: asyncio.Queue = asyncio.Queue()
+        # Bounded event buffer between sources and output
+        buffer = EventBuffer(self.queue_size, self.overflow)
         
-        # Setup ML classifier
+        # Setup ML classifier workers
         classifier = None
         if self.enable_ml:
             classifier = OllamaClassifier(model=self.ollama_model)
             await classifier.__aenter__()
+            self.classifier_pool = ClassifierPool(
+                classifier,
+                on_late=self._output_late,
+                workers=self.ml_workers,
+                batch_size=self.ml_batch_size,
+                cache_ttl=self.ml_cache_ttl,
+            )
+            self.classifier_pool.start()
         
+        tasks = []
         try:
             # Start source streaming tasks
             tasks = [
-                asyncio.create_task(self._stream_source(source, classifier, queue))
+                asyncio.create_task(self._stream_source(source, buffer))
                 for source in sources
             ]
             
-            # Process events from queue
+            # Process events in micro-batches; while idle, emit the
+            # summaries of windows that have closed
+            idle = 0.0
             while True:
-                try:
-                    _, event = await asyncio.wait_for(queue.get(), timeout=30)
-                    processed = await self._process_event(event, classifier)
-                    if processed:
-                        self._output_event(processed)
-                except asyncio.TimeoutError:
-                    if not self.json_output and self.console:
-                        self.console.print("[dim]Waiting for events...[/dim]")
+                batch = await buffer.get_batch(self.batch_size, timeout=AGG_TICK)
+                if not batch:
+                    self._output_batch(self._filter(self.aggregator.flush()))
+                    idle += AGG_TICK
+                    if idle >= IDLE_NOTICE:
+                        idle = 0.0
+                        if not self.json_output and self.console:
+                            self.console.print("[dim]Waiting for events...[/dim]")
+                    continue
+                idle = 0.0
+                self._output_batch(await self._process_batch(batch))
                         
-        except KeyboardInterrupt:
+        except (KeyboardInterrupt, asyncio.CancelledError):
+            self._output_batch(self._filter(self.aggregator.flush(everything=True)))
             if not self.json_output and self.console:
-                self.console.print(f"\n[yellow]Stopped. Processed {self.event_count} events ({self.ml_count} ML classified)[/yellow]")
+                pool = self.classifier_pool
+                ml_count = pool.classified if pool else 0
+                templates = ""
+                if pool:
+                    templates = (f", {len(pool.miner)} log templates, "
+                                 f"{pool.asked} sent to the model")
+                lost = ""
+                if buffer.dropped or buffer.spilled:
+                    lost = f", {buffer.dropped} dropped, {buffer.spilled} spilled to disk"
+                if pool and pool.skipped:
+                    lost += f", {pool.skipped} not classified (ML backlog)"
+                aggregator = self.aggregator
+                folded = (f", {aggregator.suppressed} repeats folded into summaries, "
+                          f"{aggregator.rate_alerts} rate alerts, "
+                          f"{aggregator.correlator.matched} correlations")
+                self.console.print(
+                    f"\n[yellow]Stopped. Processed {self.event_count} events "
+                    f"({ml_count} ML classified{templates}{folded}{lost})[/yellow]"
+                )
         finally:
             for task in tasks:
                 task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            buffer.close()
+            if self.classifier_pool:
+                await self.classifier_pool.stop()
             if classifier:
                 await classifier.__aexit__()
 
@@ -490,6 +1711,36 @@ Examples:
         help="Ollama model for classification (default: llama3.2:1b)"
     )
     
+    parser.add_argument(
+        "--ml-workers",
+        type=int,
+        default=ML_WORKERS,
+        help=f"Concurrent classification requests (default: {ML_WORKERS})"
+    )
+
+    parser.add_argument(
+        "--ml-batch",
+        type=int,
+        default=ML_BATCH_SIZE,
+        help=f"Log messages per classification prompt (default: {ML_BATCH_SIZE})"
+    )
+
+    parser.add_argument(
+        "--ml-budget",
+        type=float,
+        default=ML_BUDGET,
+        help="Seconds events wait for classification before being shown; "
+             f"later results are printed as reclassified (default: {ML_BUDGET})"
+    )
+
+    parser.add_argument(
+        "--ml-cache-ttl",
+        type=float,
+        default=ML_CACHE_TTL,
+        help="Seconds a log template's classification is reused before the "
+             f"model is asked again (default: {ML_CACHE_TTL:g})"
+    )
+
     parser.add_argument(
         "--json", "-j",
         action="store_true",
@@ -501,6 +1752,51 @@ Examples:
         choices=["critical", "high", "medium", "low", "info"],
         help="Filter by minimum severity"
     )
+
+    parser.add_argument(
+        "--queue-size",
+        type=int,
+        default=QUEUE_MAX_EVENTS,
+        help=f"Events buffered before the overflow policy applies (default: {QUEUE_MAX_EVENTS})"
+    )
+
+    parser.add_argument(
+        "--overflow",
+        choices=OVERFLOW_POLICIES,
+        default="block",
+        help="When the buffer is full: slow the sources down, drop new events, "
+             "or spill them to disk (default: block)"
+    )
+
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=BATCH_MAX_EVENTS,
+        help=f"Events processed and written per batch (default: {BATCH_MAX_EVENTS})"
+    )
+
+    parser.add_argument(
+        "--window",
+        type=float,
+        default=WINDOW_SECONDS,
+        help="Seconds per repeat-suppression window: repeats of a source, signature "
+             "and source address are printed once with a count; 0 prints every event "
+             f"(default: {WINDOW_SECONDS:g})"
+    )
+
+    parser.add_argument(
+        "--rate-threshold",
+        type=int,
+        default=RATE_THRESHOLD,
+        help=f"Events of one key within {RATE_WINDOW:g}s that raise a rate alert "
+             f"(default: {RATE_THRESHOLD})"
+    )
+
+    parser.add_argument(
+        "--no-correlation",
+        action="store_true",
+        help="Disable cross-source correlation rules (e.g. file change after SSH login)"
+    )
     
     args = parser.parse_args()
     
@@ -509,7 +1805,17 @@ Examples:
         enable_ml=args.ml,
         json_output=args.json,
         filter_severity=args.filter,
-        ollama_model=args.model
+        ollama_model=args.model,
+        ml_workers=args.ml_workers,
+        ml_batch_size=args.ml_batch,
+        ml_budget=args.ml_budget,
+        ml_cache_ttl=args.ml_cache_ttl,
+        queue_size=args.queue_size,
+        overflow=args.overflow,
+        batch_size=args.batch_size,
+        window=args.window,
+        rate_threshold=args.rate_threshold,
+        correlate=not args.no_correlation
     )
     
     asyncio.run(monitor.run())